@@ -0,0 +1,271 @@
+"""
+Admission control for AI provider requests.
+
+Bounds the number of concurrent requests per provider (or per model), and queues the requests
+above the limit by priority class:
+
+  - "interactive": chat requests of a waiting user
+  - "agent": agent tasks and follow-up requests
+  - "scheduled": scheduled background jobs
+
+Higher priority requests are admitted first, requests of the same class in FIFO order.
+Optionally, slots can be reserved for interactive requests, so background requests never occupy the full capacity.
+
+The priority of a request is taken from `ChatCompletionRequest.priority`, or from the priority context
+(see `request_priority`) of the caller, e.g. for scheduled tasks.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from enum import IntEnum
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    AGENT = 1
+    SCHEDULED = 2
+
+    @classmethod
+    def parse(cls, value: "str | Priority | None", default: "Priority" = None) -> "Priority":
+        if value is None:
+            return default if default is not None else cls.AGENT
+        if isinstance(value, Priority):
+            return value
+        try:
+            return cls[str(value).upper()]
+        except KeyError:
+            raise ValueError(f"Invalid request priority: {value}")
+
+
+class AdmissionTimeoutError(TimeoutError):
+    """Raised when a request waited longer than its queue timeout for admission."""
+    pass
+
+
+_priority_context: contextvars.ContextVar[Priority | None] = contextvars.ContextVar("request_priority", default=None)
+
+
+@contextlib.contextmanager
+def request_priority(priority: str | Priority):
+    """Set the default priority of the AI requests made within the context."""
+    token = _priority_context.set(Priority.parse(priority))
+    try:
+        yield
+    finally:
+        _priority_context.reset(token)
+
+
+def current_priority(priority: str | Priority | None = None) -> Priority:
+    """Resolve the request priority: the explicit priority, the context priority, or "agent"."""
+    if priority is not None:
+        return Priority.parse(priority)
+    return Priority.parse(_priority_context.get())
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._set_future)
+
+    def _set_future(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class PriorityLimiter:
+    """A counting semaphore with a priority queue, usable from threads and coroutines."""
+
+    def __init__(self, name: str, limit: int, reserved_interactive: int = 0) -> None:
+        self.name = name
+        self.limit = limit
+        self.reserved_interactive = min(reserved_interactive, max(limit - 1, 0))
+        self.active = 0
+        self._queue: list[tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"admitted": 0, "queued": 0, "timeouts": 0, "max_wait": 0.0, "total_wait": 0.0}
+
+    def _capacity(self, priority: Priority) -> int:
+        return self.limit if priority == Priority.INTERACTIVE else self.limit - self.reserved_interactive
+
+    def _try_admit(self, priority: Priority) -> bool:
+        # must hold the lock. Only admit directly if no higher or equal priority request is waiting.
+        if self._queue and self._queue[0][0] <= priority:
+            return False
+        if self.active < self._capacity(priority):
+            self.active += 1
+            self._stats["admitted"] += 1
+            return True
+        return False
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        heapq.heappush(self._queue, (int(waiter.priority), next(self._seq), waiter))
+        self._stats["queued"] += 1
+
+    def _dispatch(self) -> None:
+        # must hold the lock. Grant free slots to the waiters in priority order.
+        skipped = []
+        while self._queue:
+            priority, seq, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled:
+                continue
+            if self.active >= self._capacity(waiter.priority):
+                skipped.append((priority, seq, waiter))
+                if self.active >= self.limit:
+                    break
+                continue
+            self.active += 1
+            self._stats["admitted"] += 1
+            waiter.granted = True
+            wait_time = time.monotonic() - waiter.enqueued_at
+            self._stats["total_wait"] += wait_time
+            self._stats["max_wait"] = max(self._stats["max_wait"], wait_time)
+            waiter.wake()
+        for item in skipped:
+            heapq.heappush(self._queue, item)
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+            self._dispatch()
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Cancel a waiter after a timeout or cancellation. Returns True if the slot was granted meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+            self._stats["timeouts"] += 1
+            return False
+
+    def acquire(self, priority: Priority, timeout: float | None = None) -> None:
+        with self._lock:
+            if self._try_admit(priority):
+                return
+            waiter = _Waiter(priority)
+            self._enqueue(waiter)
+        if not waiter.event.wait(timeout):
+            if not self._abandon(waiter):
+                raise AdmissionTimeoutError(f"Request waited more than {timeout}s for admission to {self.name}")
+
+    async def aacquire(self, priority: Priority, timeout: float | None = None) -> None:
+        with self._lock:
+            if self._try_admit(priority):
+                return
+            waiter = _Waiter(priority, loop=asyncio.get_running_loop())
+            self._enqueue(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if self._abandon(waiter):
+                # the slot was granted concurrently with the timeout/cancellation
+                if isinstance(e, asyncio.CancelledError):
+                    self.release()
+                    raise
+                return
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise AdmissionTimeoutError(f"Request waited more than {timeout}s for admission to {self.name}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = {p.name.lower(): 0 for p in Priority}
+            for priority, _, waiter in self._queue:
+                if not waiter.cancelled:
+                    queued[Priority(priority).name.lower()] += 1
+            admitted = self._stats["admitted"]
+            return {
+                "limit": self.limit,
+                "reserved_interactive": self.reserved_interactive,
+                "active": self.active,
+                "queue_depth": sum(queued.values()),
+                "queued": queued,
+                "admitted": admitted,
+                "timeouts": self._stats["timeouts"],
+                "max_wait": round(self._stats["max_wait"], 3),
+                "total_wait": round(self._stats["total_wait"], 3),
+            }
+
+
+class AdmissionController:
+    """
+    Per-provider and per-model concurrency limits.
+
+    :param limits: Concurrency limits by provider name (e.g. "ollama") or model ID (e.g. "ollama:qwen3:8b").
+        Model limits take precedence over provider limits. Requests without a limit are admitted immediately.
+    :param queue_timeouts: Maximum queue wait (seconds) by priority class name.
+    :param reserved_interactive: Number of slots per limiter reserved for interactive requests.
+    """
+
+    def __init__(self, limits: dict[str, int], queue_timeouts: dict[str, float] | None = None,
+                 reserved_interactive: int = 0) -> None:
+        self.limits = {key.lower(): value for key, value in limits.items()}
+        self.queue_timeouts = {Priority.parse(key): value for key, value in (queue_timeouts or {}).items()}
+        self.reserved_interactive = reserved_interactive
+        self._limiters: dict[str, PriorityLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, provider_name: str, model_name: str) -> PriorityLimiter | None:
+        model_id = f"{provider_name}:{model_name}".lower()
+        key = model_id if model_id in self.limits else provider_name.lower()
+        limit = self.limits.get(key)
+        if not limit or limit <= 0:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = PriorityLimiter(key, limit, reserved_interactive=self.reserved_interactive)
+                self._limiters[key] = limiter
+            return limiter
+
+    @contextlib.contextmanager
+    def admit(self, provider_name: str, model_name: str, priority: str | Priority | None = None):
+        """Hold a concurrency slot for the provider/model within the context (blocking)."""
+        limiter = self._limiter(provider_name, model_name)
+        if limiter is None:
+            yield
+            return
+        priority = current_priority(priority)
+        limiter.acquire(priority, timeout=self.queue_timeouts.get(priority))
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    @contextlib.asynccontextmanager
+    async def aadmit(self, provider_name: str, model_name: str, priority: str | Priority | None = None):
+        """Hold a concurrency slot for the provider/model within the context (async)."""
+        limiter = self._limiter(provider_name, model_name)
+        if limiter is None:
+            yield
+            return
+        priority = current_priority(priority)
+        await limiter.aacquire(priority, timeout=self.queue_timeouts.get(priority))
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.stats() for limiter in limiters}
@@ -57,7 +57,8 @@ class BaseAgent(BotInterface, abc.ABC):
             return
 
         init_builtin_tools(self._tool_registry)
-        await init_mcp_server_tools(self._tool_registry)
+        # no background registration, the discovery tasks would outlive short-lived agents
+        await init_mcp_server_tools(self._tool_registry, background=False)
         self._initialized = True
 
     async def enqueue_task(self, task: BaseTask):
@@ -3,15 +3,18 @@ import logging
 from datetime import datetime
 from typing import AsyncGenerator, Set
 
+from geenii import config
 from geenii.agent.base import BaseAgentTask, BaseTask, message_to_prompt
 from geenii.agent.utils import estimate_token_count
-from geenii.ai import generate_chat_completion
+from geenii.ai import agenerate_chat_completion
 from geenii.chat.chat_models import UserInteractionContent, ToolCallResultContent, ContentPart, TextContent, \
     ToolCallContent, JsonContent
+from geenii.context import context_builder
 from geenii.datamodels import ModelMessage, ChatCompletionRequest
 from geenii.g import init_agent_registry, init_agent_by_name
 from geenii.tool.registry import ToolRegistry
 from geenii.utils.json_util import parse_json_safe
+from geenii.vector_memory import VectorMemory, get_vector_memory
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +81,8 @@ class LLMTask(BaseAgentTask):
 
     MAX_TOOL_CALLS = 5  # to prevent infinite loops of tool calls
 
+    _indexed_skills: set[str] = set()  # skills (name and path) already added to the vector memory
+
     def __init__(self, agent: "BaseAgent", message: str | list[ContentPart], allowed_tools: Set[str] | None = None):
         super().__init__(agent)
         self.message = message
@@ -89,18 +94,26 @@ class LLMTask(BaseAgentTask):
         full_system_prompt = self._build_system_prompt()
         # print(full_system_prompt)
         prompt = message_to_prompt(self.message)
-        allowed_tools = self.allowed_tools
-        input_messages = list(self.agent.message_history[-10:]) # message history (max 10 messages)
+        allowed_tools = self._select_tools(prompt)
 
-        # run sync task in thread pool to avoid blocking the event loop while waiting for the response
         request = ChatCompletionRequest(prompt=prompt,
                                         model=self.agent.model,
                                         system=full_system_prompt,
-                                        messages=input_messages,
+                                        volatile_system=self._build_volatile_system_prompt(),
+                                        messages=list(self.agent.message_history),
                                         tools=allowed_tools,
                                         context_id=self.agent.context_id
                                         )
-        response = await asyncio.to_thread(self._request_completion, request)
+        # pack the message history into the token budget of the model.
+        # with the vector memory, only the recent history is sent, older turns are recalled by relevance
+        vector_memory = get_vector_memory()
+        history_budget = None
+        if vector_memory is not None:
+            history_budget = min(context_builder.budget(request.model), config.VECTOR_MEMORY_HISTORY_TOKENS)
+        window = context_builder.fit(request, budget=history_budget, tool_registry=self.agent.tools)
+        if vector_memory is not None:
+            request.volatile_system.extend(await self._recall_memories(vector_memory, prompt, window.messages))
+        response = await self._request_completion(request)
         logger.info(f"Received model response for prompt '{prompt}' with {len(response.output)} content parts.")
 
         # add user request to message history
@@ -112,6 +125,11 @@ class LLMTask(BaseAgentTask):
         bot_message = ModelMessage(role="assistant", content=response.output)
         self.agent.message_history.append(bot_message)
 
+        if vector_memory is not None and prompt and prompt.strip():
+            vector_memory.schedule_add(self._memory_namespace(),
+                                       [f"User: {prompt}", f"Assistant: {bot_message.to_text()}"],
+                                       metadata={"context_id": self.agent.context_id})
+
         # yield the model response message
         yield bot_message
 
@@ -154,8 +172,9 @@ class LLMTask(BaseAgentTask):
 
                 # now we can re-generate the response based on the original prompt and the updated message history that includes the tool result
                 request.prompt = ""
-                request.messages = list(self.agent.message_history[-((tools_called*2) + 3):])  # snapshot of the updated message history
-                response = await asyncio.to_thread(self._request_completion, request)
+                request.messages = list(self.agent.message_history)  # snapshot of the updated message history
+                context_builder.fit(request, budget=history_budget, tool_registry=self.agent.tools)
+                response = await self._request_completion(request)
                 logger.info(f"Received model response for prompt '{prompt}' after tool call with {len(response.output)} content parts.")
             else:
                 logger.error(f"Tool call {tool_call.name} did not return a valid result. Skipping re-generation of the response.")
@@ -172,24 +191,81 @@ class LLMTask(BaseAgentTask):
                           message="Based on the tool results, continue processing the original prompt and provide the next response.",
                           allowed_tools=allowed_tools))
 
-    def _request_completion(self, request):
-        response = generate_chat_completion(request=request, tool_registry=self.agent.tools, )
+    def _select_tools(self, prompt: str) -> set[str]:
+        # send only the allowed tools relevant to the prompt, if the agent has many tools
+        allowed_tools = self.allowed_tools
+        if not config.TOOL_SEARCH_MIN_TOOLS or len(allowed_tools) <= config.TOOL_SEARCH_MIN_TOOLS \
+                or not prompt or self.agent.tools is None:
+            return allowed_tools
+        selected = self.agent.tools.search(prompt, top_k=config.TOOL_SEARCH_TOP_K, names=allowed_tools)
+        if not selected:
+            # no tool matches the prompt, the model chooses from all allowed tools
+            return allowed_tools
+        logger.info(f"Pre-selected {len(selected)} of {len(allowed_tools)} tools for the prompt: {selected}")
+        return set(selected)
+
+    async def _request_completion(self, request):
+        response = await agenerate_chat_completion(request=request, tool_registry=self.agent.tools, )
         return response
 
+    def _memory_namespace(self) -> str:
+        return f"agent:{self.agent.name}"
+
+    async def _recall_memories(self, vector_memory: VectorMemory, prompt: str,
+                               messages: list[ModelMessage]) -> list[str]:
+        """
+        Recall the past messages and skill documents most relevant to the prompt from the vector memory.
+        Returns a system prompt with the recalled memories, or an empty list.
+        """
+        if not prompt or not prompt.strip():
+            return []
+        namespaces = [self._memory_namespace()]
+        try:
+            for skill_name in sorted(self.agent.skills.names()):
+                skill = self.agent.skills.get(skill_name)
+                namespace = f"skill:{skill_name}"
+                namespaces.append(namespace)
+                if f"{skill_name}:{skill.path}" not in self._indexed_skills:
+                    await asyncio.to_thread(vector_memory.add_document, namespace,
+                                            f"{skill.description}\n\n{skill.instructions}", "skill",
+                                            {"skill": skill_name})
+                    self._indexed_skills.add(f"{skill_name}:{skill.path}")
+            matches = await vector_memory.asearch(prompt, top_k=config.VECTOR_MEMORY_TOP_K, namespaces=namespaces)
+        except Exception as e:
+            logger.exception("Failed to recall memories from the vector memory", exc_info=e)
+            return []
+
+        # skip memories which are already part of the context window
+        in_context = {message.to_text() for message in messages}
+        memories = [match for match in matches if match.text.split(": ", 1)[-1] not in in_context]
+        if not memories:
+            return []
+        lines = ["RELEVANT MEMORIES (recalled from earlier conversations and skill documents):"]
+        for match in memories:
+            source = f"skill {match.metadata['skill']}" if match.kind == "skill" else "conversation"
+            lines.append(f"- [{source}] {match.text}")
+        return ["\n".join(lines)]
+
     def _build_system_prompt(self) -> list[str]:
         """
         Build the full system prompt for the agent, including the base system prompt and any additional information from loaded skills.
+        The system prompt only contains content which is stable across the turns of a conversation,
+        so the prompt prefix can be reused from the model's KV cache (see geenii.prompt_prefix).
         """
-        current_datetime = datetime.now().isoformat()
         agent_context_info = "\n".join(["CONTEXT INFORMATION:",
-                          f"Current conversation context ID: {self.agent.context_id}",
-                          f"Current date and time: {current_datetime}"])
+                          f"Current conversation context ID: {self.agent.context_id}"])
 
-        system_prompts = [self.agent.system_prompt, agent_context_info]
+        system_prompts = [self.agent.system_prompt]
         skills_prompts = self._build_skills_prompt()
         system_prompts.extend(skills_prompts)
+        system_prompts.append(agent_context_info)
         return system_prompts
 
+    def _build_volatile_system_prompt(self) -> list[str]:
+        """Build the system prompts which change on every turn. They are placed after the message history."""
+        current_datetime = datetime.now().isoformat(timespec="seconds")
+        return [f"Current date and time: {current_datetime}"]
+
     def _build_skills_prompt(self) -> list[str]:
         """
         Returns a combined prompt for all loaded skills that can be included in the system prompt
@@ -264,7 +340,8 @@ class ToolFilterTask(BaseAgentTask):
 
         request = ChatCompletionRequest(
             model=self.agent.model,
-            model_parameters={"temperature": 0.1, "max_tokens": 512},
+            # deterministic sampling, so repeated classifications can be served from the completion cache
+            model_parameters={"temperature": 0.0, "max_tokens": 512},
             system=[self.SYSTEM_PROMPT, f"Available tools:\n{tools_str}"],
             prompt=self.prompt,
             messages=[],
@@ -272,7 +349,7 @@ class ToolFilterTask(BaseAgentTask):
             output_schema=self.OUTPUT_SCHEMA,
             # tools=tool_names,
         )
-        response = await asyncio.to_thread(generate_chat_completion, request)
+        response = await agenerate_chat_completion(request)
         logger.info(f"Received model response for tool filtering with {len(response.output)} content parts.")
         selected_tools = []
         if len(response.output) > 0:
@@ -382,14 +459,15 @@ class FindBestAgentTask(BaseAgentTask):
 
         request = ChatCompletionRequest(
             model=self.agent.model,
-            model_parameters={"temperature": 0.1, "max_tokens": 512},
+            # deterministic sampling, so repeated classifications can be served from the completion cache
+            model_parameters={"temperature": 0.0, "max_tokens": 512},
             system=[self.SYSTEM_PROMPT, f"Available agents:\n{agents_str}"],
             prompt=self.prompt,
             messages=[],
             output_format="json",
             output_schema=self.OUTPUT_SCHEMA,
         )
-        response = await asyncio.to_thread(generate_chat_completion, request)
+        response = await agenerate_chat_completion(request)
         logger.info(f"Received model response for agent selection with {len(response.output)} content parts.")
         selected_agent = None
         if len(response.output) > 0:
@@ -492,14 +570,15 @@ class FindBestSkillTask(BaseAgentTask):
         skills_str = "\n - ".join(available_skills)
         request = ChatCompletionRequest(
             model=self.agent.model,
-            model_parameters={"temperature": 0.1, "max_tokens": 512},
+            # deterministic sampling, so repeated classifications can be served from the completion cache
+            model_parameters={"temperature": 0.0, "max_tokens": 512},
             system=[self.SYSTEM_PROMPT, f"Available skills:\n{skills_str}"],
             prompt=self.prompt,
             messages=[],
             output_format="json",
             output_schema=self.OUTPUT_SCHEMA,
         )
-        response = await asyncio.to_thread(generate_chat_completion, request)
+        response = await agenerate_chat_completion(request)
         logger.info(f"Received model response for agent selection with {len(response.output)} content parts.")
 
         selected_skill = None
@@ -591,7 +670,7 @@ AVAILABLE SKILLS:
         print("***" * 10)
         print(system_prompt)
         print("***" * 10)
-        print(estimate_token_count(system_prompt, 1000))
+        print(estimate_token_count(system_prompt, 1000, model=self.agent.model))
         print("***" * 10)
 
         request = ChatCompletionRequest(
@@ -621,7 +700,7 @@ AVAILABLE SKILLS:
                 "additionalProperties": False
             }
         )
-        response = await asyncio.to_thread(generate_chat_completion, request)
+        response = await agenerate_chat_completion(request)
         logger.info(f"Received model response for plan generation with {len(response.output)} content parts.")
 
         if len(response.output) > 0:
@@ -1,27 +1,87 @@
+import asyncio
 from datetime import datetime
-from pathlib import Path
+from typing import AsyncGenerator
 import uuid
 
 import pydantic
 
+from geenii import config
+from geenii.admission import AdmissionController, current_priority
+from geenii.completion_cache import completion_cache, request_cache_key
+from geenii.context import context_builder
+from geenii.embedding_cache import embedding_cache
+from geenii.prompt_prefix import prompt_prefix_tracker
 from geenii.config import DATA_DIR
 from geenii.datamodels import CompletionResponse, CompletionErrorResponse, \
     ChatCompletionRequest, ImageGenerationApiRequest, ImageGenerationApiResponse, \
     AudioGenerationApiRequest, AudioSpeechGenerationApiResponse, AudioTranscriptionApiRequest, AudioTranscriptionApiResponse, \
-    ModelMessage, AIModelInfo, AIProviderInfo, ChatCompletionResponse
+    ModelMessage, AIModelInfo, AIProviderInfo, ChatCompletionResponse, ChatCompletionChunk, EmbeddingRequest, \
+    EmbeddingResponse
 from geenii.provider.geenii.provider import GeeniiProvider
 from geenii.provider.interfaces import AICompletionProvider, AIProvider, AIImageGeneratorProvider, \
-    AISpeechGeneratorProvider, AIAudioTranscriptionProvider, AIAudioTranslationProvider, AIChatCompletionProvider
+    AISpeechGeneratorProvider, AIAudioTranscriptionProvider, AIAudioTranslationProvider, AIChatCompletionProvider, \
+    AsyncAIChatCompletionProvider, AIEmbeddingProvider
 
 from geenii.provider.ollama.provider import OllamaAIProvider
 from geenii.provider.openai.provider import OpenAIProvider
+from geenii.provider.catalog import ModelCatalog
+from geenii.provider.registry import ProviderRegistry
+from geenii.provider.warmup import ModelWarmup
+from geenii.tokenizer import token_counter
 from geenii.tool.registry import ToolRegistry
-from geenii.utils.cached import cached
-from geenii.utils.json_util import append_jsonl
+from geenii.utils.log_sink import JsonlLogSink
+from geenii.utils.singleflight import SingleFlight, AsyncSingleFlight
 
 type AIProviderType = AICompletionProvider | AIImageGeneratorProvider | AISpeechGeneratorProvider \
                       | AIAudioTranscriptionProvider | AIAudioTranslationProvider | AIProvider
 
+# Process-wide pool of provider instances.
+# Providers are keyed by name and a fingerprint of the config values they depend on.
+provider_registry = ProviderRegistry(max_size=config.AI_PROVIDER_POOL_SIZE,
+                                     close_delay=config.AI_PROVIDER_CLOSE_DELAY)
+provider_registry.register("geenii", GeeniiProvider)
+provider_registry.register("ollama", OllamaAIProvider, config_keys=("OLLAMA_HOSTS", "OLLAMA_API_KEY"))
+provider_registry.register("openai", OpenAIProvider, config_keys=("OPENAI_API_KEY",))
+
+# AI request/response and usage logs are written by a background writer thread.
+ai_log_sink = JsonlLogSink(
+    max_queue_size=config.AI_LOG_QUEUE_SIZE,
+    batch_size=config.AI_LOG_BATCH_SIZE,
+    flush_interval=config.AI_LOG_FLUSH_INTERVAL,
+    max_bytes=config.AI_LOG_MAX_BYTES or None,
+    policy=config.AI_LOG_OVERFLOW_POLICY,
+    compress=config.AI_LOG_COMPRESS,
+)
+
+# Cached model lists of all providers.
+model_catalog = ModelCatalog(
+    provider_names=lambda: [provider_info.name for provider_info in enumerate_providers()],
+    get_provider=lambda name: get_ai_provider(name),
+    ttl=config.MODEL_CATALOG_TTL,
+    provider_ttls=config.MODEL_CATALOG_PROVIDER_TTLS,
+    error_ttl=config.MODEL_CATALOG_ERROR_TTL,
+    fetch_timeout=config.MODEL_CATALOG_FETCH_TIMEOUT,
+)
+
+# Preloads models and tracks model load durations (cold starts).
+model_warmup = ModelWarmup(
+    get_provider=lambda model_id: get_ai_provider_from_model_id(model_id),
+    models=config.WARMUP_MODELS,
+    keep_alive=config.WARMUP_KEEP_ALIVE,
+    cold_start_threshold=config.WARMUP_COLD_START_THRESHOLD,
+)
+
+# Concurrency limits per provider/model, with priority queueing of the requests above the limit.
+admission = AdmissionController(
+    limits=config.ADMISSION_LIMITS,
+    queue_timeouts=config.ADMISSION_QUEUE_TIMEOUTS,
+    reserved_interactive=config.ADMISSION_RESERVED_INTERACTIVE,
+)
+
+# Concurrent identical chat completions share one in-flight provider call.
+chat_completion_flights = SingleFlight()
+async_chat_completion_flights = AsyncSingleFlight()
+
 
 #@cached(ttl=3600)
 def enumerate_providers() -> list[AIProviderInfo]:
@@ -43,21 +103,15 @@ def enumerate_providers() -> list[AIProviderInfo]:
     return providers
 
 
-@cached(ttl=3600)
-def enumerate_models() -> list[AIModelInfo]:
+def enumerate_models(refresh: bool = False) -> list[AIModelInfo]:
     """
     Enumerate all available models from all providers.
+    Served from the model catalogue, which refreshes expired provider model lists in the background.
 
+    :param refresh: Force a refresh of all provider model lists.
     :return: A list of available models
     """
-    models = []
-    for provider_info in enumerate_providers():
-        ai_provider = get_ai_provider(provider_info.name)
-        if ai_provider.is_configured():
-            provider_models = ai_provider.get_models()
-            for model in provider_models:
-                models.append(model)
-    return models
+    return model_catalog.list_models(refresh=refresh)
 
 
 def split_model(model_id: str) -> tuple[str, str]:
@@ -114,19 +168,16 @@ def get_ai_provider(provider: str) -> AIProviderType:
     # except ImportError as e:
     #     raise ImportError(f"Could not import provider '{provider}': {str(e)}")
 
-    if provider.lower() == "geenii":
-        _ai = GeeniiProvider()
-    elif provider.lower() == "ollama":
-        _ai = OllamaAIProvider()
-    elif provider.lower() == "openai":
-        _ai = OpenAIProvider()
-    elif provider.lower() == "anthropic":
+    if provider.lower() == "anthropic":
         raise NotImplementedError("Anthropic provider is not implemented yet.")
     elif provider.lower() == "openrouter":
         raise NotImplementedError("OpenRouter provider is not implemented yet.")
-    else:
+    elif not provider_registry.has(provider):
         raise ValueError(f"Unsupported provider: {provider}")
 
+    # re-use the pooled, long-lived provider instance (and its HTTP connection pool)
+    _ai = provider_registry.get(provider)
+
     # check if the provider supports the requested interface
     # the interface is the module name of the provider interface
     #if iface is not None and not isinstance(_ai, iface):
@@ -134,6 +185,19 @@ def get_ai_provider(provider: str) -> AIProviderType:
     return _ai
 
 
+def invalidate_ai_providers(provider: str = None) -> int:
+    """
+    Drop pooled AI provider instances, e.g. after the provider configuration changed.
+    The next call to `get_ai_provider` creates a fresh provider instance, the dropped instances are closed
+    after the close delay of the provider registry.
+
+    :param provider: The name of the AI provider to invalidate. Invalidates all providers if None.
+    :return: The number of invalidated provider instances.
+    """
+    model_catalog.invalidate(provider)
+    return provider_registry.invalidate(provider)
+
+
 def get_ai_provider_from_model_id(model_id: str, iface = None) -> tuple[AIProviderType, str, str]:
     """
     Get the AI provider instance based on the model ID.
@@ -181,6 +245,13 @@ def get_ai_audio_translation_provider(model_id: str) -> tuple[AIAudioTranslation
     return get_ai_provider_from_model_id(model_id, AIAudioTranslationProvider)
 
 
+def get_ai_embedding_provider(model_id: str) -> tuple[AIEmbeddingProvider, str, str]:
+    """
+    Get the AI embedding provider instance based on the provider name.
+    """
+    return get_ai_provider_from_model_id(model_id, AIEmbeddingProvider)
+
+
 def generate_completion(model: str, prompt: str, stream: bool = False, **kwargs) -> CompletionResponse:
     """
     Generate a completion using the specified AI provider and model.
@@ -251,29 +322,178 @@ def generate_chat_completion(request: ChatCompletionRequest, tool_registry: Tool
     Generate an assistant completion using the specified AI provider and model.
     """
     try:
-        ai, provider_name, model_name = get_ai_completion_provider(request.model)
-        if not isinstance(ai, AIChatCompletionProvider):
-            raise RuntimeError(f"Invalid AI provider: {provider_name} does not support assistant completions.")
+        ai, provider_name, model_name = _prepare_chat_completion(request)
 
-        # enforce a context ID for all chat completions, if not provided in the request, generate a new one
-        if not request.context_id:
-            request.context_id = str(uuid.uuid4())
-        _ai_log("completion.request", request)
+        cached_response = completion_cache.get(request)
+        if cached_response is not None:
+            return _finalize_chat_completion(request, cached_response, provider_name, model_name, tool_registry)
 
         # generate completion
-        response = ai.generate_chat_completion(request, tool_registry=tool_registry)
-
-        # pass through context ID from request to response, if not set by the provider implementation
-        response.context_id = response.context_id or request.context_id
-        _ai_log("completion.response", response)
-        _ai_usage_log(provider_name, model_name, response.context_id, response.usage or {})
-        return response
+        def generate() -> ChatCompletionResponse:
+            with admission.admit(provider_name, model_name, request.priority):
+                _response = ai.generate_chat_completion(request, tool_registry=tool_registry)
+            completion_cache.put(request, _response)
+            return _response
+
+        if _is_coalescable(request):
+            response, shared = chat_completion_flights.do(_coalescing_key(request, tool_registry), generate)
+            response = _copy_coalesced_response(response, shared)
+        else:
+            response = generate()
+        return _finalize_chat_completion(request, response, provider_name, model_name, tool_registry)
     except Exception as e:
         print(f"Error in {request.model} assistant API: {str(e)}")
         #return ErrorApiResponse(error=str(e))
         raise e
 
 
+async def agenerate_chat_completion(request: ChatCompletionRequest, tool_registry: ToolRegistry = None) -> ChatCompletionResponse:
+    """
+    Generate an assistant completion using the specified AI provider and model, without blocking the event loop.
+
+    Providers implementing AsyncAIChatCompletionProvider are awaited directly,
+    other providers are run in the default thread pool executor.
+    """
+    try:
+        ai, provider_name, model_name = _prepare_chat_completion(request)
+
+        cached_response = await completion_cache.aget(request)
+        if cached_response is not None:
+            return _finalize_chat_completion(request, cached_response, provider_name, model_name, tool_registry)
+
+        # generate completion
+        async def generate() -> ChatCompletionResponse:
+            async with admission.aadmit(provider_name, model_name, request.priority):
+                if isinstance(ai, AsyncAIChatCompletionProvider):
+                    _response = await ai.agenerate_chat_completion(request, tool_registry=tool_registry)
+                else:
+                    _response = await asyncio.to_thread(ai.generate_chat_completion, request,
+                                                        tool_registry=tool_registry)
+            await completion_cache.aput(request, _response)
+            return _response
+
+        if _is_coalescable(request):
+            response, shared = await async_chat_completion_flights.do(_coalescing_key(request, tool_registry),
+                                                                      generate)
+            response = _copy_coalesced_response(response, shared)
+        else:
+            response = await generate()
+        return _finalize_chat_completion(request, response, provider_name, model_name, tool_registry)
+    except Exception as e:
+        print(f"Error in {request.model} assistant API: {str(e)}")
+        raise e
+
+
+def _prepare_chat_completion(request: ChatCompletionRequest) -> tuple[AIChatCompletionProvider, str, str]:
+    """Resolve the chat completion provider for the request and log the request."""
+    ai, provider_name, model_name = get_ai_completion_provider(request.model)
+    if not isinstance(ai, AIChatCompletionProvider):
+        raise RuntimeError(f"Invalid AI provider: {provider_name} does not support assistant completions.")
+
+    # enforce a context ID for all chat completions, if not provided in the request, generate a new one
+    if not request.context_id:
+        request.context_id = str(uuid.uuid4())
+    _ai_log("completion.request", request)
+    return ai, provider_name, model_name
+
+
+def _is_coalescable(request: ChatCompletionRequest) -> bool:
+    """Requests bypassing the completion cache ask for a fresh response and are never coalesced."""
+    return config.COMPLETION_COALESCING_ENABLED and request.cache is not False
+
+
+def _coalescing_key(request: ChatCompletionRequest, tool_registry: ToolRegistry = None) -> str:
+    # requests are only coalesced within the same priority class, so interactive requests never wait behind queued background requests.
+    # The request key only covers the tool names, the tools are resolved by the (version of the) tool registry
+    tools = f"{id(tool_registry)}.{tool_registry.version}" if tool_registry is not None else "-"
+    return f"{current_priority(request.priority).name}:{tools}:{request_cache_key(request)}"
+
+
+def _copy_coalesced_response(response: ChatCompletionResponse, shared: bool) -> ChatCompletionResponse:
+    """
+    Copy the response of a coalesced call, so each caller can own and finalize it.
+    The response of the call is shared by all callers, and is never modified.
+    """
+    update = {"id": uuid.uuid4().hex, "context_id": None} if shared else {}
+    response = response.model_copy(deep=True, update=update)
+    if shared:
+        response.usage = {**(response.usage or {}), "coalesced": True}
+    return response
+
+
+def chat_completion_metrics() -> dict:
+    """Runtime metrics of the chat completion pipeline."""
+    sync_stats = chat_completion_flights.stats()
+    async_stats = async_chat_completion_flights.stats()
+    return {
+        "coalescing": {
+            "enabled": config.COMPLETION_COALESCING_ENABLED,
+            **{k: sync_stats[k] + async_stats[k] for k in sync_stats},
+        },
+        "admission": admission.stats(),
+        "completion_cache": completion_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "tokenizer": token_counter.stats(),
+        "prompt_prefix": prompt_prefix_tracker.stats(),
+        "log_sink": ai_log_sink.stats(),
+        "providers": provider_registry.status(),
+        "model_catalog": model_catalog.status(),
+        "model_warmup": model_warmup.stats(),
+    }
+
+
+def _finalize_chat_completion(request: ChatCompletionRequest, response: ChatCompletionResponse,
+                              provider_name: str, model_name: str,
+                              tool_registry: ToolRegistry | None = None) -> ChatCompletionResponse:
+    """Post-process and log the chat completion response."""
+    # pass through context ID from request to response, if not set by the provider implementation
+    response.context_id = response.context_id or request.context_id
+    prompt_prefix_tracker.record(request, response.usage, tool_registry)
+    _ai_log("completion.response", response)
+    _ai_usage_log(provider_name, model_name, response.context_id, response.usage or {})
+    model_warmup.record(provider_name, model_name, response.usage or {})
+    context_builder.calibrate(request, response.usage or {}, tool_registry)
+    return response
+
+
+async def stream_chat_completion(request: ChatCompletionRequest, tool_registry: ToolRegistry = None) \
+        -> AsyncGenerator[ChatCompletionChunk, None]:
+    """
+    Stream an assistant completion using the specified AI provider and model.
+    Yields incremental output deltas, the last chunk carries the aggregated response.
+    """
+    try:
+        ai, provider_name, model_name = _prepare_chat_completion(request)
+
+        cached_response = await completion_cache.aget(request)
+        if cached_response is not None:
+            # replay the cached response as a single final chunk
+            response = _finalize_chat_completion(request, cached_response, provider_name, model_name, tool_registry)
+            yield ChatCompletionChunk(id=response.id, model=response.model, context_id=response.context_id,
+                                      delta=[part for part in response.output or []
+                                             if part.type in ("text", "tool_call")],
+                                      reasoning_delta=response.reasoning_output, done=True, response=response)
+            return
+
+        # the concurrency slot is held until the stream is complete
+        async with admission.aadmit(provider_name, model_name, request.priority):
+            async for chunk in ai.stream_chat_completion(request, tool_registry=tool_registry):
+                # pass through context ID from request to response, if not set by the provider implementation
+                chunk.context_id = chunk.context_id or request.context_id
+                if chunk.response is not None:
+                    await completion_cache.aput(request, chunk.response)
+                    chunk.response.context_id = chunk.response.context_id or request.context_id
+                    prompt_prefix_tracker.record(request, chunk.response.usage, tool_registry)
+                    _ai_log("completion.response", chunk.response)
+                    _ai_usage_log(provider_name, model_name, chunk.response.context_id, chunk.response.usage or {})
+                    model_warmup.record(provider_name, model_name, chunk.response.usage or {})
+                    context_builder.calibrate(request, chunk.response.usage or {}, tool_registry)
+                yield chunk
+    except Exception as e:
+        print(f"Error in {request.model} assistant streaming API: {str(e)}")
+        raise e
+
+
 def generate_image(request: ImageGenerationApiRequest) -> ImageGenerationApiResponse | CompletionErrorResponse:
     """
     Generate an image using the specified AI provider and model.
@@ -325,25 +545,76 @@ def generate_audio_transcription(request: AudioTranscriptionApiRequest) -> Audio
         return CompletionErrorResponse(error=str(e))
 
 
+def generate_embeddings(request: EmbeddingRequest) -> EmbeddingResponse | CompletionErrorResponse:
+    """
+    Embed a batch of texts using the specified AI provider and model.
+
+    Identical inputs are embedded once, cached vectors are served from the embedding cache,
+    and the remaining inputs are split into batches within the provider's batch size limit.
+    """
+    try:
+        ai, provider_name, model_name = get_ai_embedding_provider(request.model)
+        if not isinstance(ai, AIEmbeddingProvider):
+            raise RuntimeError(f"Invalid AI: {provider_name} provider does not support embeddings.")
+
+        inputs = [request.input] if isinstance(request.input, str) else list(request.input)
+        unique = list(dict.fromkeys(inputs))
+        cache_model = f"{request.model}@{request.dimensions}" if request.dimensions else request.model
+        use_cache = request.cache is not False and config.EMBEDDING_CACHE_ENABLED and not config.CACHE_DISABLED
+        vectors = embedding_cache.get_many(cache_model, unique) if use_cache else {}
+        missing = [text for text in unique if text not in vectors]
+
+        usage = {"input_tokens": 0}
+        batch_size = max(ai.MAX_EMBEDDING_BATCH_SIZE, 1)
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            with admission.admit(provider_name, model_name, request.priority):
+                result = ai.generate_embeddings(model=model_name, inputs=batch, dimensions=request.dimensions)
+            if len(result.embeddings or []) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} embeddings, received {len(result.embeddings or [])}")
+            batch_vectors = dict(zip(batch, result.embeddings))
+            if use_cache:
+                # return the vectors as stored in the cache, so later cache hits return the same vectors
+                batch_vectors = embedding_cache.put_many(cache_model, batch_vectors)
+            vectors.update(batch_vectors)
+            usage["input_tokens"] += (result.usage or {}).get("input_tokens", 0)
+
+        usage.update({"inputs": len(inputs), "unique_inputs": len(unique), "cached_inputs": len(unique) - len(missing),
+                      "cache": "hit" if not missing else "miss" if use_cache else "bypass"})
+        if missing:
+            _ai_usage_log(provider_name, model_name, None, usage)
+        return EmbeddingResponse(
+            id=uuid.uuid4().hex,
+            timestamp=int(datetime.now().timestamp()),
+            model=request.model,
+            embeddings=[vectors[text] for text in inputs],
+            usage=usage,
+        )
+    except Exception as e:
+        return CompletionErrorResponse(error=str(e))
+
+
 def _ai_log(what: str, data: dict | pydantic.BaseModel):
     date_formatted = datetime.now().strftime("%Y-%m-%d")
     log_file = f"{DATA_DIR}/logs/ai-{date_formatted}.log"
-    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
     if isinstance(data, pydantic.BaseModel):
-        data = data.model_dump(mode="json")
-    append_jsonl(log_file, {f"{what}": data})
+        # serialized by the log writer thread. The snapshot copies the model and its top-level containers
+        # (e.g. the usage dict, the messages and output lists), which callers keep updating,
+        # the parts within are not mutated once created
+        data = data.model_copy(update={name: value.copy() for name, value in data.__dict__.items()
+                                       if isinstance(value, (dict, list, set))})
+    ai_log_sink.write("ai", log_file, {f"{what}": data})
 
 
 def _ai_usage_log(provider: str, model: str, context_id: str, usage: dict):
     """Log AI usage data to a file for tracking and analysis."""
     date_formatted = datetime.now().strftime("%Y-%m")
     log_file = f"{DATA_DIR}/logs/ai-usage-{date_formatted}.log"
-    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
     log_entry = {
         "timestamp": datetime.now().isoformat(),
         "provider": provider,
         "context_id": context_id,
         "model": model,
-        "usage": usage
+        "usage": dict(usage)
     }
-    append_jsonl(log_file, log_entry)
\ No newline at end of file
+    ai_log_sink.write("ai-usage", log_file, log_entry)
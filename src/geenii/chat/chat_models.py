@@ -60,6 +60,17 @@ class ToolCallContent(BaseContent):
         return f"Tool call request (call_id={self.call_id}): {self.name}({args_str})]"
 
 
+class ToolCallDeltaContent(BaseContent):
+    """Partial tool call emitted while streaming a chat completion. Not persisted in chat memory."""
+    type: Literal["tool_call_delta"] = "tool_call_delta"
+    call_id: str | None = None
+    name: str | None = None
+    arguments_delta: str = ""  # Raw (partial) JSON fragment of the tool call arguments
+
+    def to_text(self) -> str:
+        return f"Tool call delta (call_id={self.call_id}): {self.name}: {self.arguments_delta}"
+
+
 class ToolCallResultContent(BaseContent):
     type: Literal["tool_call_result"] = "tool_call_result"
     call_id: str | None = None
@@ -0,0 +1,174 @@
+"""
+Chat memory compaction.
+
+Once the history of a conversation exceeds a token threshold, the older turns are summarized
+with a (cheap) summary model. The summary is stored as a pinned message (`type="summary"`, role "system"),
+which the context builder always includes, and the summarized messages are moved to the archive storage
+of the chat memory.
+
+Compaction runs in the background after a response has been sent (see `MemoryCompactor.schedule`),
+it never blocks a user turn. It is disabled by default, see `GEENII_COMPACTION_THRESHOLD_TOKENS`.
+"""
+
+import asyncio
+import logging
+
+from geenii import config
+from geenii.ai import agenerate_chat_completion
+from geenii.chat.chat_models import TextContent
+from geenii.context import ContextBuilder, context_builder
+from geenii.datamodels import ModelMessage, ChatCompletionRequest
+from geenii.memory import ChatMemory, chat_memories
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """You summarize conversations between a user and an AI assistant.
+Write a concise summary of the conversation, which replaces the conversation in the assistant's memory.
+Keep all facts, decisions, open questions, user preferences and results of tool calls that may be needed later.
+If a previous summary is given, merge it into the new summary.
+Only output the summary."""
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+class MemoryCompactor:
+    """
+    Summarizes and archives the older messages of chat memories.
+
+    :param model: The model used for summarization.
+    :param threshold_tokens: Compact a memory once its messages exceed this number of tokens.
+    :param keep_tokens: Tokens of the most recent messages which are kept verbatim.
+    :param builder: The context builder used to count tokens and to select the kept messages.
+    """
+
+    def __init__(self, model: str, threshold_tokens: int, keep_tokens: int,
+                 builder: ContextBuilder | None = None) -> None:
+        self.model = model
+        self.threshold_tokens = threshold_tokens
+        self.keep_tokens = keep_tokens
+        self.builder = builder or context_builder
+        self._running: dict[str, asyncio.Task] = {}
+        self._stats = {"compactions": 0, "failures": 0, "archived_messages": 0}
+
+    def needs_compaction(self, memory: ChatMemory, model: str | None = None) -> bool:
+        """True if the messages of the memory exceed the token threshold."""
+        if self.threshold_tokens <= 0:
+            return False
+        # count the tokens of a growing tail of the memory, until the threshold is exceeded,
+        # so the check reads a few messages instead of the whole history
+        length = len(memory)
+        n = 16
+        while True:
+            if sum(self.builder.count_messages(model, memory.tail(min(n, length)))) > self.threshold_tokens:
+                return True
+            if n >= length:
+                return False
+            n *= 4
+
+    def schedule(self, context_id: str, memory: ChatMemory, model: str | None = None) -> asyncio.Task | None:
+        """
+        Compact the memory in the background, if it exceeds the token threshold.
+        At most one compaction per context runs at a time.
+        The threshold is checked by the background task, in a thread, between the turns of the conversation.
+
+        :param context_id: The context ID of the conversation.
+        :param memory: The chat memory.
+        :param model: The model of the conversation, used to count the tokens.
+        """
+        if context_id in self._running or self.threshold_tokens <= 0:
+            return None
+        task = asyncio.create_task(self._run(context_id, memory, model))
+        self._running[context_id] = task
+        return task
+
+    async def _run(self, context_id: str, memory: ChatMemory, model: str | None) -> None:
+        try:
+            async with chat_memories.lock(context_id):
+                needed = await asyncio.to_thread(self.needs_compaction, memory, model)
+            if needed:
+                await self.compact(memory, model, context_id=context_id)
+        except Exception as e:
+            self._stats["failures"] += 1
+            logger.exception(f"Failed to compact chat memory of context {context_id}", exc_info=e)
+        finally:
+            self._running.pop(context_id, None)
+
+    async def compact(self, memory: ChatMemory, model: str | None = None,
+                      context_id: str | None = None) -> ModelMessage | None:
+        """
+        Summarize the older messages of the memory and replace them with the summary.
+
+        :param context_id: The context ID of the conversation. The memory is rewritten while holding its lock.
+        :return: The summary message, or None if there was nothing to compact.
+        """
+        # the memory is read and rewritten in a thread, the file or database I/O does not block the event loop
+        messages = await asyncio.to_thread(lambda: list(memory.messages))
+        previous_summary = next((m for m in reversed(messages) if m.type == "summary"), None)
+        history = [m for m in messages if m.type != "summary"]
+
+        # the most recent messages within keep_tokens are kept verbatim, the older messages are summarized
+        window = self.builder.build(model, history, budget=self.keep_tokens)
+        if not window.dropped:
+            return None
+
+        summary_text = previous_summary.to_text().removeprefix(SUMMARY_PREFIX) if previous_summary else None
+        for chunk in self._chunks(window.dropped, summary_text):
+            summary_text = await self._summarize(chunk, summary_text)
+
+        summary = ModelMessage(type="summary", role="system",
+                               content=[TextContent(text=SUMMARY_PREFIX + summary_text)])
+        if context_id:
+            async with chat_memories.lock(context_id):
+                await asyncio.to_thread(memory.compact, summary, window.dropped)
+        else:
+            await asyncio.to_thread(memory.compact, summary, window.dropped)
+        self._stats["compactions"] += 1
+        self._stats["archived_messages"] += len(window.dropped)
+        logger.info(f"Compacted {len(window.dropped)} messages into a summary of "
+                    f"{self.builder.count_tokens(model, summary_text)} tokens")
+        return summary
+
+    def _chunks(self, messages: list[ModelMessage], summary_text: str | None) -> list[list[ModelMessage]]:
+        # split the messages into chunks which fit into the context window of the summary model,
+        # each chunk is summarized together with the summary of the previous chunks
+        budget = self.builder.budget(self.model) - self.builder.count_tokens(self.model, SUMMARY_SYSTEM_PROMPT)
+        budget = max(budget - self.builder.count_tokens(self.model, summary_text or "") * 2, budget // 2)
+        chunks: list[list[ModelMessage]] = [[]]
+        used = 0
+        for message, tokens in zip(messages, self.builder.count_messages(self.model, messages)):
+            if chunks[-1] and used + tokens > budget:
+                chunks.append([])
+                used = 0
+            chunks[-1].append(message)
+            used += tokens
+        return chunks
+
+    async def _summarize(self, messages: list[ModelMessage], previous_summary: str | None) -> str:
+        transcript = "\n\n".join(f"{message.role.upper()}: {message.to_text()}" for message in messages)
+        prompt = f"Previous summary:\n{previous_summary}\n\n" if previous_summary else ""
+        prompt += f"Conversation:\n{transcript}"
+        request = ChatCompletionRequest(
+            model=self.model,
+            system=[SUMMARY_SYSTEM_PROMPT],
+            prompt=prompt,
+            temperature=0.0,
+            cache=False,
+            priority="scheduled",
+        )
+        response = await agenerate_chat_completion(request)
+        if response.error:
+            raise RuntimeError(f"Summary model returned an error: {response.error}")
+        text = "\n".join(part.text for part in response.output or [] if isinstance(part, TextContent))
+        if not text.strip():
+            raise RuntimeError("Summary model returned an empty summary")
+        return text.strip()
+
+    def stats(self) -> dict:
+        return {**self._stats, "running": len(self._running)}
+
+
+memory_compactor = MemoryCompactor(
+    model=config.COMPACTION_MODEL,
+    threshold_tokens=config.COMPACTION_THRESHOLD_TOKENS,
+    keep_tokens=config.COMPACTION_KEEP_TOKENS,
+)
@@ -0,0 +1,158 @@
+"""Persistent response cache for chat completions."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from geenii import config
+from geenii.datamodels import ChatCompletionRequest, ChatCompletionResponse
+from geenii.utils.cached import SqliteCacheStore
+
+logger = logging.getLogger(__name__)
+
+# Request fields that do not influence the model output
+_NON_SEMANTIC_FIELDS = {"context_id", "stream", "cache", "priority"}
+# Message fields that are generated per message instance
+_NON_SEMANTIC_MESSAGE_FIELDS = {"id", "timestamp"}
+
+
+def request_cache_key(request: ChatCompletionRequest) -> str:
+    """
+    Compute a canonical hash of the chat completion request.
+
+    The key covers everything that influences the model output (model, system prompts, prompt,
+    messages, tools, output format/schema and model parameters), but ignores per-request
+    identifiers like the context ID or the generated message IDs and timestamps.
+    """
+    data = request.model_dump(
+        mode="json",
+        exclude=_NON_SEMANTIC_FIELDS | {"messages"},
+    )
+    data["tools"] = sorted(request.tools or [])
+    data["messages"] = [m.model_dump(mode="json", exclude=_NON_SEMANTIC_MESSAGE_FIELDS)
+                        for m in request.messages or []]
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return "chat:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_deterministic_request(request: ChatCompletionRequest) -> bool:
+    """A request is deterministic if it is sampled with temperature 0."""
+    temperature = (request.model_parameters or {}).get("temperature", request.temperature)
+    return temperature is not None and float(temperature) == 0.0
+
+
+class CompletionCache:
+    """
+    Cache for chat completion responses, keyed by `request_cache_key`.
+
+    Only deterministic requests (temperature 0) are cached by default, and only if the cache is enabled.
+    Requests can opt in (`request.cache=True`) or bypass the cache (`request.cache=False`) explicitly.
+    The cache status is reported in `response.usage["cache"]` as "hit", "miss" or "bypass".
+    Coroutines use `aget` and `aput`, which run the store I/O in a thread.
+
+    The store must provide: store.read_cache(key), store.write_cache(key, value, ttl=None).
+    """
+
+    def __init__(self, store=None, ttl: float | None = None, enabled: bool | None = None) -> None:
+        self._store = store
+        self._store_lock = threading.Lock()
+        self.ttl = ttl if ttl is not None else config.COMPLETION_CACHE_TTL
+        self._enabled = enabled
+        self._stats = {"hit": 0, "miss": 0, "bypass": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled if self._enabled is not None else config.COMPLETION_CACHE_ENABLED
+
+    @property
+    def store(self):
+        # the default store is created lazily, the cache directory may not exist at import time
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    Path(config.CACHE_DIR).mkdir(parents=True, exist_ok=True)
+                    self._store = SqliteCacheStore(f"{config.CACHE_DIR}/completions.sqlite",
+                                                   max_entries=config.COMPLETION_CACHE_MAX_ENTRIES)
+        return self._store
+
+    def is_cacheable(self, request: ChatCompletionRequest) -> bool:
+        if request.cache is False or config.CACHE_DISABLED:
+            return False
+        if request.cache is True:
+            return True
+        return self.enabled and is_deterministic_request(request)
+
+    def get(self, request: ChatCompletionRequest) -> ChatCompletionResponse | None:
+        """Return a copy of the cached response for the request, or None."""
+        if not self.is_cacheable(request):
+            return None
+        return self._hit(request, self._read(request_cache_key(request)))
+
+    async def aget(self, request: ChatCompletionRequest) -> ChatCompletionResponse | None:
+        """Like `get`, without blocking the event loop."""
+        if not self.is_cacheable(request):
+            return None
+        return self._hit(request, await asyncio.to_thread(self._read, request_cache_key(request)))
+
+    def put(self, request: ChatCompletionRequest, response: ChatCompletionResponse) -> None:
+        """Store the response for the request, if cacheable, and record the cache status in the response usage."""
+        data = self._miss(request, response)
+        if data is not None:
+            self._write(request_cache_key(request), data)
+
+    async def aput(self, request: ChatCompletionRequest, response: ChatCompletionResponse) -> None:
+        """Like `put`, without blocking the event loop."""
+        data = self._miss(request, response)
+        if data is not None:
+            await asyncio.to_thread(self._write, request_cache_key(request), data)
+
+    def _read(self, key: str) -> dict | None:
+        try:
+            return self.store.read_cache(key)
+        except Exception as e:
+            logger.warning(f"Completion cache read failed: {e}")
+            return None
+
+    def _write(self, key: str, data: dict) -> None:
+        try:
+            self.store.write_cache(key, data, ttl=self.ttl)
+        except Exception as e:
+            logger.warning(f"Completion cache write failed: {e}")
+
+    def _hit(self, request: ChatCompletionRequest, data: dict | None) -> ChatCompletionResponse | None:
+        if data is None:
+            return None
+        response = ChatCompletionResponse.model_validate(data)
+        response.id = uuid.uuid4().hex
+        response.timestamp = int(time.time())
+        response.usage = {**(response.usage or {}), "cache": "hit"}
+        self._count("hit")
+        logger.debug(f"Completion cache hit for {request.model}")
+        return response
+
+    def _miss(self, request: ChatCompletionRequest, response: ChatCompletionResponse) -> dict | None:
+        # record the cache status, and return the data to store, or None if the response is not cached
+        if not self.is_cacheable(request) or response.error:
+            response.usage = {**(response.usage or {}), "cache": "bypass"}
+            self._count("bypass")
+            return None
+        response.usage = {**(response.usage or {}), "cache": "miss"}
+        self._count("miss")
+        return response.model_dump(mode="json", exclude={"context_id"})
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"enabled": self.enabled, "ttl": self.ttl, **self._stats}
+
+    def _count(self, status: str) -> None:
+        with self._stats_lock:
+            self._stats[status] += 1
+
+
+completion_cache = CompletionCache()
@@ -24,6 +24,9 @@ MCP_CONFIG_FILE="mcp.json"
 #DEFAULT_COMPLETION_MODEL= "openai:gpt-4o-mini"
 DEFAULT_COMPLETION_MODEL="ollama:qwen3:8b"
 
+# Embeddings
+DEFAULT_EMBEDDING_MODEL = os.environ.get("GEENII_DEFAULT_EMBEDDING_MODEL", "ollama:nomic-embed-text")
+
 # Image generation
 #DEFAULT_IMAGE_GENERATION_MODEL="stable-diffusion:stable-diffusion:latest" # need GPU
 DEFAULT_IMAGE_GENERATION_MODEL="openai:dall-e-2"
@@ -42,6 +45,185 @@ ANTHROPIC_API_KEY=os.environ.get("ANTHROPIC_API_KEY", "")
 
 OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")  # default Ollama API endpoint
 OLLAMA_API_KEY = os.environ.get("OLLAMA_API_KEY", "")
+# Pool of Ollama hosts (comma-separated), requests are routed by model residency, load and health
+OLLAMA_HOSTS = [host.strip() for host in os.environ.get("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if host.strip()]
+# Consecutive host errors before a host is taken out of rotation, and for how long (seconds)
+OLLAMA_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("GEENII_OLLAMA_CIRCUIT_FAILURE_THRESHOLD", "3"))
+OLLAMA_CIRCUIT_COOLDOWN = float(os.environ.get("GEENII_OLLAMA_CIRCUIT_COOLDOWN", "30"))
+# Interval for polling the loaded models (/api/ps) of the Ollama hosts
+OLLAMA_RESIDENCY_INTERVAL = float(os.environ.get("GEENII_OLLAMA_RESIDENCY_INTERVAL", "10"))
+
+# Token counting
+# Directory of the tokenizer files (tiktoken BPE files and Hugging Face tokenizer.json files)
+TOKENIZER_DIR = os.environ.get("GEENII_TOKENIZER_DIR", DATA_DIR + "/tokenizers")
+# Tokenizer files by model ID prefix ("openai=o200k_base.tiktoken,ollama:llama3=llama3/tokenizer.json")
+TOKENIZER_MODELS = {
+    prefix.strip(): file.strip()
+    for prefix, _, file in (item.partition("=") for item in
+                            os.environ.get("GEENII_TOKENIZER_MODELS", "openai=o200k_base.tiktoken").split(","))
+    if prefix.strip() and file.strip()
+}
+# Maximum number of cached token counts
+TOKENIZER_CACHE_SIZE = int(os.environ.get("GEENII_TOKENIZER_CACHE_SIZE", "10000"))
+
+# Context window
+# Context window size (tokens) by model ID prefix ("ollama=4096,openai=128000,ollama:qwen3=32768")
+CONTEXT_WINDOW_MODEL_TOKENS = {
+    prefix.strip(): int(tokens)
+    for prefix, _, tokens in (item.rpartition("=") for item in
+                              os.environ.get("GEENII_CONTEXT_WINDOW_MODEL_TOKENS",
+                                             "ollama=4096,openai=128000").split(","))
+    if prefix.strip() and tokens
+}
+# Context window size of models without a configured size
+CONTEXT_WINDOW_TOKENS = int(os.environ.get("GEENII_CONTEXT_WINDOW_TOKENS", "8192"))
+# Tokens of the context window reserved for the response
+CONTEXT_RESERVED_OUTPUT_TOKENS = int(os.environ.get("GEENII_CONTEXT_RESERVED_OUTPUT_TOKENS", "1024"))
+
+# Chat memory
+# Maximum number of recent messages read from the chat memory per request, before token budgeting
+CHAT_HISTORY_MAX_MESSAGES = int(os.environ.get("GEENII_CHAT_HISTORY_MAX_MESSAGES", "100"))
+# Maximum number of chat memories kept open, and the idle time (seconds) after which they are closed
+CHAT_MEMORY_CACHE_SIZE = int(os.environ.get("GEENII_CHAT_MEMORY_CACHE_SIZE", "256"))
+CHAT_MEMORY_IDLE_TTL = float(os.environ.get("GEENII_CHAT_MEMORY_IDLE_TTL", "1800"))
+# Chat memory backend: "file" (one JSONL file per context) or "sqlite" (one database for all contexts)
+CHAT_MEMORY_BACKEND = os.environ.get("GEENII_CHAT_MEMORY_BACKEND", "file").lower()
+CHAT_MEMORY_DB_PATH = os.environ.get("GEENII_CHAT_MEMORY_DB_PATH", DATA_DIR + "/sessions/chat_memory.sqlite")
+# Group commit of the SQLite backend: maximum messages per transaction, and maximum commit delay (seconds)
+CHAT_MEMORY_BATCH_SIZE = int(os.environ.get("GEENII_CHAT_MEMORY_BATCH_SIZE", "256"))
+CHAT_MEMORY_FLUSH_INTERVAL = float(os.environ.get("GEENII_CHAT_MEMORY_FLUSH_INTERVAL", "0.05"))
+
+# Chat memory compaction
+# Model used to summarize the older messages of a conversation
+COMPACTION_MODEL = os.environ.get("GEENII_COMPACTION_MODEL", DEFAULT_COMPLETION_MODEL)
+# Compact the chat memory once its messages exceed this number of tokens, e.g. 2400 (0 disables compaction)
+COMPACTION_THRESHOLD_TOKENS = int(os.environ.get("GEENII_COMPACTION_THRESHOLD_TOKENS", "0"))
+# Tokens of the most recent messages kept verbatim after a compaction
+COMPACTION_KEEP_TOKENS = int(os.environ.get("GEENII_COMPACTION_KEEP_TOKENS", "800"))
+
+# Vector long-term memory of agents (requires numpy, see the `vector` extra)
+VECTOR_MEMORY_ENABLED = os.environ.get("GEENII_VECTOR_MEMORY_ENABLED", "false").lower() == "true"
+VECTOR_MEMORY_DIR = os.environ.get("GEENII_VECTOR_MEMORY_DIR", DATA_DIR + "/vector_memory")
+VECTOR_MEMORY_EMBEDDING_MODEL = os.environ.get("GEENII_VECTOR_MEMORY_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+# Number of recalled memories per request, and their minimum cosine similarity
+VECTOR_MEMORY_TOP_K = int(os.environ.get("GEENII_VECTOR_MEMORY_TOP_K", "5"))
+VECTOR_MEMORY_MIN_SCORE = float(os.environ.get("GEENII_VECTOR_MEMORY_MIN_SCORE", "0.5"))
+# Number of inverted lists scanned per search (higher is more accurate and slower)
+VECTOR_MEMORY_NPROBE = int(os.environ.get("GEENII_VECTOR_MEMORY_NPROBE", "8"))
+# Token budget of the recent history sent with agent requests, when older turns are recalled from the vector memory
+VECTOR_MEMORY_HISTORY_TOKENS = int(os.environ.get("GEENII_VECTOR_MEMORY_HISTORY_TOKENS", "2048"))
+
+# Tool pre-selection
+# Agents with more allowed tools than this send only the tools most relevant to the prompt (0 disables pre-selection)
+TOOL_SEARCH_MIN_TOOLS = int(os.environ.get("GEENII_TOOL_SEARCH_MIN_TOOLS", "8"))
+# Maximum number of pre-selected tools sent to the model
+TOOL_SEARCH_TOP_K = int(os.environ.get("GEENII_TOOL_SEARCH_TOP_K", "5"))
+
+# MCP sessions
+# Maximum number of concurrent requests per MCP server session
+MCP_SESSION_MAX_CONCURRENCY = int(os.environ.get("GEENII_MCP_SESSION_MAX_CONCURRENCY", "4"))
+# Sessions unused for this time (seconds) are closed, and the interval (seconds) of the session health checks
+MCP_SESSION_IDLE_TIMEOUT = float(os.environ.get("GEENII_MCP_SESSION_IDLE_TIMEOUT", "600"))
+MCP_SESSION_HEALTH_CHECK_INTERVAL = float(os.environ.get("GEENII_MCP_SESSION_HEALTH_CHECK_INTERVAL", "60"))
+# Maximum time (seconds) to connect to an MCP server, and maximum delay (seconds) between reconnect attempts
+MCP_SESSION_CONNECT_TIMEOUT = float(os.environ.get("GEENII_MCP_SESSION_CONNECT_TIMEOUT", "30"))
+MCP_SESSION_BACKOFF_MAX = float(os.environ.get("GEENII_MCP_SESSION_BACKOFF_MAX", "60"))
+# Maximum time (seconds) the startup waits for the tool discovery of the MCP servers,
+# slower servers are registered in the background
+MCP_DISCOVERY_TIMEOUT = float(os.environ.get("GEENII_MCP_DISCOVERY_TIMEOUT", "10"))
+# Initial and maximum delay (seconds) between the discovery attempts of MCP servers which are not up yet
+MCP_DISCOVERY_RETRY_INTERVAL = float(os.environ.get("GEENII_MCP_DISCOVERY_RETRY_INTERVAL", "5"))
+MCP_DISCOVERY_RETRY_MAX = float(os.environ.get("GEENII_MCP_DISCOVERY_RETRY_MAX", "300"))
+
+# Admission control
+# Concurrency limits by provider or model ID ("ollama=2,openai=16,ollama:qwen3:8b=1"), unlimited if not set
+ADMISSION_LIMITS = {
+    key.strip(): int(limit)
+    for key, _, limit in (item.rpartition("=") for item in
+                          os.environ.get("GEENII_ADMISSION_LIMITS", "").split(","))
+    if key.strip() and limit
+}
+# Maximum queue wait (seconds) by priority class
+ADMISSION_QUEUE_TIMEOUTS = {
+    name.strip(): float(timeout)
+    for name, _, timeout in (item.partition("=") for item in
+                             os.environ.get("GEENII_ADMISSION_QUEUE_TIMEOUTS",
+                                            "interactive=60,agent=300,scheduled=900").split(","))
+    if name.strip() and timeout
+}
+# Concurrency slots per limit reserved for interactive requests
+ADMISSION_RESERVED_INTERACTIVE = int(os.environ.get("GEENII_ADMISSION_RESERVED_INTERACTIVE", "0"))
+
+# Fan-out chat completions
+# Delay (ms) without a first token after which a hedged request starts the next model
+FANOUT_HEDGE_DELAY_MS = int(os.environ.get("GEENII_FANOUT_HEDGE_DELAY_MS", "1500"))
+# Maximum time (seconds) a fan-out request waits for responses, and maximum number of models per request
+FANOUT_TIMEOUT = float(os.environ.get("GEENII_FANOUT_TIMEOUT", "300"))
+FANOUT_MAX_MODELS = int(os.environ.get("GEENII_FANOUT_MAX_MODELS", "8"))
+
+# Model warm-up
+# Models (comma-separated model IDs) preloaded at server startup and kept loaded by keep-alive pings
+WARMUP_MODELS = [m.strip() for m in os.environ.get("GEENII_WARMUP_MODELS", DEFAULT_COMPLETION_MODEL).split(",") if m.strip()]
+# How long a warmed up model stays loaded after a ping (Ollama keep_alive duration)
+WARMUP_KEEP_ALIVE = os.environ.get("GEENII_WARMUP_KEEP_ALIVE", "15m")
+# Keep-alive ping schedule (cron expression, UTC), defaults to every 5 minutes during business hours
+WARMUP_KEEP_ALIVE_CRON = os.environ.get("GEENII_WARMUP_KEEP_ALIVE_CRON", "*/5 7-18 * * 1-5")
+# Model load durations (ms) above this threshold are tracked as cold starts
+WARMUP_COLD_START_THRESHOLD = int(os.environ.get("GEENII_WARMUP_COLD_START_THRESHOLD", "500"))
+
+# AI provider pool settings
+# Maximum number of pooled provider instances (one per provider name and config)
+AI_PROVIDER_POOL_SIZE = int(os.environ.get("GEENII_AI_PROVIDER_POOL_SIZE", "16"))
+# Stale or evicted provider instances are closed after this delay (seconds), so in-flight requests can complete
+AI_PROVIDER_CLOSE_DELAY = float(os.environ.get("GEENII_AI_PROVIDER_CLOSE_DELAY", "600"))
+# Keep-alive connection pool limits for the provider HTTP clients
+AI_HTTP_MAX_CONNECTIONS = int(os.environ.get("GEENII_AI_HTTP_MAX_CONNECTIONS", "100"))
+AI_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("GEENII_AI_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+AI_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("GEENII_AI_HTTP_KEEPALIVE_EXPIRY", "300"))
+
+# Model catalogue
+# Default TTL of the cached provider model lists, and per-provider overrides ("ollama=300,openai=86400")
+MODEL_CATALOG_TTL = float(os.environ.get("GEENII_MODEL_CATALOG_TTL", "3600"))
+MODEL_CATALOG_PROVIDER_TTLS = {
+    name.strip(): float(ttl)
+    for name, _, ttl in (item.partition("=") for item in
+                         os.environ.get("GEENII_MODEL_CATALOG_PROVIDER_TTLS", "ollama=300").split(","))
+    if name.strip() and ttl
+}
+# Retry interval for providers that failed to list their models
+MODEL_CATALOG_ERROR_TTL = float(os.environ.get("GEENII_MODEL_CATALOG_ERROR_TTL", "60"))
+# Maximum time a model listing waits for providers without cached models
+MODEL_CATALOG_FETCH_TIMEOUT = float(os.environ.get("GEENII_MODEL_CATALOG_FETCH_TIMEOUT", "5"))
+
+# Chat completion response cache
+# Caches deterministic chat completions (temperature 0) and requests that explicitly opt in
+COMPLETION_CACHE_ENABLED = os.environ.get("GEENII_COMPLETION_CACHE_ENABLED", "false").lower() == "true"
+COMPLETION_CACHE_TTL = float(os.environ.get("GEENII_COMPLETION_CACHE_TTL", "86400"))
+COMPLETION_CACHE_MAX_ENTRIES = int(os.environ.get("GEENII_COMPLETION_CACHE_MAX_ENTRIES", "10000"))
+
+# Concurrent identical chat completions share one in-flight provider call
+COMPLETION_COALESCING_ENABLED = os.environ.get("GEENII_COMPLETION_COALESCING_ENABLED", "true").lower() == "true"
+
+# Embedding cache
+# Vectors are cached by model and input text hash, stored as "float16" (half the size) or "float32"
+EMBEDDING_CACHE_ENABLED = os.environ.get("GEENII_EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.environ.get("GEENII_EMBEDDING_CACHE_PATH", CACHE_DIR + "/embeddings.sqlite")
+EMBEDDING_CACHE_DTYPE = os.environ.get("GEENII_EMBEDDING_CACHE_DTYPE", "float16").lower()
+# Maximum number of cached vectors on disk, and in memory
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("GEENII_EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.environ.get("GEENII_EMBEDDING_CACHE_MEMORY_ENTRIES", "10000"))
+
+# AI request/usage log writer
+# Overflow policy when the log queue is full: "drop" records or "block" the caller
+AI_LOG_QUEUE_SIZE = int(os.environ.get("GEENII_AI_LOG_QUEUE_SIZE", "10000"))
+AI_LOG_BATCH_SIZE = int(os.environ.get("GEENII_AI_LOG_BATCH_SIZE", "256"))
+AI_LOG_FLUSH_INTERVAL = float(os.environ.get("GEENII_AI_LOG_FLUSH_INTERVAL", "1.0"))
+AI_LOG_MAX_BYTES = int(os.environ.get("GEENII_AI_LOG_MAX_BYTES", str(100 * 1024 * 1024)))
+AI_LOG_OVERFLOW_POLICY = os.environ.get("GEENII_AI_LOG_OVERFLOW_POLICY", "drop").lower()
+AI_LOG_COMPRESS = os.environ.get("GEENII_AI_LOG_COMPRESS", "false").lower() == "true"
+
+# Path to the SQLite database with the ingested AI usage records
+USAGE_DB_PATH = os.environ.get("GEENII_USAGE_DB_PATH", f"{DATA_DIR}/usage.db")
 
 # Database settings
 MONGODB_URI = os.environ.get("MONGODB_URI", "")
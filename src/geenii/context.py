@@ -0,0 +1,183 @@
+"""
+Token-aware context window for chat completion requests.
+
+Packs the conversation history into a per-model token budget:
+
+  - The system prompts, the tool definitions, the prompt and the pinned messages (messages with role "system", e.g. conversation
+    summaries) are always included.
+  - The remaining budget is filled with the most recent history, oldest turns are dropped first.
+    Tool results are kept together with the assistant message that requested them.
+
+Tokens are counted with the model's tokenizer where available, otherwise estimated (see geenii.tokenizer).
+"""
+
+import json
+import logging
+
+from geenii import config
+from geenii.datamodels import ModelMessage, ChatCompletionRequest
+from geenii.tokenizer import TokenCounter, token_counter
+from geenii.tool.registry import ToolRegistry
+
+logger = logging.getLogger(__name__)
+
+# Tokens added per message by the chat templates (role and delimiter tokens)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ContextWindow:
+    """The messages selected for a request, and the token accounting."""
+
+    def __init__(self, messages: list[ModelMessage], tokens: int, budget: int, dropped: list[ModelMessage]) -> None:
+        self.messages = messages
+        self.tokens = tokens
+        self.budget = budget
+        self.dropped = dropped
+
+
+class ContextBuilder:
+    """
+    Builds the context window of chat completion requests.
+
+    :param default_budget: The context window size (tokens) of models without a configured budget.
+    :param model_budgets: Context window sizes by model ID prefix, e.g. {"ollama": 4096, "openai:gpt-4o": 128000}.
+        The longest matching prefix applies.
+    :param reserved_output_tokens: Tokens of the context window reserved for the response.
+    :param counter: The token counter. Defaults to the shared token counter.
+    """
+
+    def __init__(self, default_budget: int = 8192, model_budgets: dict[str, int] | None = None,
+                 reserved_output_tokens: int = 1024, counter: TokenCounter | None = None) -> None:
+        self.default_budget = default_budget
+        self.model_budgets = model_budgets or {}
+        self.reserved_output_tokens = reserved_output_tokens
+        self.counter = counter or token_counter
+
+    # ---- Token counting ----
+
+    def budget(self, model: str | None) -> int:
+        """The input token budget for the model."""
+        model = model or config.DEFAULT_COMPLETION_MODEL
+        matches = [prefix for prefix in self.model_budgets if model == prefix or model.startswith(f"{prefix}:")]
+        window = self.model_budgets[max(matches, key=len)] if matches else self.default_budget
+        return max(window - self.reserved_output_tokens, 0)
+
+    def count_tokens(self, model: str | None, text: str) -> int:
+        """Count (or estimate) the tokens of the text for the model."""
+        return self.counter.count(model, text)
+
+    def count_messages(self, model: str | None, messages: list[ModelMessage]) -> list[int]:
+        counts = self.counter.count_batch(model, [message.to_text() for message in messages])
+        return [count + MESSAGE_OVERHEAD_TOKENS for count in counts]
+
+    def _count_pinned(self, model: str | None, system: list[str] | None, prompt: str | None) -> int:
+        texts = list(system or []) + ([prompt] if prompt else [])
+        return sum(count + MESSAGE_OVERHEAD_TOKENS for count in self.counter.count_batch(model, texts))
+
+    def count_tools(self, model: str | None, tools: set[str] | None, tool_registry: ToolRegistry | None) -> int:
+        """Count (or estimate) the tokens of the tool definitions sent with a request."""
+        if not tools or tool_registry is None:
+            return 0
+        schemas = tool_registry.tool_schemas("definition", tools)
+        return sum(self.counter.count_batch(model, [json.dumps(schema) for schema in schemas]))
+
+    def count_request(self, request: ChatCompletionRequest, tool_registry: ToolRegistry | None = None) -> int:
+        """Count the input tokens of the request (system prompts, tool definitions, messages and prompt)."""
+        return (self._count_pinned(request.model, _system_prompts(request), request.prompt)
+                + self.count_tools(request.model, request.tools, tool_registry)
+                + sum(self.count_messages(request.model, request.messages or [])))
+
+    def calibrate(self, request: ChatCompletionRequest, usage: dict, tool_registry: ToolRegistry | None = None) -> None:
+        """Calibrate the token estimate of the model with the input tokens reported for a request."""
+        input_tokens = (usage or {}).get("input_tokens")
+        if not input_tokens or usage.get("cache") == "hit" or self.counter.is_exact(request.model):
+            return
+        if request.tools and tool_registry is None:
+            # the tool definitions are part of the input tokens, but can not be counted without the registry
+            return
+        if (usage.get("cached_tokens") or usage.get("estimated_cached_tokens")) and "prompt_eval_count" in usage:
+            # the input tokens only count the prompt tokens evaluated after the reused (cached) prefix
+            return
+        self.counter.calibrate(request.model, self.count_request(request, tool_registry), input_tokens)
+
+    # ---- Context window ----
+
+    def build(self, model: str | None, messages: list[ModelMessage], system: list[str] | None = None,
+              prompt: str | None = None, budget: int | None = None) -> ContextWindow:
+        """
+        Select the messages that fit into the token budget of the model.
+
+        :param model: The model ID.
+        :param messages: The conversation history, oldest first.
+        :param system: The system prompts (always included).
+        :param prompt: The prompt of the request (always included).
+        :param budget: The input token budget. Defaults to the budget of the model.
+        :return: The context window with the selected messages in their original order.
+        """
+        budget = self.budget(model) if budget is None else budget
+        used = self._count_pinned(model, system, prompt)
+
+        pinned = [message for message in messages if message.role == "system"]
+        history = [message for message in messages if message.role != "system"]
+        used += sum(self.count_messages(model, pinned))
+        tokens = dict(zip(map(id, history), self.count_messages(model, history)))
+
+        selected: list[list[ModelMessage]] = []
+        dropped: list[ModelMessage] = []
+        groups = self._group(history)
+        while groups:
+            group = groups.pop()
+            group_tokens = sum(tokens[id(message)] for message in group)
+            if used + group_tokens > budget:
+                # keep the history contiguous: drop this and all older messages
+                dropped = [message for g in groups for message in g] + group
+                break
+            used += group_tokens
+            selected.insert(0, group)
+
+        if dropped:
+            logger.info(f"Context window for model '{model}': dropped {len(dropped)} of {len(history)} messages "
+                        f"to fit {used}/{budget} tokens")
+        if used > budget:
+            logger.warning(f"Pinned context for model '{model}' exceeds the token budget: {used}/{budget} tokens")
+
+        return ContextWindow(messages=pinned + [message for group in selected for message in group],
+                             tokens=used, budget=budget, dropped=dropped)
+
+    def fit(self, request: ChatCompletionRequest, budget: int | None = None,
+            tool_registry: ToolRegistry | None = None) -> ContextWindow:
+        """
+        Replace the messages of the request with the messages that fit into the token budget.
+
+        The tool definitions of the request (see count_tools) are deducted from the budget.
+        """
+        budget = self.budget(request.model) if budget is None else budget
+        tool_tokens = self.count_tools(request.model, request.tools, tool_registry)
+        window = self.build(request.model, list(request.messages or []), system=_system_prompts(request),
+                            prompt=request.prompt, budget=max(budget - tool_tokens, 0))
+        request.messages = window.messages
+        window.tokens += tool_tokens
+        window.budget = budget
+        return window
+
+    @staticmethod
+    def _group(messages: list[ModelMessage]) -> list[list[ModelMessage]]:
+        # tool results are grouped with the preceding message that requested the tool call
+        groups: list[list[ModelMessage]] = []
+        for message in messages:
+            if message.role == "tool" and groups:
+                groups[-1].append(message)
+            else:
+                groups.append([message])
+        return groups
+
+
+def _system_prompts(request: ChatCompletionRequest) -> list[str]:
+    return list(request.system or []) + list(request.volatile_system or [])
+
+
+context_builder = ContextBuilder(
+    default_budget=config.CONTEXT_WINDOW_TOKENS,
+    model_budgets=config.CONTEXT_WINDOW_MODEL_TOKENS,
+    reserved_output_tokens=config.CONTEXT_RESERVED_OUTPUT_TOKENS,
+)
@@ -1,12 +1,12 @@
 import uuid
 from datetime import datetime, UTC
-from typing import List, Any, Set, Literal, Optional
+from typing import List, Any, Set, Literal, Optional, Annotated
 
 import pydantic
 from fastapi import UploadFile
 
 from geenii import config
-from geenii.chat.chat_models import ContentPart
+from geenii.chat.chat_models import ContentPart, TextContent, ToolCallContent, ToolCallDeltaContent
 
 
 class AIProviderInfo(pydantic.BaseModel):
@@ -83,10 +83,19 @@ class CompletionResponse(BaseCompletionResponse):
 class ChatCompletionRequest(CompletionRequest):
     # Conversation history (for chat completions)
     messages: List[ModelMessage] | None = None
+    # System prompts which change on every request (e.g. the current time, recalled memories).
+    # Placed after the message history, so the stable prefix of the prompt can be reused from the KV cache
+    volatile_system: List[str] | None = None
     # Tooling support
     tools: Set[str] | None = None
     # Context ID for the completion request
     context_id: str | None = None
+    # Response cache policy: True forces caching, False bypasses the cache,
+    # None caches deterministic requests only, if the completion cache is enabled
+    cache: bool | None = None
+    # Admission priority class: "interactive", "agent" or "scheduled".
+    # Defaults to the priority context of the caller (see geenii.admission)
+    priority: Literal["interactive", "agent", "scheduled"] | None = None
 
 
 class ChatCompletionResponse(CompletionResponse):
@@ -99,6 +108,55 @@ class ChatCompletionResponse(CompletionResponse):
     usage: dict | None = pydantic.Field(default_factory=dict)
 
 
+ChatCompletionDelta = Annotated[
+    TextContent | ToolCallContent | ToolCallDeltaContent,
+    pydantic.Field(discriminator="type"),
+]
+
+
+class ChatCompletionChunk(pydantic.BaseModel):
+    # The completion ID, shared by all chunks of the same stream
+    id: str
+    # Sequence number of the chunk within the stream
+    index: int = 0
+    model: str | None = None
+    context_id: str | None = None
+    # Incremental output parts since the previous chunk
+    delta: List[ChatCompletionDelta] = pydantic.Field(default_factory=list)
+    # Incremental reasoning/thinking output since the previous chunk
+    reasoning_delta: str | None = None
+    # True for the last chunk of the stream
+    done: bool = False
+    # The aggregated response, only set on the last chunk
+    response: ChatCompletionResponse | None = None
+
+
+# Fan-out chat completions
+class FanOutCompletionRequest(ChatCompletionRequest):
+    # Model IDs the request is dispatched to. In "hedged" mode, in order of preference
+    models: List[str]
+    # "all": wait for the responses of all models,
+    # "first": return the first successful response,
+    # "hedged": start with the first model, and start the next model if no token was received within the hedge delay
+    mode: Literal["all", "first", "hedged"] = "all"
+    hedge_delay_ms: int | None = None
+    # Maximum time (seconds) to wait for the responses
+    timeout: float | None = None
+
+
+class FanOutCompletionResponse(pydantic.BaseModel):
+    mode: str
+    # The model of the selected response ("first" and "hedged" modes)
+    model: str | None = None
+    # The successful responses, in the order of the requested models
+    responses: List[ChatCompletionResponse] = pydantic.Field(default_factory=list)
+    # Error messages by model ID, including cancelled and timed out requests
+    errors: dict[str, str] = pydantic.Field(default_factory=dict)
+    # The models a request was started for, and their latencies (ms) by model ID
+    started: List[str] = pydantic.Field(default_factory=list)
+    latencies_ms: dict[str, int] = pydantic.Field(default_factory=dict)
+
+
 # Image Generation
 class ImageGenerationApiRequest(pydantic.BaseModel):
     prompt: str
@@ -117,6 +175,24 @@ class ImageGenerationApiResponse(BaseCompletionResponse):
     # base64: str | None = None  # Base64 encoded audio data, if applicable
 
 
+# Embeddings
+class EmbeddingRequest(pydantic.BaseModel):
+    model: str | None = config.DEFAULT_EMBEDDING_MODEL
+    input: str | List[str]
+    # Number of dimensions of the output vectors, if supported by the model
+    dimensions: int | None = None
+    # Use the embedding cache (default), or bypass it (False)
+    cache: bool | None = None
+    # Admission priority class: "interactive", "agent" or "scheduled"
+    priority: Literal["interactive", "agent", "scheduled"] | None = None
+
+
+class EmbeddingResponse(BaseCompletionResponse):
+    # One vector per input, in the order of the inputs
+    embeddings: List[List[float]] | None = None
+    usage: dict | None = None
+
+
 # Audio Generation
 class AudioGenerationApiRequest(pydantic.BaseModel):
     model: str | None = config.DEFAULT_AUDIO_GENERATION_MODEL
@@ -0,0 +1,192 @@
+"""
+Persistent cache of embedding vectors.
+
+Vectors are keyed by the model (and the requested dimensions) and a hash of the input text, and stored as
+packed float16 (default) or float32 values in a SQLite table. Recently used vectors are also kept in memory.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from geenii import config
+
+logger = logging.getLogger(__name__)
+
+# struct formats of the storage types
+_DTYPE_FORMATS = {"float16": "e", "float32": "f"}
+
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    dtype TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (model, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used);
+"""
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def pack_vector(vector: list[float], dtype: str) -> bytes:
+    return struct.pack(f"<{len(vector)}{_DTYPE_FORMATS[dtype]}", *vector)
+
+
+def unpack_vector(data: bytes, dtype: str) -> list[float]:
+    fmt = _DTYPE_FORMATS[dtype]
+    return list(struct.unpack(f"<{len(data) // struct.calcsize(fmt)}{fmt}", data))
+
+
+class EmbeddingCache:
+    """
+    Cache of embedding vectors by (model, text hash).
+
+    :param db_path: Path of the SQLite database.
+    :param dtype: Storage type of new vectors: "float16" or "float32".
+    :param max_entries: Maximum number of vectors on disk, the least recently used vectors are evicted.
+    :param memory_entries: Maximum number of vectors kept in memory (LRU).
+    """
+
+    def __init__(self, db_path: str, dtype: str = "float16", max_entries: int = 1000000,
+                 memory_entries: int = 10000) -> None:
+        if dtype not in _DTYPE_FORMATS:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.db_path = db_path
+        self.dtype = dtype
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._db: sqlite3.Connection | None = None
+        self._memory: OrderedDict[tuple[str, bytes], list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # the database is opened lazily, the cache directory may not exist at import time
+        if self._db is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_CACHE_SCHEMA)
+        return self._db
+
+    def get_many(self, model: str, texts: list[str]) -> dict[str, list[float]]:
+        """The cached vectors of the texts, by text. Texts without a cached vector are omitted."""
+        found: dict[str, list[float]] = {}
+        missing: dict[bytes, str] = {}
+        with self._lock:
+            for text in texts:
+                key = (model, text_hash(text))
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[text] = self._memory[key]
+                else:
+                    missing[key[1]] = text
+
+            hashes = list(missing)
+            rows = []
+            try:
+                for i in range(0, len(hashes), 500):
+                    batch = hashes[i:i + 500]
+                    rows.extend(self.db.execute(
+                        f"SELECT hash, dtype, vector FROM embeddings "
+                        f"WHERE model = ? AND hash IN ({','.join('?' * len(batch))})", [model, *batch]))
+                if rows:
+                    now = time.time()
+                    self.db.executemany("UPDATE embeddings SET used = ? WHERE model = ? AND hash = ?",
+                                        [(now, model, row[0]) for row in rows])
+                    self.db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache read failed: {e}")
+
+            for hash_, dtype, data in rows:
+                vector = unpack_vector(data, dtype)
+                found[missing[hash_]] = vector
+                self._remember((model, hash_), vector)
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(texts) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, list[float]]) -> dict[str, list[float]]:
+        """
+        Store the vectors, by text.
+
+        :return: The vectors as stored, by text. Callers return these, so cache misses equal later cache hits.
+        """
+        if not vectors:
+            return {}
+        now = time.time()
+        rows = []
+        stored = {}
+        with self._lock:
+            for text, vector in vectors.items():
+                hash_ = text_hash(text)
+                packed, dtype = self._pack(vector)
+                if packed is None:
+                    stored[text] = vector
+                    continue
+                stored[text] = unpack_vector(packed, dtype)
+                self._remember((model, hash_), stored[text])
+                rows.append((model, hash_, dtype, packed, now))
+            try:
+                self.db.executemany("INSERT OR REPLACE INTO embeddings (model, hash, dtype, vector, used) "
+                                    "VALUES (?, ?, ?, ?, ?)", rows)
+                self.db.commit()
+                self._stats["writes"] += len(rows)
+                self._writes_since_prune += len(rows)
+                if self._writes_since_prune >= max(self.max_entries // 100, 1):
+                    self._prune()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+        return stored
+
+    def _pack(self, vector: list[float]) -> tuple[bytes | None, str]:
+        # vectors out of the range of the storage type (e.g. unnormalized vectors above 65504 for float16)
+        # are stored as float32, and not cached if they do not fit float32 either
+        for dtype in dict.fromkeys([self.dtype, "float32"]):
+            try:
+                return pack_vector(vector, dtype), dtype
+            except (OverflowError, struct.error):
+                continue
+        return None, self.dtype
+
+    def _remember(self, key: tuple[str, bytes], vector: list[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self) -> None:
+        self._writes_since_prune = 0
+        count = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # evict the least recently used vectors, down to max_entries
+        cursor = self.db.execute("DELETE FROM embeddings WHERE used <= (SELECT used FROM embeddings "
+                                 "ORDER BY used LIMIT 1 OFFSET ?)", (count - self.max_entries - 1,))
+        self.db.commit()
+        self._stats["evicted"] += cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "dtype": self.dtype, "memory_entries": len(self._memory)}
+
+
+embedding_cache = EmbeddingCache(
+    db_path=config.EMBEDDING_CACHE_PATH,
+    dtype=config.EMBEDDING_CACHE_DTYPE,
+    max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+    memory_entries=config.EMBEDDING_CACHE_MEMORY_ENTRIES,
+)
@@ -0,0 +1,178 @@
+"""
+Fan-out chat completions: one request dispatched to several models concurrently.
+
+Modes:
+
+  - "all": wait for the responses of all models (e.g. to compare models)
+  - "first": return the first successful response, the other requests are cancelled
+  - "hedged": start with the first (preferred) model. If no model has returned a token within the hedge delay,
+    or a model failed, start the next model. The first successful response wins, the other requests are cancelled.
+    Hedging cuts the tail latency of stalled providers, at the cost of occasional duplicate requests.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter
+from typing import AsyncGenerator, Awaitable, Callable
+
+from geenii import config
+from geenii.ai import agenerate_chat_completion, stream_chat_completion
+from geenii.datamodels import ChatCompletionRequest, ChatCompletionResponse, ChatCompletionChunk, \
+    FanOutCompletionResponse
+
+logger = logging.getLogger(__name__)
+
+FANOUT_MODES = ("all", "first", "hedged")
+
+
+class FanOutDispatcher:
+    """
+    Dispatches chat completion requests to several models concurrently.
+
+    :param hedge_delay_ms: Default delay without a first token, after which a hedged request starts the next model.
+    :param timeout: Default maximum time (seconds) to wait for the responses.
+    :param max_models: Maximum number of models per request.
+    :param generate: Generates a chat completion. Defaults to `geenii.ai.agenerate_chat_completion`.
+    :param stream: Streams a chat completion (used by hedged requests to detect the first token).
+        Defaults to `geenii.ai.stream_chat_completion`.
+    """
+
+    def __init__(self, hedge_delay_ms: int = 1500, timeout: float = 300, max_models: int = 8,
+                 generate: Callable[..., Awaitable[ChatCompletionResponse]] | None = None,
+                 stream: Callable[..., AsyncGenerator[ChatCompletionChunk, None]] | None = None) -> None:
+        self.hedge_delay_ms = hedge_delay_ms
+        self.timeout = timeout
+        self.max_models = max_models
+        self.generate = generate or agenerate_chat_completion
+        self.stream = stream or stream_chat_completion
+        self._stats = {"requests": Counter(), "hedges": 0, "timeouts": 0, "failures": 0, "wins": Counter()}
+
+    async def run(self, request: ChatCompletionRequest, models: list[str], mode: str = "all",
+                  hedge_delay_ms: int | None = None, timeout: float | None = None,
+                  tool_registry=None) -> FanOutCompletionResponse:
+        """
+        Dispatch the request to the models.
+
+        :param request: The chat completion request, the model of the request is replaced per model.
+        :param models: The model IDs. In "hedged" mode, in order of preference.
+        :param mode: "all", "first" or "hedged".
+        :param hedge_delay_ms: The hedge delay. Defaults to the hedge delay of the dispatcher.
+        :param timeout: Maximum time (seconds) to wait for the responses. Defaults to the timeout of the dispatcher.
+        :param tool_registry: The tool registry passed to the providers.
+        """
+        models = list(dict.fromkeys(models))
+        if mode not in FANOUT_MODES:
+            raise ValueError(f"Invalid fan-out mode: {mode}. Expected one of {', '.join(FANOUT_MODES)}")
+        if not models:
+            raise ValueError("No models given")
+        if len(models) > self.max_models:
+            raise ValueError(f"Too many models: {len(models)}, at most {self.max_models} models are allowed")
+
+        # all requests belong to the same conversation
+        request.context_id = request.context_id or uuid.uuid4().hex
+        hedge_delay = (hedge_delay_ms if hedge_delay_ms is not None else self.hedge_delay_ms) / 1000
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        self._stats["requests"][mode] += 1
+
+        result = FanOutCompletionResponse(mode=mode)
+        responses: dict[str, ChatCompletionResponse] = {}
+        first_tokens: dict[str, asyncio.Event] = {}
+        started_at: dict[str, float] = {}
+        tasks: dict[asyncio.Task, str] = {}
+        queue = list(models)
+
+        def start_next() -> asyncio.Task:
+            model = queue.pop(0)
+            model_request = request.model_copy(update={"model": model})
+            first_tokens[model] = asyncio.Event()
+            started_at[model] = time.monotonic()
+            if mode == "hedged":
+                coro = self._stream_attempt(model_request, tool_registry, first_tokens[model])
+            else:
+                coro = self.generate(model_request, tool_registry=tool_registry)
+            task = asyncio.create_task(coro)
+            tasks[task] = model
+            result.started.append(model)
+            return task
+
+        pending = {start_next()} if mode == "hedged" else {start_next() for _ in models}
+        last_start = loop.time()
+        timed_out = False
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    self._stats["timeouts"] += 1
+                    timed_out = True
+                    break
+                hedging = mode == "hedged" and queue and not any(first_tokens[tasks[t]].is_set() for t in pending)
+                wake = min(deadline, last_start + hedge_delay) if hedging else deadline
+                done, pending = await asyncio.wait(pending, timeout=max(wake - now, 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    model = tasks[task]
+                    result.latencies_ms[model] = int((time.monotonic() - started_at[model]) * 1000)
+                    error = task.exception()
+                    response = task.result() if error is None else None
+                    if error is None and response.error:
+                        error = response.error
+                    if error is not None:
+                        self._stats["failures"] += 1
+                        result.errors[model] = str(error) or type(error).__name__
+                        logger.warning(f"Fan-out request to model {model} failed: {result.errors[model]}")
+                    else:
+                        responses[model] = response
+
+                if responses and mode != "all":
+                    break
+                # hedge: start the next model after a failure, or if no running model has returned a token in time
+                if mode == "hedged" and queue:
+                    stalled = loop.time() >= last_start + hedge_delay \
+                        and not any(first_tokens[tasks[t]].is_set() for t in pending)
+                    if not pending or stalled:
+                        if pending:
+                            self._stats["hedges"] += 1
+                            logger.info(f"Hedging fan-out request: no token after {int(hedge_delay * 1000)} ms, "
+                                        f"starting model {queue[0]}")
+                        pending.add(start_next())
+                        last_start = loop.time()
+        finally:
+            for task in pending:
+                task.cancel()
+                model = tasks[task]
+                # unfinished at the deadline, or cancelled after the winning response (or with the caller)
+                result.errors[model] = "timed out" if timed_out else "cancelled"
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        # responses in the order of the requested models
+        result.responses = [responses[model] for model in models if model in responses]
+        if mode != "all" and result.responses:
+            result.model = next(model for model in models if model in responses)
+            self._stats["wins"][result.model] += 1
+        return result
+
+    async def _stream_attempt(self, request: ChatCompletionRequest, tool_registry,
+                              first_token: asyncio.Event) -> ChatCompletionResponse:
+        response = None
+        async for chunk in self.stream(request, tool_registry=tool_registry):
+            if chunk.delta or chunk.reasoning_delta or chunk.done:
+                first_token.set()
+            if chunk.response is not None:
+                response = chunk.response
+        if response is None:
+            raise RuntimeError(f"Stream of model {request.model} ended without a response")
+        return response
+
+    def stats(self) -> dict:
+        return {**self._stats, "requests": dict(self._stats["requests"]), "wins": dict(self._stats["wins"])}
+
+
+fan_out = FanOutDispatcher(
+    hedge_delay_ms=config.FANOUT_HEDGE_DELAY_MS,
+    timeout=config.FANOUT_TIMEOUT,
+    max_models=config.FANOUT_MAX_MODELS,
+)
@@ -104,28 +104,27 @@ class McpClient:
         if self._info is not None:
             return self._info
 
-        async with self.client:
-            try:
-                # initialize_result = await client.initialize_result
-                tools = await self.client.list_tools()
-                resources = await self.client.list_resources()
-                prompts: list[Prompt] = await self.client.list_prompts()
-
-                info_dict = {
-                    "name": self.server_name,
-                    "status": "connected",
-                    # "message": f"Connected to MCP server '{server_name}' successfully.",
-                    # "initialize_result": initialize_result.model_dump(),
-                    "tools": [tool.model_dump() for tool in tools],
-                    "resources": [res.model_dump() for res in resources],
-                    "prompts": [prompt.model_dump() for prompt in prompts],
-                }
-                print(info_dict)
-                #return MCPServerInfo(**info_dict)
-                self._info = info_dict
-                return info_dict
-            except Exception as e:
-                raise
+        async def fetch_info(client) -> dict:
+            # initialize_result = await client.initialize_result
+            tools = await client.list_tools()
+            resources = await client.list_resources()
+            prompts: list[Prompt] = await client.list_prompts()
+            return {
+                "name": self.server_name,
+                "status": "connected",
+                # "message": f"Connected to MCP server '{server_name}' successfully.",
+                # "initialize_result": initialize_result.model_dump(),
+                "tools": [tool.model_dump() for tool in tools],
+                "resources": [res.model_dump() for res in resources],
+                "prompts": [prompt.model_dump() for prompt in prompts],
+            }
+
+        # the server info is read on the persistent session of the server, instead of connecting per call
+        from geenii.mcp_session import mcp_sessions
+        info_dict = await mcp_sessions.run(self.server_name, fetch_info, server_config=self.server_config)
+        #return MCPServerInfo(**info_dict)
+        self._info = info_dict
+        return info_dict
 
     async def list_tools(self):
         info = await self.get_info()
@@ -146,14 +145,9 @@ class McpClient:
         return asyncio.run(self.list_tools())
 
     async def call_tool(self, tool_name: str, args: dict) -> any:
-        async with self.client:
-            try:
-                #result = await self.client.call_tool(tool_name, arguments=args)
-                result = await self.client.call_tool_mcp(tool_name, arguments=args)
-                print("Tool call result:", result)
-                return result
-            except Exception as e:
-                raise
+        # tool calls share the persistent session of the server, instead of connecting per call
+        from geenii.mcp_session import mcp_sessions
+        return await mcp_sessions.call_tool(self.server_name, tool_name, args, server_config=self.server_config)
 
     def call_tool_sync(self, tool_name: str, args: dict) -> any:
         print(f"Calling tool {tool_name} with args {args} on MCP server {self.server_name}")
@@ -0,0 +1,290 @@
+"""
+Persistent MCP client sessions.
+
+Connecting to an MCP server is expensive: stdio servers spawn a process (often `docker run`) and every session
+starts with an initialize handshake. The session manager keeps one long-lived connected session per configured
+server, shared by all tool calls:
+
+  - sessions are connected on first use, and reconnected with exponential backoff after a failure
+  - a health check pings idle sessions, and closes sessions which did not respond
+  - the number of concurrent requests per session is limited
+  - sessions unused for the idle timeout are closed
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from fastmcp import Client
+from fastmcp.mcp_config import MCPConfig
+
+from geenii import config
+from geenii.mcp import get_mcp_config_for_server
+
+logger = logging.getLogger(__name__)
+
+
+class McpSessionError(RuntimeError):
+    pass
+
+
+def _create_client(server_name: str, server_config: dict) -> Client:
+    return Client(transport=MCPConfig(mcpServers={server_name: server_config}))
+
+
+class McpSession:
+    """
+    A long-lived connection to one MCP server.
+
+    The client context is entered and exited by a dedicated task, as the transports of the MCP client
+    must be closed by the task which opened them.
+
+    :param server_name: The name of the MCP server.
+    :param server_config: The server configuration (url, or command and args).
+    :param max_concurrency: Maximum number of concurrent requests on the session.
+    :param connect_timeout: Maximum time (seconds) to connect to the server.
+    :param backoff_max: Maximum delay (seconds) between reconnect attempts.
+    :param client_factory: Creates the MCP client. Defaults to a fastmcp `Client` for the server configuration.
+    """
+
+    def __init__(self, server_name: str, server_config: dict, max_concurrency: int = 4, connect_timeout: float = 30,
+                 backoff_max: float = 60, client_factory: Callable[[str, dict], Any] | None = None) -> None:
+        self.server_name = server_name
+        self.server_config = server_config
+        self.connect_timeout = connect_timeout
+        self.backoff_max = backoff_max
+        self.client_factory = client_factory or _create_client
+        self.loop = asyncio.get_running_loop()
+        self._client = None
+        self._task: asyncio.Task | None = None
+        self._stop: asyncio.Event | None = None
+        self._connect_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._active = 0
+        self._failures = 0
+        self._retry_at = 0.0
+        self.last_used = time.monotonic()
+        self.stats = {"connects": 0, "connect_errors": 0, "requests": 0, "errors": 0, "health_check_errors": 0}
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None and self._task is not None and not self._task.done()
+
+    @property
+    def idle(self) -> bool:
+        return self._active == 0
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        try:
+            client = self.client_factory(self.server_name, self.server_config)
+            async with client:
+                self._client = client
+                ready.set_result(client)
+                await self._stop.wait()
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+            raise
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP session {self.server_name} closed with an error: {e}")
+        finally:
+            self._client = None
+
+    async def connect(self):
+        """Return the connected client, connect if the session is not connected."""
+        if self.connected:
+            return self._client
+        async with self._connect_lock:
+            if self.connected:
+                return self._client
+            wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                raise McpSessionError(f"MCP server {self.server_name} is unavailable, reconnecting in {wait:.1f}s")
+
+            self._stop = asyncio.Event()
+            ready = self.loop.create_future()
+            self._task = asyncio.create_task(self._run(ready), name=f"mcp-session-{self.server_name}")
+            try:
+                client = await asyncio.wait_for(asyncio.shield(ready), timeout=self.connect_timeout)
+            except asyncio.CancelledError:
+                await self._shutdown()
+                raise
+            except Exception as e:
+                await self._shutdown()
+                self._failures += 1
+                self.stats["connect_errors"] += 1
+                backoff = min(2 ** (self._failures - 1), self.backoff_max)
+                self._retry_at = time.monotonic() + backoff
+                logger.warning(f"Connecting to MCP server {self.server_name} failed ({e!r}), "
+                               f"next attempt in {backoff:.0f}s")
+                if isinstance(e, asyncio.TimeoutError):
+                    raise McpSessionError(f"Connecting to MCP server {self.server_name} timed out") from e
+                raise
+            self._failures = 0
+            self._retry_at = 0.0
+            self.stats["connects"] += 1
+            logger.info(f"Connected MCP session {self.server_name}")
+            return client
+
+    async def run(self, fn: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run a request `fn(client)` on the session, within the concurrency limit of the session."""
+        async with self._semaphore:
+            self._active += 1
+            self.last_used = time.monotonic()
+            try:
+                client = await self.connect()
+                self.stats["requests"] += 1
+                try:
+                    return await fn(client)
+                except Exception:
+                    self.stats["errors"] += 1
+                    # drop a broken connection, the next request reconnects
+                    is_connected = getattr(client, "is_connected", None)
+                    if is_connected is not None and not is_connected():
+                        await self._shutdown()
+                    raise
+            finally:
+                self._active -= 1
+                self.last_used = time.monotonic()
+
+    async def health_check(self, timeout: float = 10) -> bool:
+        """Ping the server. A session which does not respond is closed."""
+        if not self.connected:
+            return False
+        try:
+            await asyncio.wait_for(self._client.ping(), timeout=timeout)
+            return True
+        except Exception as e:
+            self.stats["health_check_errors"] += 1
+            logger.warning(f"Health check of MCP session {self.server_name} failed ({e!r}), closing the session")
+            await self._shutdown()
+            return False
+
+    async def _shutdown(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        if self._stop is not None:
+            self._stop.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=self.connect_timeout)
+        except BaseException:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._client = None
+
+    async def close(self) -> None:
+        async with self._connect_lock:
+            await self._shutdown()
+        logger.info(f"Closed MCP session {self.server_name}")
+
+    def info(self) -> dict:
+        return {**self.stats, "connected": self.connected, "active": self._active,
+                "idle_seconds": int(time.monotonic() - self.last_used)}
+
+
+class McpSessionManager:
+    """
+    Keeps one MCP session per configured server.
+
+    :param max_concurrency: Maximum number of concurrent requests per session.
+    :param idle_timeout: Sessions unused for this time (seconds) are closed.
+    :param health_check_interval: Interval (seconds) of the health checks and idle shutdown.
+    :param connect_timeout: Maximum time (seconds) to connect to a server.
+    :param backoff_max: Maximum delay (seconds) between reconnect attempts.
+    :param client_factory: Creates the MCP clients, see `McpSession`.
+    """
+
+    def __init__(self, max_concurrency: int = 4, idle_timeout: float = 600, health_check_interval: float = 60,
+                 connect_timeout: float = 30, backoff_max: float = 60,
+                 client_factory: Callable[[str, dict], Any] | None = None) -> None:
+        self.max_concurrency = max_concurrency
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.backoff_max = backoff_max
+        self.client_factory = client_factory
+        self._sessions: dict[str, McpSession] = {}
+        self._maintenance_task: asyncio.Task | None = None
+
+    async def get(self, server_name: str, server_config: dict | None = None) -> McpSession:
+        """Return the session of a server. The configuration is read from the MCP config if not given."""
+        if server_config is None:
+            server_config = get_mcp_config_for_server(server_name)
+            if server_config is None:
+                raise ValueError(f"MCP server '{server_name}' not found in configuration.")
+
+        session = self._sessions.get(server_name)
+        # sessions are bound to their event loop, and a changed server configuration requires a new session
+        if session is not None and (session.loop is not asyncio.get_running_loop()
+                                    or session.server_config != server_config):
+            self._sessions.pop(server_name, None)
+            if session.loop is asyncio.get_running_loop():
+                await session.close()
+            session = None
+        if session is None:
+            session = McpSession(server_name, server_config, max_concurrency=self.max_concurrency,
+                                 connect_timeout=self.connect_timeout, backoff_max=self.backoff_max,
+                                 client_factory=self.client_factory)
+            self._sessions[server_name] = session
+        self._ensure_maintenance()
+        return session
+
+    async def run(self, server_name: str, fn: Callable[[Any], Awaitable[Any]],
+                  server_config: dict | None = None) -> Any:
+        """Run a request `fn(client)` on the session of a server."""
+        session = await self.get(server_name, server_config)
+        return await session.run(fn)
+
+    async def call_tool(self, server_name: str, tool_name: str, args: dict, server_config: dict | None = None) -> Any:
+        return await self.run(server_name, lambda client: client.call_tool_mcp(tool_name, arguments=args),
+                              server_config=server_config)
+
+    def _ensure_maintenance(self) -> None:
+        if self.health_check_interval <= 0:
+            return
+        task = self._maintenance_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop(), name="mcp-session-maintenance")
+
+    async def _maintenance_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.maintain()
+
+    async def maintain(self) -> None:
+        """Close the idle sessions, and health check the other connected sessions."""
+        now = time.monotonic()
+        for session in list(self._sessions.values()):
+            if session.loop is not asyncio.get_running_loop() or not session.connected or not session.idle:
+                continue
+            if now - session.last_used >= self.idle_timeout:
+                logger.info(f"Closing idle MCP session {session.server_name}")
+                await session.close()
+            elif now - session.last_used >= self.health_check_interval:
+                await session.health_check()
+
+    async def close(self) -> None:
+        """Close all sessions."""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        sessions, self._sessions = list(self._sessions.values()), {}
+        await asyncio.gather(*(session.close() for session in sessions
+                               if session.loop is asyncio.get_running_loop()), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {name: session.info() for name, session in self._sessions.items()}
+
+
+mcp_sessions = McpSessionManager(
+    max_concurrency=config.MCP_SESSION_MAX_CONCURRENCY,
+    idle_timeout=config.MCP_SESSION_IDLE_TIMEOUT,
+    health_check_interval=config.MCP_SESSION_HEALTH_CHECK_INTERVAL,
+    connect_timeout=config.MCP_SESSION_CONNECT_TIMEOUT,
+    backoff_max=config.MCP_SESSION_BACKOFF_MAX,
+)
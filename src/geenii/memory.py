@@ -1,9 +1,20 @@
 import abc
+import asyncio
+import atexit
+import gzip
+import hashlib
 import json
+import os
 import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 import logging
+from typing import Callable
 
+from geenii import config
 from geenii.datamodels import ModelMessage
 
 logger = logging.getLogger(__name__)
@@ -28,6 +39,50 @@ class ChatMemory(abc.ABC):
         self._messages = []
         self._write()
 
+    def compact(self, summary: ModelMessage, archived: list[ModelMessage]) -> None:
+        """
+        Replace the archived messages (and any previous summary) with a summary message.
+        The archived messages are moved to the archive storage.
+        Messages appended since the compaction started are kept.
+        """
+        self._reload()
+        archived_ids = {message.id for message in archived}
+        self._archive([message for message in self._messages if message.id in archived_ids])
+        self._messages = [summary] + [message for message in self._messages
+                                      if message.id not in archived_ids and message.type != "summary"]
+        self._write()
+
+    def tail(self, n: int, pinned: bool = True) -> list[ModelMessage]:
+        """
+        The last n messages.
+
+        :param n: The number of messages.
+        :param pinned: Also include the pinned summary messages preceding the last n messages.
+        """
+        messages = self.messages
+        start = max(len(messages) - n, 0) if n > 0 else len(messages)
+        head = [message for message in messages[:start] if message.type == "summary"] if pinned else []
+        return head + messages[start:]
+
+    def since(self, message_id: str) -> list[ModelMessage]:
+        """The messages after the message with the given ID (all messages, if the ID is unknown)."""
+        messages = self.messages
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == message_id:
+                return messages[i + 1:]
+        return list(messages)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def _reload(self) -> None:
+        """Reload the messages from persistent storage."""
+        pass
+
+    def _archive(self, messages: list[ModelMessage]) -> None:
+        """Move messages to the archive storage. By default, the messages are discarded."""
+        pass
+
     @abc.abstractmethod
     def _insert(self, message: ModelMessage) -> None:
         """Insert a message into the memory storage."""
@@ -39,10 +94,10 @@ class ChatMemory(abc.ABC):
         pass
 
     def __iter__(self):
-        return iter(self._messages)
+        return iter(self.messages)
 
     async def __aiter__(self):
-        for message in self._messages:
+        for message in self.messages:
             yield message
 
 
@@ -59,74 +114,732 @@ class ShortTermChatMemory(ChatMemory):
 
 
 class FileChatMemory(ChatMemory):
-    """File-based implementation of chat memory using JSONL format."""
+    """
+    File-based implementation of chat memory using JSONL format.
+
+    An offset index (`<name>.idx`) with one fixed-size record per line (offset, length, flags, id hash)
+    gives random access to the messages, so the last N messages or the messages since an ID are read without
+    replaying the file. Messages are parsed and validated lazily, when they are accessed.
+    The index header records the inode of the indexed JSONL file. The index is updated on append, and rebuilt
+    from the JSONL file if it is missing, belongs to another file, or does not end on a line boundary.
+    """
+
+    _INDEX_HEADER = struct.Struct("<8sQ")
+    _INDEX_MAGIC = b"GNIDX\x00\x00\x01"
+    _INDEX_RECORD = struct.Struct("<QIB8s")
+    _FLAG_SUMMARY = 1
 
     def __init__(self, file_path: str, create=True, restore=True) -> None:
         super().__init__()
         self.file_path = Path(file_path).resolve()
+        self.index_path = self.file_path.with_suffix(".idx")
+        # compacted messages are archived next to the memory file
+        self.archive_path = self.file_path.with_suffix(".archive.jsonl.gz")
         if not create and not self.file_path.exists():
             raise FileNotFoundError(f"Chat memory file '{file_path}' does not exist.")
 
         # ensure the parent dir exists
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        if restore:
-            self._read()
+        self._restore = restore
+        # the messages are loaded on first access
+        self._messages = None if restore else []
+        self._messages_file_id: tuple[int, int] | None = None
+        self._index: list[tuple[int, int, int, bytes]] = []
+        self._index_file_id: tuple[int, int] | None = None
+        self._parsed: dict[int, ModelMessage] = {}
+
+    @property
+    def messages(self) -> list[ModelMessage]:
+        if not self._restore:
+            return self._messages
+        # reload the messages if the file was appended to or rewritten by another instance
+        index = self._sync_index()
+        if self._messages is None or self._messages_file_id != self._index_file_id:
+            self._messages = self._load(index)
+            self._messages_file_id = self._index_file_id
+        return self._messages
+
+    def append(self, message: ModelMessage) -> None:
+        """Add a message to the memory."""
+        if not self._restore:
+            self._messages.append(message)
+        self._insert(message)
+
+    def __len__(self) -> int:
+        if not self._restore:
+            return len(self._messages)
+        return len(self._sync_index())
+
+    def tail(self, n: int, pinned: bool = True) -> list[ModelMessage]:
+        """
+        The last n messages.
+
+        :param n: The number of messages.
+        :param pinned: Also include the pinned summary messages preceding the last n messages.
+        """
+        if not self._restore:
+            return super().tail(n, pinned=pinned)
+        index = self._sync_index()
+        start = max(len(index) - n, 0) if n > 0 else len(index)
+        entries = index[start:]
+        if pinned:
+            entries = [entry for entry in index[:start] if entry[2] & self._FLAG_SUMMARY] + entries
+        return self._load(entries)
+
+    def since(self, message_id: str) -> list[ModelMessage]:
+        """The messages after the message with the given ID (all messages, if the ID is unknown)."""
+        if not self._restore:
+            return super().since(message_id)
+        index = self._sync_index()
+        id_hash = self._id_hash(message_id)
+        for i in range(len(index) - 1, -1, -1):
+            if index[i][3] == id_hash and self._load([index[i]])[0].id == message_id:
+                return self._load(index[i + 1:])
+        return self._load(index)
 
     def _read(self) -> None:
-        file_path = self.file_path
-        #self._messages = []
-        if Path(file_path).exists():
-            with file_path.open("r") as f:
+        self._messages = self._load(self._sync_index())
+        self._messages_file_id = self._index_file_id
+        logger.info(f"Loaded {len(self._messages)} messages from chat memory file '{self.file_path}'")
+
+    def _load(self, entries: list[tuple[int, int, int, bytes]]) -> list[ModelMessage]:
+        messages = []
+        missing = [entry for entry in entries if entry[0] not in self._parsed]
+        if missing:
+            with self.file_path.open("rb") as f:
+                for offset, length, _, _ in missing:
+                    f.seek(offset)
+                    self._parsed[offset] = ModelMessage.model_validate_json(f.read(length))
+        for offset, _, _, _ in entries:
+            messages.append(self._parsed[offset])
+        return messages
+
+    # ---- Offset index ----
+
+    @staticmethod
+    def _id_hash(message_id: str) -> bytes:
+        return hashlib.blake2b(message_id.encode("utf-8"), digest_size=8).digest()
+
+    def _index_entry(self, offset: int, line: bytes, message_id: str, message_type: str) -> tuple:
+        flags = self._FLAG_SUMMARY if message_type == "summary" else 0
+        return offset, len(line), flags, self._id_hash(message_id)
+
+    def _sync_index(self) -> list[tuple[int, int, int, bytes]]:
+        """Return the up-to-date index, indexing the lines appended to the JSONL file since the last sync."""
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            self._index, self._index_file_id, self._parsed = [], None, {}
+            self.index_path.unlink(missing_ok=True)
+            return self._index
+        file_id = (stat.st_ino, stat.st_size)
+        if file_id == self._index_file_id:
+            return self._index
+
+        if self._index_file_id is None or self._index_file_id[0] != stat.st_ino:
+            # the memory file was rewritten (e.g. compacted) by another instance
+            self._parsed = {}
+        # re-read the index file, the appended lines may have been indexed by another instance
+        index_inode, self._index = self._read_index_file()
+        if index_inode != stat.st_ino or not self._index_matches(self._index, stat.st_size):
+            if index_inode is not None:
+                logger.warning(f"Chat memory index '{self.index_path}' is out of date, rebuilding")
+            self._index, self._parsed = [], {}
+            self.index_path.write_bytes(self._INDEX_HEADER.pack(self._INDEX_MAGIC, stat.st_ino))
+        indexed_end = self._index[-1][0] + self._index[-1][1] + 1 if self._index else 0
+
+        if indexed_end < stat.st_size:
+            new_entries = []
+            with self.file_path.open("rb") as f:
+                f.seek(indexed_end)
+                offset = indexed_end
                 for line in f:
-                    message_dict = json.loads(line)
-                    message = ModelMessage.model_validate(message_dict)
-                    self._messages.append(message)
-            logger.info(f"Loaded {len(self._messages)} messages from chat memory file '{file_path}'")
-        else:
-            logger.info(f"No existing chat memory file found at '{file_path}', starting with empty memory")
+                    if not line.endswith(b"\n"):
+                        break  # partial line, being written
+                    content = line.rstrip(b"\n")
+                    if content.strip():
+                        data = json.loads(content)
+                        new_entries.append(self._index_entry(offset, content, data.get("id", ""),
+                                                             data.get("type", "message")))
+                    offset += len(line)
+            self._append_index(new_entries)
+            self._index.extend(new_entries)
+            stat = os.stat(self.file_path)
+        self._index_file_id = (stat.st_ino, stat.st_size)
+        return self._index
+
+    def _index_matches(self, index: list[tuple[int, int, int, bytes]], size: int) -> bool:
+        # the last indexed line must still be a complete line of the file,
+        # else the file was rewritten (e.g. by a writer which does not maintain the index)
+        if not index:
+            return True
+        offset, length, _, _ = index[-1]
+        if offset + length + 1 > size:
+            return False
+        with self.file_path.open("rb") as f:
+            f.seek(max(offset - 1, 0))
+            head = f.read(2 if offset else 1)
+            f.seek(offset + length)
+            tail = f.read(1)
+        return head[-1:] == b"{" and (offset == 0 or head[:1] == b"\n") and tail == b"\n"
 
+    def _read_index_file(self) -> tuple[int | None, list[tuple[int, int, int, bytes]]]:
+        """Read the index file, return the inode of the indexed file (None if not readable) and the records."""
+        try:
+            data = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return None, []
+        if len(data) < self._INDEX_HEADER.size:
+            return None, []
+        magic, inode = self._INDEX_HEADER.unpack_from(data)
+        if magic != self._INDEX_MAGIC:
+            return None, []
+        data = data[self._INDEX_HEADER.size:]
+        # ignore a partially written last record
+        data = data[:len(data) - len(data) % self._INDEX_RECORD.size]
+        return inode, list(self._INDEX_RECORD.iter_unpack(data))
+
+    def _append_index(self, entries: list[tuple]) -> None:
+        if not entries:
+            return
+        with self.index_path.open("ab") as f:
+            if f.tell() == 0:
+                f.write(self._INDEX_HEADER.pack(self._INDEX_MAGIC, os.stat(self.file_path).st_ino))
+            f.write(b"".join(self._INDEX_RECORD.pack(*entry) for entry in entries))
+
+    # ---- Storage ----
 
     def _insert(self, message: ModelMessage) -> None:
-        with self.file_path.open("a") as f:
-            f.write(message.to_json() + "\n")
-            logger.info(f"Appended message to chat memory file '{self.file_path}': {message}")
+        line = message.to_json().encode("utf-8")
+        if self._restore:
+            # index the lines appended by other instances first, so the index stays contiguous
+            self._sync_index()
+        with self.file_path.open("ab") as f:
+            offset = f.tell()
+            f.write(line + b"\n")
+        if self._restore:
+            entry = self._index_entry(offset, line, message.id, message.type)
+            self._append_index([entry])
+            self._index.append(entry)
+            self._parsed[offset] = message
+            stat = os.stat(self.file_path)
+            self._index_file_id = (stat.st_ino, stat.st_size)
+        logger.info(f"Appended message to chat memory file '{self.file_path}': {message}")
 
     def _write(self) -> None:
-        with self.file_path.open("w") as f:
+        # write to temporary files first, so a concurrent reader never sees a partial memory file
+        tmp_path = self.file_path.with_suffix(".tmp")
+        tmp_index_path = self.index_path.with_suffix(".idx.tmp")
+        index, parsed = [], {}
+        with tmp_path.open("wb") as f, tmp_index_path.open("wb") as fi:
+            # the temporary file keeps its inode when it replaces the memory file
+            fi.write(self._INDEX_HEADER.pack(self._INDEX_MAGIC, os.fstat(f.fileno()).st_ino))
             for message in self._messages:
+                line = message.to_json().encode("utf-8")
+                entry = self._index_entry(f.tell(), line, message.id, message.type)
+                f.write(line + b"\n")
+                fi.write(self._INDEX_RECORD.pack(*entry))
+                index.append(entry)
+                parsed[entry[0]] = message
+        os.replace(tmp_path, self.file_path)
+        os.replace(tmp_index_path, self.index_path)
+        stat = os.stat(self.file_path)
+        self._index, self._parsed, self._index_file_id = index, parsed, (stat.st_ino, stat.st_size)
+        self._messages_file_id = self._index_file_id
+
+    def _reload(self) -> None:
+        self._messages = None
+        self._read()
+
+    def _archive(self, messages: list[ModelMessage]) -> None:
+        if not messages:
+            return
+        with gzip.open(self.archive_path, "at") as f:
+            for message in messages:
                 f.write(message.to_json() + "\n")
+        logger.info(f"Archived {len(messages)} messages to '{self.archive_path}'")
+
+
+class ChatMemoryWriteError(RuntimeError):
+    pass
+
+
+class SqliteChatMemoryStore:
+    """
+    Shared SQLite (WAL) storage of the chat memories of all contexts.
+
+    Messages are indexed by (context_id, seq). Appends are queued and written by a background writer thread
+    in group-commit transactions of up to `batch_size` messages, at most `flush_interval` seconds after
+    the append. The sequence numbers are allocated in the write transaction, so several processes can share
+    the database. Reads first wait for the pending appends of their context, and use one connection per thread.
+    Write errors are raised by the next `flush` of the context.
+    Compacted messages are moved to the `chat_messages_archive` table.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 256, flush_interval: float = 0.05) -> None:
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._local = threading.local()
+        self._write_conn = self._connect()
+        self._write_lock = threading.Lock()
+        self._write_conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                context_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                role TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (context_id, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_id ON chat_messages(context_id, id);
+            CREATE TABLE IF NOT EXISTS chat_messages_archive (
+                context_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                role TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created REAL NOT NULL,
+                archived REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_archive_context ON chat_messages_archive(context_id, seq);
+        """)
+
+        self._queue: list[tuple] = []
+        self._pending: dict[str, int] = {}
+        self._errors: dict[str, Exception] = {}
+        self._cond = threading.Condition()
+        self._urgent = False
+        self._stopped = False
+        self._stats = {"appended": 0, "commits": 0, "errors": 0}
+        self._writer = threading.Thread(target=self._run, name="chat-memory-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA busy_timeout=5000;")
+        return conn
+
+    @property
+    def _read_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ---- Writes ----
+
+    def append(self, context_id: str, message: ModelMessage) -> None:
+        """Queue a message for the next group commit."""
+        row = (context_id, message.id, message.type, message.role, message.to_json(), time.time(), context_id)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Chat memory store is closed")
+            self._queue.append(row)
+            self._pending[context_id] = self._pending.get(context_id, 0) + 1
+            self._cond.notify_all()
+
+    def _insert_rows(self, rows: list[tuple]) -> None:
+        # the next sequence number of the context is allocated in the (exclusive) write transaction
+        with self._write_lock:
+            self._write_conn.execute("BEGIN IMMEDIATE;")
+            try:
+                self._write_conn.executemany(
+                    "INSERT INTO chat_messages(context_id, seq, id, type, role, data, created) "
+                    "SELECT ?1, COALESCE(MAX(seq), 0) + 1, ?2, ?3, ?4, ?5, ?6 FROM chat_messages "
+                    "WHERE context_id = ?7", rows)
+                self._write_conn.execute("COMMIT;")
+            except Exception:
+                self._write_conn.execute("ROLLBACK;")
+                raise
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # group commit: collect the appends of the next flush_interval, unless a reader is waiting
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._urgent and not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+                self._urgent = False
+
+            errors: dict[str, Exception] = {}
+            try:
+                self._insert_rows(batch)
+                self._stats["appended"] += len(batch)
+                self._stats["commits"] += 1
+            except Exception as e:
+                # the group commit failed, write the messages one by one, so only the failing messages are lost
+                logger.warning(f"Failed to write {len(batch)} chat messages, retrying one by one: {e}")
+                for row in batch:
+                    try:
+                        self._insert_rows([row])
+                        self._stats["appended"] += 1
+                        self._stats["commits"] += 1
+                    except Exception as row_error:
+                        self._stats["errors"] += 1
+                        errors.setdefault(row[0], row_error)
+                        logger.error(f"Failed to write chat message {row[1]} of context {row[0]}: {row_error}")
+            finally:
+                with self._cond:
+                    self._errors.update(errors)
+                    for row in batch:
+                        self._pending[row[0]] -= 1
+                        if self._pending[row[0]] <= 0:
+                            del self._pending[row[0]]
+                    self._cond.notify_all()
+
+    def flush(self, context_id: str | None = None) -> None:
+        """
+        Wait until the pending appends (of a context, or of all contexts) are committed.
+
+        :raises ChatMemoryWriteError: If appended messages could not be written since the last flush.
+        """
+        with self._cond:
+            while (self._pending.get(context_id) if context_id else self._pending) and self._writer.is_alive():
+                self._urgent = True
+                self._cond.notify_all()
+                self._cond.wait(1.0)
+            if context_id:
+                error = self._errors.pop(context_id, None)
+                failed = [context_id] if error else []
+            else:
+                failed, error = list(self._errors), next(iter(self._errors.values()), None)
+                self._errors.clear()
+        if error is not None:
+            raise ChatMemoryWriteError(f"Failed to write chat messages of context(s) {', '.join(failed)}: {error}") \
+                from error
+
+    def replace(self, context_id: str, messages: list[ModelMessage]) -> None:
+        """Replace all messages of the context."""
+        self.flush(context_id)
+        now = time.time()
+        rows = [(context_id, seq, message.id, message.type, message.role, message.to_json(), now)
+                for seq, message in enumerate(messages, start=1)]
+        with self._write_lock:
+            self._write_conn.execute("BEGIN IMMEDIATE;")
+            try:
+                self._write_conn.execute("DELETE FROM chat_messages WHERE context_id = ?", (context_id,))
+                self._write_conn.executemany(
+                    "INSERT INTO chat_messages(context_id, seq, id, type, role, data, created) "
+                    "VALUES(?, ?, ?, ?, ?, ?, ?)", rows)
+                self._write_conn.execute("COMMIT;")
+            except Exception:
+                self._write_conn.execute("ROLLBACK;")
+                raise
+
+    def archive(self, context_id: str, message_ids: list[str]) -> None:
+        """Move messages of the context to the archive table."""
+        self.flush(context_id)
+        placeholders = ",".join("?" * len(message_ids))
+        with self._write_lock:
+            self._write_conn.execute("BEGIN IMMEDIATE;")
+            try:
+                self._write_conn.execute(
+                    f"INSERT INTO chat_messages_archive(context_id, seq, id, type, role, data, created, archived) "
+                    f"SELECT context_id, seq, id, type, role, data, created, ? FROM chat_messages "
+                    f"WHERE context_id = ? AND id IN ({placeholders})", (time.time(), context_id, *message_ids))
+                self._write_conn.execute(
+                    f"DELETE FROM chat_messages WHERE context_id = ? AND id IN ({placeholders})",
+                    (context_id, *message_ids))
+                self._write_conn.execute("COMMIT;")
+            except Exception:
+                self._write_conn.execute("ROLLBACK;")
+                raise
+
+    # ---- Reads ----
+
+    def read(self, context_id: str, start: int | None = None, end: int | None = None) -> list[tuple[int, str, str]]:
+        """
+        Read a range of messages of the context.
+
+        :param start: The first sequence number (inclusive).
+        :param end: The last sequence number (exclusive).
+        :return: (seq, message ID, message JSON) tuples, ordered by seq.
+        """
+        self.flush(context_id)
+        return self._read_conn.execute(
+            "SELECT seq, id, data FROM chat_messages WHERE context_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (context_id, start or 0, end if end is not None else 2 ** 62)).fetchall()
+
+    def tail(self, context_id: str, n: int, pinned: bool = True) -> list[tuple[int, str, str]]:
+        """The last n messages of the context, and the pinned summaries before them."""
+        self.flush(context_id)
+        rows = self._read_conn.execute(
+            "SELECT seq, id, data FROM chat_messages WHERE context_id = ? ORDER BY seq DESC LIMIT ?",
+            (context_id, max(n, 0))).fetchall()[::-1]
+        if pinned:
+            first_seq = rows[0][0] if rows else 2 ** 62
+            rows = self._read_conn.execute(
+                "SELECT seq, id, data FROM chat_messages WHERE context_id = ? AND seq < ? AND type = 'summary' "
+                "ORDER BY seq", (context_id, first_seq)).fetchall() + rows
+        return rows
+
+    def seq_of(self, context_id: str, message_id: str) -> int | None:
+        self.flush(context_id)
+        row = self._read_conn.execute("SELECT MAX(seq) FROM chat_messages WHERE context_id = ? AND id = ?",
+                                      (context_id, message_id)).fetchone()
+        return row[0]
+
+    def count(self, context_id: str) -> int:
+        self.flush(context_id)
+        return self._read_conn.execute("SELECT COUNT(*) FROM chat_messages WHERE context_id = ?",
+                                       (context_id,)).fetchone()[0]
+
+    def contexts(self) -> list[str]:
+        self.flush()
+        return [row[0] for row in self._read_conn.execute("SELECT DISTINCT context_id FROM chat_messages")]
+
+    def export(self, f, context_ids: list[str] | None = None, archived: bool = False) -> int:
+        """
+        Export messages as JSONL ({"context_id", "seq", "message"} per line) to a text file object.
+
+        :param context_ids: Only export these contexts. Defaults to all contexts.
+        :param archived: Export the archived messages instead of the current messages.
+        :return: The number of exported messages.
+        """
+        self.flush()
+        table = "chat_messages_archive" if archived else "chat_messages"
+        sql = f"SELECT context_id, seq, data FROM {table}"
+        params: tuple = ()
+        if context_ids is not None:
+            sql += f" WHERE context_id IN ({','.join('?' * len(context_ids))})"
+            params = tuple(context_ids)
+        count = 0
+        # a dedicated connection, so the export reads a consistent snapshot without blocking other readers
+        conn = self._connect()
+        try:
+            for context_id, seq, data in conn.execute(sql + " ORDER BY context_id, seq", params):
+                f.write(f'{{"context_id": {json.dumps(context_id)}, "seq": {seq}, "message": {data}}}\n')
+                count += 1
+        finally:
+            conn.close()
+        return count
+
+    def import_jsonl(self, context_id: str, file_path: str | Path) -> int:
+        """Import the messages of a JSONL chat memory file into the context."""
+        count = 0
+        with open(file_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    self.append(context_id, ModelMessage.model_validate_json(line))
+                    count += 1
+        self.flush(context_id)
+        return count
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "pending": len(self._queue)}
+
+    def close(self) -> None:
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify_all()
+        self._writer.join(timeout=10)
+        with self._write_lock:
+            self._write_conn.close()
+
+
+class SqliteChatMemory(ChatMemory):
+    """
+    Chat memory of a context in the shared SQLite chat memory store.
+
+    Messages are read on access, by range or from the tail, and the parsed messages are kept per sequence number.
+    """
+
+    def __init__(self, store: SqliteChatMemoryStore, context_id: str) -> None:
+        super().__init__()
+        self.store = store
+        self.context_id = context_id
+        self._messages = None
+        self._parsed: dict[int, ModelMessage] = {}
+
+    def _parse(self, rows: list[tuple[int, str, str]]) -> list[ModelMessage]:
+        messages = []
+        for seq, message_id, data in rows:
+            message = self._parsed.get(seq)
+            # the messages are renumbered when the memory is rewritten (e.g. compacted by another instance)
+            if message is None or message.id != message_id:
+                message = self._parsed[seq] = ModelMessage.model_validate_json(data)
+            messages.append(message)
+        return messages
+
+    @property
+    def messages(self) -> list[ModelMessage]:
+        if self._messages is None:
+            self._messages = self._parse(self.store.read(self.context_id))
+        return self._messages
+
+    def append(self, message: ModelMessage) -> None:
+        """Add a message to the memory."""
+        if self._messages is not None:
+            self._messages.append(message)
+        self._insert(message)
+
+    def range(self, start: int | None = None, end: int | None = None) -> list[ModelMessage]:
+        """The messages with sequence numbers in [start, end)."""
+        return self._parse(self.store.read(self.context_id, start, end))
+
+    def tail(self, n: int, pinned: bool = True) -> list[ModelMessage]:
+        return self._parse(self.store.tail(self.context_id, n, pinned=pinned))
+
+    def since(self, message_id: str) -> list[ModelMessage]:
+        seq = self.store.seq_of(self.context_id, message_id)
+        return self.range(start=seq + 1 if seq is not None else None)
+
+    def __len__(self) -> int:
+        return self.store.count(self.context_id)
+
+    def _insert(self, message: ModelMessage) -> None:
+        self.store.append(self.context_id, message)
+
+    def _write(self) -> None:
+        self.store.replace(self.context_id, self._messages)
+        self._parsed = {}
+
+    def _reload(self) -> None:
+        self._messages = None
+        self._parsed = {}
+        self._messages = self.messages
+
+    def _archive(self, messages: list[ModelMessage]) -> None:
+        if messages:
+            self.store.archive(self.context_id, [message.id for message in messages])
+
+
+class ChatMemoryCache:
+    """
+    Bounded LRU cache of live chat memories by context ID.
+
+    Active conversations are served from the cached memory instances, appends are written through
+    to the storage of the memory. Memories idle for more than `idle_ttl` seconds are evicted.
+    The per-context locks serialize the turns of a conversation, so concurrent turns on the same
+    context can't interleave their reads and writes.
+
+    :param factory: Creates (opens) the chat memory of a context ID.
+    :param max_size: Maximum number of cached memories.
+    :param idle_ttl: Seconds after which an unused memory is evicted.
+    """
+
+    def __init__(self, factory: Callable[[str], ChatMemory], max_size: int = 256, idle_ttl: float = 1800) -> None:
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._memories: OrderedDict[str, tuple[ChatMemory, float]] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, context_id: str) -> ChatMemory:
+        """Return the cached memory of the context, or open it."""
+        with self._lock:
+            entry = self._memories.get(context_id)
+            if entry is not None:
+                self._memories[context_id] = (entry[0], time.monotonic())
+                self._memories.move_to_end(context_id)
+                self._stats["hits"] += 1
+                return entry[0]
+
+        memory = self._factory(context_id)
+        with self._lock:
+            # another request may have opened the memory concurrently
+            entry = self._memories.get(context_id)
+            if entry is not None:
+                memory = entry[0]
+            self._memories[context_id] = (memory, time.monotonic())
+            self._memories.move_to_end(context_id)
+            self._stats["misses"] += 1
+            self._evict()
+        return memory
+
+    def lock(self, context_id: str) -> asyncio.Lock:
+        """The lock of the context, held for the duration of a conversation turn."""
+        with self._lock:
+            lock = self._locks.get(context_id)
+            if lock is None:
+                lock = self._locks[context_id] = asyncio.Lock()
+            return lock
+
+    def evict(self, context_id: str | None = None) -> None:
+        """Evict the memory of a context (or all memories), e.g. after the memory was modified externally."""
+        with self._lock:
+            for key in [context_id] if context_id else list(self._memories):
+                if self._memories.pop(key, None) is not None:
+                    self._stats["evictions"] += 1
+                self._release_lock(key)
+
+    def _evict(self) -> None:
+        # must hold the lock. Evict idle memories, and the least recently used memories above max_size.
+        now = time.monotonic()
+        for key, (_, last_used) in list(self._memories.items()):
+            if len(self._memories) <= self.max_size and now - last_used <= self.idle_ttl:
+                break
+            if key in self._locks and self._locks[key].locked():
+                continue  # a turn is in progress
+            del self._memories[key]
+            self._release_lock(key)
+            self._stats["evictions"] += 1
+
+    def _release_lock(self, key: str) -> None:
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._memories), "max_size": self.max_size}
+
+
+_sqlite_store: SqliteChatMemoryStore | None = None
+_sqlite_store_lock = threading.Lock()
+
+
+def get_sqlite_chat_memory_store() -> SqliteChatMemoryStore:
+    """Return the process-wide SQLite chat memory store."""
+    global _sqlite_store
+    with _sqlite_store_lock:
+        if _sqlite_store is None:
+            _sqlite_store = SqliteChatMemoryStore(config.CHAT_MEMORY_DB_PATH,
+                                                  batch_size=config.CHAT_MEMORY_BATCH_SIZE,
+                                                  flush_interval=config.CHAT_MEMORY_FLUSH_INTERVAL)
+        return _sqlite_store
+
+
+def open_chat_memory(context_id: str) -> ChatMemory:
+    """Open the persistent chat memory of a context, in the configured backend ("file" or "sqlite")."""
+    file_path = Path(f"{config.DATA_DIR}/sessions/chat/{context_id}/memory.jsonl")
+    if config.CHAT_MEMORY_BACKEND == "sqlite":
+        store = get_sqlite_chat_memory_store()
+        if file_path.exists() and store.count(context_id) == 0:
+            # migrate the conversation from the file backend
+            count = store.import_jsonl(context_id, file_path)
+            file_path.rename(file_path.with_suffix(".jsonl.migrated"))
+            logger.info(f"Imported {count} messages of context {context_id} into the SQLite chat memory")
+        return SqliteChatMemory(store, context_id)
+    return FileChatMemory(str(file_path), create=True, restore=True)
 
 
-# class SqliteChatMemory(ChatMemory):
-#     """SQLite-based implementation of chat memory."""
-#
-#     def __init__(self, db_path: str) -> None:
-#         super().__init__()
-#         self.db_path = Path(db_path).resolve()
-#
-#     @property
-#     def db(self) -> sqlite3.Connection:
-#         return sqlite3.connect(self.db_path)
-#
-#     def _read(self) -> None:
-#         with self.db as conn:
-#             cursor = conn.cursor()
-#             cursor.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, role TEXT, content TEXT)")
-#             cursor.execute("SELECT role, content FROM messages ORDER BY id")
-#             rows = cursor.fetchall()
-#             for role, content in rows:
-#                 message = ModelMessage(role=role, content=json.loads(content))
-#                 self._messages.append(message)
-#
-#     def _insert(self, message: ModelMessage) -> None:
-#         with self.db as conn:
-#             cursor = conn.cursor()
-#             cursor.execute("INSERT INTO messages (role, content) VALUES (?, ?)", (message.role, json.dumps(message.content)))
-#
-#     def _write(self) -> None:
-#         with self.db as conn:
-#             cursor = conn.cursor()
-#             cursor.execute("DELETE FROM messages")
-#             for message in self._messages:
-#                 cursor.execute("INSERT INTO messages (role, content) VALUES (?, ?)", (message.role, json.dumps(message.content)))
+chat_memories = ChatMemoryCache(
+    factory=open_chat_memory,
+    max_size=config.CHAT_MEMORY_CACHE_SIZE,
+    idle_ttl=config.CHAT_MEMORY_IDLE_TTL,
+)
@@ -0,0 +1,113 @@
+"""
+Prompt prefix tracking.
+
+Local inference servers (llama.cpp / Ollama) keep the KV cache of the previous prompt, and only evaluate the tokens
+after the longest common prefix with the previous prompt. Requests are therefore laid out from the most stable to
+the least stable content: system prompts, tools, message history, volatile system prompts (`volatile_system`)
+and the prompt.
+
+The tracker compares the layout of each request with the previous request of the same conversation and model,
+and reports in the response usage:
+
+  - `prefix_tokens`: tokens of the prompt prefix shared with the previous request
+  - `cached_tokens`: prompt tokens served from the provider's prompt cache. Reported by the provider, or
+    derived from the `prompt_eval_count` of Ollama (the prompt tokens which were actually evaluated)
+    for models with an exact tokenizer
+  - `estimated_cached_tokens`: the derived cached tokens of models without a tokenizer, based on the
+    estimated prompt tokens
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from geenii.context import ContextBuilder, MESSAGE_OVERHEAD_TOKENS, context_builder
+from geenii.datamodels import ChatCompletionRequest
+from geenii.tool.registry import ToolRegistry
+
+# Differences between the estimated prompt tokens and the evaluated prompt tokens below this fraction
+# of the prompt are attributed to the token estimate, not to the prompt cache
+_ESTIMATE_TOLERANCE = 0.1
+
+
+class PromptPrefixTracker:
+    """
+    Tracks the stable prompt prefix of the requests per conversation and model.
+
+    :param max_contexts: Maximum number of tracked conversations (LRU).
+    :param builder: The context builder used to count tokens.
+    """
+
+    def __init__(self, max_contexts: int = 1024, builder: ContextBuilder | None = None) -> None:
+        self.max_contexts = max_contexts
+        self.builder = builder or context_builder
+        self._layouts: OrderedDict[tuple[str, str], list[bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "prompt_tokens": 0, "prefix_tokens": 0, "cached_tokens": 0,
+                       "estimated_cached_tokens": 0, "prompt_eval_tokens": 0, "prefix_breaks": 0}
+
+    def _blocks(self, request: ChatCompletionRequest) -> tuple[list[bytes], list[int]]:
+        # the stable part of the request as a sequence of blocks, with the token count of each block
+        texts = [f"system:{text}" for text in request.system or []]
+        texts.append("tools:" + json.dumps(sorted(request.tools or [])))
+        texts.extend(f"{message.role}:{message.to_text()}" for message in request.messages or [])
+        hashes = [hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest() for text in texts]
+        counts = self.builder.counter.count_batch(request.model, [text.split(":", 1)[1] for text in texts])
+        # the tool definitions are rendered by the provider, their size is not known here
+        counts = [count + MESSAGE_OVERHEAD_TOKENS if not text.startswith("tools:") else 0
+                  for text, count in zip(texts, counts)]
+        return hashes, counts
+
+    def record(self, request: ChatCompletionRequest, usage: dict, tool_registry: ToolRegistry | None = None) -> dict:
+        """
+        Compare the request with the previous request of the conversation, and add the prefix metrics to the usage.
+
+        :return: The updated usage.
+        """
+        if usage is None or usage.get("cache") == "hit" or not request.context_id:
+            return usage
+        hashes, counts = self._blocks(request)
+        key = (request.context_id, request.model or "")
+        with self._lock:
+            previous = self._layouts.pop(key, None)
+            self._layouts[key] = hashes
+            while len(self._layouts) > self.max_contexts:
+                self._layouts.popitem(last=False)
+
+        shared = 0
+        if previous:
+            while shared < min(len(previous), len(hashes)) and previous[shared] == hashes[shared]:
+                shared += 1
+        prefix_tokens = sum(counts[:shared])
+        prompt_tokens = self.builder.count_request(request, tool_registry)
+        usage["prefix_tokens"] = prefix_tokens
+
+        prompt_eval_count = usage.get("prompt_eval_count")
+        if "cached_tokens" not in usage and prompt_eval_count is not None:
+            cached = prompt_tokens - prompt_eval_count
+            cached = cached if cached > prompt_tokens * _ESTIMATE_TOLERANCE else 0
+            # estimated prompt tokens only give an estimate, which is not reported as the provider's cached tokens
+            exact = self.builder.counter.is_exact(request.model)
+            usage["cached_tokens" if exact else "estimated_cached_tokens"] = cached
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["prefix_tokens"] += prefix_tokens
+            self._stats["cached_tokens"] += usage.get("cached_tokens") or 0
+            self._stats["estimated_cached_tokens"] += usage.get("estimated_cached_tokens") or 0
+            self._stats["prompt_eval_tokens"] += prompt_eval_count or 0
+            # the previous request was a prefix of this request, but a block in the middle changed
+            if previous and shared < min(len(previous), len(hashes)):
+                self._stats["prefix_breaks"] += 1
+        return usage
+
+    def stats(self) -> dict:
+        with self._lock:
+            prompt_tokens = self._stats["prompt_tokens"]
+            return {**self._stats, "contexts": len(self._layouts),
+                    "prefix_ratio": round(self._stats["prefix_tokens"] / prompt_tokens, 3) if prompt_tokens else None}
+
+
+prompt_prefix_tracker = PromptPrefixTracker()
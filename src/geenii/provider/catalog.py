@@ -0,0 +1,131 @@
+"""Model catalogue with per-provider caching and background refresh."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Callable
+
+from geenii.datamodels import AIModelInfo
+from geenii.provider.interfaces import AIProvider
+
+logger = logging.getLogger(__name__)
+
+
+class _CatalogEntry:
+    def __init__(self) -> None:
+        self.models: list[AIModelInfo] = []
+        self.fetched_at: float | None = None
+        self.expires_at: float = 0.0
+        self.error: str | None = None
+        self.refresh: Future | None = None
+
+
+class ModelCatalog:
+    """
+    Caches the model lists of all AI providers.
+
+    - Providers are fetched in parallel, in a small thread pool.
+    - Each provider entry has its own TTL. Expired entries are served stale while they are
+      revalidated in the background.
+    - Failed fetches are cached for `error_ttl` seconds (the last known models are kept), so a provider
+      that is down does not add its timeout to every listing.
+    - A listing waits at most `fetch_timeout` seconds for providers without any cached models,
+      slow providers are added to the catalogue when their fetch completes.
+    """
+
+    def __init__(self,
+                 provider_names: Callable[[], list[str]],
+                 get_provider: Callable[[str], AIProvider],
+                 ttl: float = 3600,
+                 provider_ttls: dict[str, float] | None = None,
+                 error_ttl: float = 60,
+                 fetch_timeout: float = 5.0,
+                 max_workers: int = 4) -> None:
+        self._provider_names = provider_names
+        self._get_provider = get_provider
+        self.ttl = ttl
+        self.provider_ttls = provider_ttls or {}
+        self.error_ttl = error_ttl
+        self.fetch_timeout = fetch_timeout
+        self._entries: dict[str, _CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-catalog")
+
+    def list_models(self, refresh: bool = False) -> list[AIModelInfo]:
+        """
+        List the models of all providers.
+
+        :param refresh: Fetch all providers, and wait (up to `fetch_timeout`) for the results.
+        """
+        names = self._provider_names()
+        now = time.time()
+        pending = []
+        with self._lock:
+            for name in names:
+                entry = self._entries.setdefault(name, _CatalogEntry())
+                if refresh or entry.expires_at <= now:
+                    future = self._schedule_refresh(name, entry)
+                    # only wait for providers we have never fetched, known-down providers are refreshed in the background
+                    if refresh or (entry.fetched_at is None and entry.error is None):
+                        pending.append(future)
+
+        if pending:
+            done, not_done = wait(pending, timeout=self.fetch_timeout)
+            if not_done:
+                logger.warning(f"Model listing timed out for {len(not_done)} provider(s), serving partial catalogue")
+
+        models = []
+        with self._lock:
+            for name in names:
+                models.extend(self._entries[name].models)
+        return models
+
+    def invalidate(self, provider: str | None = None) -> None:
+        """Expire the cached models of a provider (or all providers), the next listing refreshes them."""
+        with self._lock:
+            for name, entry in self._entries.items():
+                if provider is None or name == provider.lower():
+                    entry.expires_at = 0.0
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "models": len(entry.models),
+                    "fetched_at": entry.fetched_at,
+                    "expires_at": entry.expires_at,
+                    "error": entry.error,
+                    "refreshing": entry.refresh is not None,
+                }
+                for name, entry in self._entries.items()
+            }
+
+    def _schedule_refresh(self, name: str, entry: _CatalogEntry) -> Future:
+        # at most one refresh per provider in flight
+        if entry.refresh is None:
+            entry.refresh = self._executor.submit(self._refresh, name)
+        return entry.refresh
+
+    def _refresh(self, name: str) -> None:
+        try:
+            ai_provider = self._get_provider(name)
+            models = ai_provider.get_models() if ai_provider.is_configured() else []
+            error = None
+        except Exception as e:
+            logger.warning(f"Failed to fetch models from provider '{name}': {e}")
+            models, error = None, str(e)
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.setdefault(name, _CatalogEntry())
+            entry.refresh = None
+            if error is None:
+                entry.models = models
+                entry.fetched_at = now
+                entry.error = None
+                entry.expires_at = now + self.provider_ttls.get(name, self.ttl)
+            else:
+                # negative caching: keep the last known models, retry after error_ttl
+                entry.error = error
+                entry.expires_at = now + self.error_ttl
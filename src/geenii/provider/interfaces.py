@@ -1,9 +1,10 @@
 import abc
-from typing import List
+import asyncio
+from typing import List, AsyncGenerator
 
 from geenii.datamodels import CompletionResponse, ImageGenerationApiResponse, AudioTranscriptionApiResponse, \
     AudioSpeechGenerationApiResponse, AudioTranslationApiResponse, ChatCompletionResponse, ChatCompletionRequest, \
-    AIModelInfo, AudioTranscriptionApiRequest
+    AIModelInfo, AudioTranscriptionApiRequest, ChatCompletionChunk, EmbeddingResponse
 
 
 class AIProvider(abc.ABC):
@@ -30,7 +31,11 @@ class AIProvider(abc.ABC):
 
     @abc.abstractmethod
     def get_models(self) -> list[AIModelInfo]:
-        """Return a list of models available in this AI provider"""
+        """Return a list of models available in this AI provider. Raises if the provider is unreachable."""
+        pass
+
+    def close(self) -> None:
+        """Release any resources (e.g. HTTP connection pools) held by this AI provider"""
         pass
 
 
@@ -57,6 +62,58 @@ class AIChatCompletionProvider(abc.ABC):
         """Get an AI chat completion with tooling support for the given prompt and tools"""
         pass
 
+    async def stream_chat_completion(self, request: ChatCompletionRequest, tool_registry = None) \
+            -> AsyncGenerator[ChatCompletionChunk, None]:
+        """
+        Stream an AI chat completion as incremental output deltas.
+        The last chunk is marked as `done` and carries the aggregated ChatCompletionResponse.
+
+        Providers without native streaming support fall back to a single chunk with the full response.
+        """
+        response = await asyncio.to_thread(self.generate_chat_completion, request, tool_registry)
+        delta = [part for part in (response.output or []) if part.type in ("text", "tool_call")]
+        yield ChatCompletionChunk(id=response.id, index=0, model=response.model, context_id=response.context_id,
+                                  delta=delta, reasoning_delta=response.reasoning_output, done=True, response=response)
+
+
+class AsyncAIChatCompletionProvider(abc.ABC):
+    """Abstract base class for AI chat completion providers with native async I/O.
+    Async providers are awaited directly on the event loop, instead of blocking a worker thread
+    for the duration of the completion request.
+    """
+
+    @abc.abstractmethod
+    async def agenerate_chat_completion(self, request: ChatCompletionRequest, tool_registry = None) -> ChatCompletionResponse:
+        """Get an AI chat completion with tooling support for the given prompt and tools"""
+        pass
+
+
+class AIModelWarmupProvider(abc.ABC):
+    """Abstract base class for AI providers serving models that need to be loaded before use (e.g. local models).
+    Warm-up requests preload a model and keep it loaded, so interactive requests do not pay for cold loads.
+    """
+
+    @abc.abstractmethod
+    async def awarm_up(self, model: str, keep_alive: str | None = None) -> dict:
+        """Load the model and keep it loaded for `keep_alive`. Returns the load metrics (e.g. `load_duration` in ms)"""
+        pass
+
+
+class AIEmbeddingProvider(abc.ABC):
+    """Abstract base class for AI embedding providers.
+    This class defines the interface for AI embedding providers, which can be used to
+    convert a batch of texts into vectors.
+    """
+
+    # Maximum number of inputs per embedding request, larger batches are split by the caller
+    MAX_EMBEDDING_BATCH_SIZE = 256
+
+    @abc.abstractmethod
+    def generate_embeddings(self, model: str, inputs: list[str], dimensions: int | None = None,
+                            **kwargs) -> EmbeddingResponse:
+        """Embed the given texts, returns one vector per input"""
+        pass
+
 
 class AIImageGeneratorProvider(abc.ABC):
     """Abstract base class for AI image generation providers.
@@ -0,0 +1,259 @@
+"""Pool of Ollama hosts with model residency routing, circuit breaking and failover."""
+
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+from typing import Callable, Awaitable, TypeVar
+
+import httpx
+import ollama
+
+from geenii.provider.registry import http_pool_limits, close_http_client, close_async_http_client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class OllamaHost:
+    """A single Ollama endpoint with its long-lived clients, load and health state."""
+
+    def __init__(self, url: str, headers: dict) -> None:
+        self.url = url
+        self.headers = headers
+        self._client = None
+        self._async_client = None
+        self._async_client_loop = None
+        self._client_lock = threading.Lock()
+
+        self.in_flight = 0
+        self.loaded_models: set[str] = set()
+        self.residency_updated_at: float | None = None
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.last_error: str | None = None
+
+    @property
+    def client(self) -> ollama.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # the client is long-lived, re-use keep-alive connections across requests
+                    self._client = ollama.Client(host=self.url, headers=self.headers, limits=http_pool_limits())
+        return self._client
+
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        # async http clients are bound to the event loop they were created in
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            with self._client_lock:
+                if self._async_client is None or self._async_client_loop is not loop:
+                    close_async_http_client(self._async_client, self._async_client_loop)
+                    self._async_client = ollama.AsyncClient(host=self.url, headers=self.headers,
+                                                            limits=http_pool_limits())
+                    self._async_client_loop = loop
+        return self._async_client
+
+    def has_model(self, model: str | None) -> bool:
+        if not model:
+            return False
+        return model in self.loaded_models or (":" not in model and f"{model}:latest" in self.loaded_models)
+
+    def close(self) -> None:
+        with self._client_lock:
+            close_http_client(self._client)
+            close_async_http_client(self._async_client, self._async_client_loop)
+            self._client = None
+            self._async_client = None
+            self._async_client_loop = None
+
+    def status(self) -> dict:
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "loaded_models": sorted(self.loaded_models),
+            "healthy": self.open_until <= time.time(),
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaHostPool:
+    """
+    Routes Ollama requests across several hosts.
+
+    Host selection prefers, in this order:
+      1. hosts with a closed circuit (healthy, or half-open after the cooldown),
+      2. hosts that already have the model loaded (avoids multi-second cold loads),
+      3. hosts with fewer in-flight requests.
+
+    Model residency is polled from `/api/ps` in a background thread (which also serves as health check),
+    and updated after each successful request.
+    After `failure_threshold` consecutive connection or server errors, a host's circuit opens for `cooldown`
+    seconds. Failed requests are retried on another host.
+    """
+
+    def __init__(self, urls: list[str], headers: dict | None = None,
+                 failure_threshold: int = 3, cooldown: float = 30.0,
+                 residency_interval: float = 10.0, probe_timeout: float = 2.0) -> None:
+        if not urls:
+            raise ValueError("At least one Ollama host is required")
+        self.hosts = [OllamaHost(url, headers or {}) for url in urls]
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.residency_interval = residency_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: threading.Thread | None = None
+
+    @property
+    def primary(self) -> OllamaHost:
+        """The first healthy host, e.g. for requests that are not bound to a model."""
+        return self.select(None)
+
+    def select(self, model: str | None, exclude: set[str] = None) -> OllamaHost:
+        """Select the best host for the model. Raises if all hosts are excluded."""
+        self._ensure_poller()
+        exclude = exclude or set()
+        now = time.time()
+        with self._lock:
+            candidates = [host for host in self.hosts if host.url not in exclude]
+            if not candidates:
+                raise ConnectionError("No Ollama host available")
+            return min(candidates, key=lambda host: (
+                host.open_until > now,  # circuit open
+                not host.has_model(model),
+                host.in_flight,
+                host.consecutive_failures,
+            ))
+
+    @contextlib.contextmanager
+    def lease(self, host: OllamaHost):
+        """Track the request as in-flight on the host."""
+        with self._lock:
+            host.in_flight += 1
+        try:
+            yield host
+        finally:
+            with self._lock:
+                host.in_flight -= 1
+
+    def call(self, model: str | None, fn: Callable[[ollama.Client], T]) -> T:
+        """Call `fn` with the client of the selected host, retrying on another host on host errors."""
+        tried = set()
+        while True:
+            host = self.select(model, exclude=tried)
+            tried.add(host.url)
+            try:
+                with self.lease(host):
+                    result = fn(host.client)
+                self.record_success(host, model)
+                return result
+            except Exception as e:
+                if not self.handle_error(host, e, can_retry=len(tried) < len(self.hosts)):
+                    raise
+
+    async def acall(self, model: str | None, fn: Callable[[ollama.AsyncClient], Awaitable[T]]) -> T:
+        """Await `fn` with the async client of the selected host, retrying on another host on host errors."""
+        tried = set()
+        while True:
+            host = self.select(model, exclude=tried)
+            tried.add(host.url)
+            try:
+                with self.lease(host):
+                    result = await fn(host.async_client)
+                self.record_success(host, model)
+                return result
+            except Exception as e:
+                if not self.handle_error(host, e, can_retry=len(tried) < len(self.hosts)):
+                    raise
+
+    def record_success(self, host: OllamaHost, model: str | None = None) -> None:
+        with self._lock:
+            host.consecutive_failures = 0
+            host.open_until = 0.0
+            host.last_error = None
+            if model:
+                # the host has loaded the model to serve the request
+                host.loaded_models.add(model)
+
+    def record_failure(self, host: OllamaHost, error: Exception) -> None:
+        with self._lock:
+            host.consecutive_failures += 1
+            host.last_error = str(error)
+            if host.consecutive_failures >= self.failure_threshold:
+                host.open_until = time.time() + self.cooldown
+                host.loaded_models.clear()
+                logger.warning(f"Ollama host {host.url} failed {host.consecutive_failures} times, "
+                               f"opening circuit for {self.cooldown}s: {error}")
+
+    def handle_error(self, host: OllamaHost, error: Exception, can_retry: bool) -> bool:
+        """Record the error and return True if the request should be retried on another host."""
+        retry, host_fault = classify_error(error)
+        if host_fault:
+            self.record_failure(host, error)
+        if retry and can_retry:
+            logger.warning(f"Ollama request on {host.url} failed, retrying on another host: {error}")
+            return True
+        return False
+
+    def refresh_residency(self) -> None:
+        """Poll the loaded models (`/api/ps`) of all hosts."""
+        for host in self.hosts:
+            probe = ollama.Client(host=host.url, headers=host.headers, timeout=self.probe_timeout)
+            try:
+                loaded = {m.model for m in probe.ps().models}
+            except Exception as e:
+                self.record_failure(host, e)
+                continue
+            finally:
+                close_http_client(probe)
+            with self._lock:
+                host.loaded_models = loaded
+                host.residency_updated_at = time.time()
+            self.record_success(host)
+
+    def _ensure_poller(self) -> None:
+        # residency routing is only useful with several hosts
+        if self._poller is not None or len(self.hosts) < 2 or self._stop.is_set():
+            return
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name="ollama-host-poller", daemon=True)
+                self._poller.start()
+
+    def _poll(self) -> None:
+        while not self._stop.is_set():
+            self.refresh_residency()
+            self._stop.wait(self.residency_interval)
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            return [host.status() for host in self.hosts]
+
+    def close(self) -> None:
+        self._stop.set()
+        for host in self.hosts:
+            host.close()
+
+
+def classify_error(error: Exception) -> tuple[bool, bool]:
+    """
+    Classify an Ollama request error.
+
+    :return: A tuple (retry on another host, count as host failure).
+    """
+    if isinstance(error, ollama.ResponseError):
+        if error.status_code == 404:
+            # the model is not available on this host, it may be available on another one
+            return True, False
+        if error.status_code >= 500:
+            return True, True
+        return False, False
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True, True
+    return False, False
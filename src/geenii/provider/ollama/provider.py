@@ -1,23 +1,28 @@
 import json
+import threading
 import time
 import uuid
-from typing import List
+from typing import List, AsyncGenerator
 import logging
 
 import ollama
+from ollama import ChatResponse, ListResponse
 
 from geenii import config
 from geenii.chat.chat_models import TextContent, ToolCallContent, ContentPart, ToolCallResultContent, JsonContent
 from geenii.config import CACHE_DIR
 from geenii.datamodels import CompletionResponse, ChatCompletionResponse, ChatCompletionRequest, AIModelInfo, \
-    ModelMessage
-from geenii.provider.interfaces import AIProvider, AICompletionProvider, AIChatCompletionProvider
-from geenii.utils.json_util import write_json
+    ModelMessage, ChatCompletionChunk, EmbeddingResponse
+from geenii.provider.interfaces import AIProvider, AICompletionProvider, AIChatCompletionProvider, \
+    AsyncAIChatCompletionProvider, AIModelWarmupProvider, AIEmbeddingProvider
+from geenii.provider.ollama.hosts import OllamaHostPool
+from geenii.utils.json_util import write_json_if_changed
 
 logger = logging.getLogger(__name__)
 
 
-class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider):
+class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider, AsyncAIChatCompletionProvider,
+                       AIModelWarmupProvider, AIEmbeddingProvider):
     DEFAULT_MODEL = "qwen:3b"
     DEFAULT_TEMPERATURE = 0.2
     DEFAULT_MAX_TOKENS = 4096
@@ -34,34 +39,57 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
         """
         super().__init__(name="ollama")
         # self.client = get_ollama_client()
-        self._client = None
+        self._hosts = None
+        self._client_lock = threading.Lock()
+
+    @staticmethod
+    def _client_headers() -> dict:
+        headers = {}
+        if config.OLLAMA_API_KEY:
+            headers['Authorization'] = f"Bearer {config.OLLAMA_API_KEY}"
+        return headers
+
+    @property
+    def hosts(self) -> OllamaHostPool:
+        """The pool of Ollama hosts, requests are routed by model residency, load and health."""
+        if self._hosts is None:
+            with self._client_lock:
+                if self._hosts is None:
+                    self._hosts = OllamaHostPool(config.OLLAMA_HOSTS,
+                                                 headers=self._client_headers(),
+                                                 failure_threshold=config.OLLAMA_CIRCUIT_FAILURE_THRESHOLD,
+                                                 cooldown=config.OLLAMA_CIRCUIT_COOLDOWN,
+                                                 residency_interval=config.OLLAMA_RESIDENCY_INTERVAL)
+        return self._hosts
 
     @property
     def ollama(self):
-        if self._client is None:
-            headers = {}
-            if config.OLLAMA_API_KEY:
-                headers['Authorization'] = f"Bearer {config.OLLAMA_API_KEY}"
-            self._client = ollama.Client(host=config.OLLAMA_HOST, headers=headers)
-        return self._client
+        """Client of the best available host, for requests that are not bound to a model."""
+        return self.hosts.primary.client
+
+    def close(self) -> None:
+        with self._client_lock:
+            if self._hosts is not None:
+                self._hosts.close()
+            self._hosts = None
 
     def is_configured(self) -> bool:
-        return config.OLLAMA_HOST
+        return bool(config.OLLAMA_HOSTS)
 
     def get_capabilities(self) -> list[str]:
-        return ['completion', 'chat_completion', 'tool_calling']
+        return ['completion', 'chat_completion', 'tool_calling', 'embeddings']
 
     def get_models(self) -> list[AIModelInfo]:
         models = []
         # map the ollama models to our internal AIModelInfo format
         try:
-            ollama_models = self.ollama.list()
+            ollama_models = self._list_models()
 
             cache_data = {"models": [model.model_dump(mode="json") for model in ollama_models.models]}
-            write_json(f"{CACHE_DIR}/ollama.models.json", cache_data)
+            write_json_if_changed(f"{CACHE_DIR}/ollama.models.json", cache_data)
         except Exception as e:
             logger.error(f"Error fetching models from Ollama: {e}")
-            return models
+            raise
 
         if ollama_models and ollama_models.models:
             for model in ollama_models.models:
@@ -81,6 +109,49 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
                 models.append(model_info)
         return models
 
+    async def awarm_up(self, model: str, keep_alive: str | None = None) -> dict:
+        """
+        Load the model into memory via the Ollama Generate API with an empty prompt.
+        The request is routed like a chat request, so the model is loaded on the host serving it.
+        """
+        if model.startswith("ollama:"):
+            model = model[len("ollama:"):]
+        result = await self.hosts.acall(model, lambda client: client.generate(model=model, prompt="",
+                                                                              keep_alive=keep_alive))
+        return {
+            'load_duration': int((result.get('load_duration') or 0) / 1_000_000),  # convert to milliseconds
+            'total_duration': int((result.get('total_duration') or 0) / 1_000_000),  # convert to milliseconds
+        }
+
+    def generate_embeddings(self, model: str, inputs: list[str], dimensions: int | None = None,
+                            **kwargs) -> EmbeddingResponse:
+        """Embed the texts via the Ollama Embed API, routed like a chat request to a host serving the model."""
+        args = {"dimensions": dimensions} if dimensions else {}
+        result = self.hosts.call(model, lambda client: client.embed(model=model, input=inputs, truncate=True, **args))
+        return EmbeddingResponse(
+            id=uuid.uuid4().hex,
+            timestamp=int(time.time()),
+            model=f"{self.name}:{model}",
+            embeddings=[list(vector) for vector in result.embeddings],
+            usage={"input_tokens": result.prompt_eval_count or 0,
+                   "total_duration": int((result.total_duration or 0) / 1_000_000)},
+        )
+
+    def _list_models(self) -> ListResponse:
+        """List the models of all hosts, models available on several hosts are listed once."""
+        models = {}
+        errors = []
+        for host in self.hosts.hosts:
+            try:
+                for model in host.client.list().models:
+                    models.setdefault(model.model, model)
+            except Exception as e:
+                logger.warning(f"Error fetching models from Ollama host {host.url}: {e}")
+                errors.append(e)
+        if errors and len(errors) == len(self.hosts.hosts):
+            raise errors[0]
+        return ollama.ListResponse(models=list(models.values()))
+
     def generate_chat_completion(self, request: ChatCompletionRequest, tool_registry=None) -> ChatCompletionResponse:
         """
         Get ollama completion for the given prompt via Ollama Chat API.
@@ -148,6 +219,119 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
         :param tool_registry: The registry of available tools that can be used for tool calls in the chat completion.
         :return:
         """
+        try:
+            model, chat_kwargs, output_format = self._prepare_chat_request(request, tool_registry)
+            model_result = self.hosts.call(model, lambda client: client.chat(
+                **chat_kwargs,
+                stream=False,
+                # think=None,
+                # logprobs=None,
+                # top_logprobs=None,
+            ))
+            print("Model Response:", model_result)
+            return self._build_chat_response(request, model, model_result, output_format)
+
+        except Exception as e:
+            logger.error("OLLAMA: Error generating chat completion: %s", str(e))
+            raise e
+
+    async def agenerate_chat_completion(self, request: ChatCompletionRequest, tool_registry=None) -> ChatCompletionResponse:
+        """
+        Get ollama completion for the given prompt via Ollama Chat API, using the async ollama client.
+        See `generate_chat_completion`.
+        """
+        try:
+            model, chat_kwargs, output_format = self._prepare_chat_request(request, tool_registry)
+            model_result = await self.hosts.acall(model, lambda client: client.chat(**chat_kwargs, stream=False))
+            return self._build_chat_response(request, model, model_result, output_format)
+
+        except Exception as e:
+            logger.error("OLLAMA: Error generating chat completion: %s", str(e))
+            raise e
+
+    async def stream_chat_completion(self, request: ChatCompletionRequest, tool_registry=None) \
+            -> AsyncGenerator[ChatCompletionChunk, None]:
+        """
+        Stream ollama chat completion deltas via Ollama Chat API with `stream=true`.
+
+        Ollama streams text and thinking tokens incrementally. Tool calls are emitted as complete
+        tool call objects (not as partial arguments), usually in the last chunks of the stream.
+        The final chunk carries the aggregated ChatCompletionResponse including usage metrics.
+        """
+        model, chat_kwargs, output_format = self._prepare_chat_request(request, tool_registry)
+        completion_id = uuid.uuid4().hex
+        model_id = f"{self.name}:{model}"
+
+        content_parts: List[str] = []
+        thinking_parts: List[str] = []
+        tool_calls = []
+        call_ids: List[str] = []
+        last_part = None
+        index = 0
+        tried = set()
+        while True:
+            host = self.hosts.select(model, exclude=tried)
+            tried.add(host.url)
+            try:
+                with self.hosts.lease(host):
+                    stream = await host.async_client.chat(**chat_kwargs, stream=True)
+                    async for part in stream:
+                        last_part = part
+                        message = part.get('message') or {}
+                        delta = []
+
+                        content = message.get('content')
+                        if content:
+                            content_parts.append(content)
+                            delta.append(TextContent(text=content))
+
+                        thinking = message.get('thinking')
+                        if thinking:
+                            thinking_parts.append(thinking)
+
+                        for tool_call in message.get('tool_calls') or []:
+                            call_id = 'xcall_' + uuid.uuid4().hex
+                            tool_calls.append(tool_call)
+                            call_ids.append(call_id)
+                            delta.append(ToolCallContent(name=tool_call.function.name,
+                                                         arguments=dict(tool_call.function.arguments or {}),
+                                                         call_id=call_id))
+
+                        if delta or thinking:
+                            yield ChatCompletionChunk(id=completion_id, index=index, model=model_id,
+                                                      delta=delta, reasoning_delta=thinking or None)
+                            index += 1
+                self.hosts.record_success(host, model)
+                break
+            except Exception as e:
+                # the stream can only be retried on another host, before anything has been received
+                can_retry = last_part is None and len(tried) < len(self.hosts.hosts)
+                if self.hosts.handle_error(host, e, can_retry=can_retry):
+                    continue
+                logger.error("OLLAMA: Error streaming chat completion: %s", str(e))
+                raise e
+
+        if last_part is None:
+            raise Exception("No message found in the model response.")
+
+        # aggregate the streamed parts into a single chat response
+        model_result = ollama.ChatResponse(**{
+            **last_part.model_dump(exclude={'message'}),
+            'message': ollama.Message(role='assistant',
+                                      content="".join(content_parts),
+                                      thinking="".join(thinking_parts) or None,
+                                      tool_calls=tool_calls or None),
+        })
+        response = self._build_chat_response(request, model, model_result, output_format, call_ids=call_ids)
+        response.id = completion_id
+        yield ChatCompletionChunk(id=completion_id, index=index, model=model_id, done=True, response=response)
+
+    def _prepare_chat_request(self, request: ChatCompletionRequest, tool_registry=None) -> tuple[str, dict, str | None]:
+        """
+        Map the chat completion request to the keyword arguments of the Ollama Chat API.
+
+        :return: A tuple of the model name, the chat API keyword arguments and the requested output format.
+        """
         model = request.model or self.DEFAULT_MODEL
         if model.startswith("ollama:"):
             model = model[len("ollama:"):]
@@ -157,15 +341,11 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
         ollama_tools = []
         logger.info(f"Tool registry provided {tool_registry is not None}, tools requested: {tools}")
         if tool_registry is not None and len(tools) > 0:
-            # tool_registry = get_tool_registry()
-            # filter the registry to get the tool definitions for the requested tools
-            tool_defs = tool_registry.list_definitions()
-            openai_tools = [tool_def for tool_def in tool_defs if tool_def['name'] in tools]
-            # print("Mapped OpenAI tools:", openai_tools)
-            ollama_tools = [map_openai_tool_to_ollama(tool_def) for tool_def in openai_tools]
+            # precomputed Ollama tool schemas of the requested tools, sorted by name,
+            # so the rendered tool definitions are a stable part of the prompt prefix
+            ollama_tools = tool_registry.tool_schemas("ollama", tools)
             logger.info(
-                f"Mapped {len(openai_tools)} tools to Ollama format, {[tool['function']['name'] for tool in ollama_tools]}")
-            # print("Mapped tools:", ollama_tools)
+                f"Mapped {len(ollama_tools)} tools to Ollama format, {[tool['function']['name'] for tool in ollama_tools]}")
 
         # messages that will be sent to the Ollama API in the format expected by the API
         input_messages = []
@@ -192,6 +372,13 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
         if request.messages:
             input_messages.extend(model_messages_to_ollama_format(request.messages))
 
+        # volatile system prompts go after the message history, to keep the prompt prefix stable across turns
+        for volatile_prompt_part in request.volatile_system or []:
+            input_messages.append({
+                'role': 'system',
+                'content': volatile_prompt_part,
+            })
+
         # user prompt
         if request.prompt:
             input_messages.append({
@@ -201,142 +388,144 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
         elif not request.prompt and len(request.messages) < 1:
             raise ValueError("At least a prompt or some messages must be provided for chat completion.")
 
-        try:
-            logger.info(input_messages)
-            output_format = request.output_format or None
-            output_schema = request.output_schema or None
-
-            model_params = request.model_parameters or {}
-            temperature = model_params.get('temperature', request.temperature) or self.DEFAULT_TEMPERATURE
-            max_tokens = model_params.get('max_tokens', request.max_tokens) or self.DEFAULT_MAX_TOKENS
-            top_p = model_params.get('top_p', request.top_p) or None
-            top_k = model_params.get('top_k', None)
-
-            chat_options = {
-                "temperature": temperature,
-                "num_ctx": max_tokens,  # Context window size. Same as OpenAI `max_tokens`
-                "top_p": top_p,  # Controls nucleus sampling. Same as OpenAI API
-                "top_k": top_k,  # Not available in OpenAI API, but can be used in Ollama
-                # todo "repeat_penalty": repeat_penalty # OpenAI = frequency_penalty + presence_penalty
-                # todo "stop": stop, # Stop sequences to end the generation. Same as OpenAI API
-                # todo "seed": seed, # Random seed for reproducibility. OpenAI added seed in 2024 (Beta)
-            }
+        logger.info(input_messages)
+        output_format = request.output_format or None
+        output_schema = request.output_schema or None
+
+        model_params = request.model_parameters or {}
+        temperature = model_params.get('temperature', request.temperature)
+        if temperature is None:
+            # explicit temperature 0 is valid (deterministic sampling)
+            temperature = self.DEFAULT_TEMPERATURE
+        max_tokens = model_params.get('max_tokens', request.max_tokens) or self.DEFAULT_MAX_TOKENS
+        top_p = model_params.get('top_p', request.top_p) or None
+        top_k = model_params.get('top_k', None)
+
+        chat_options = {
+            "temperature": temperature,
+            "num_ctx": max_tokens,  # Context window size. Same as OpenAI `max_tokens`
+            "top_p": top_p,  # Controls nucleus sampling. Same as OpenAI API
+            "top_k": top_k,  # Not available in OpenAI API, but can be used in Ollama
+            # todo "repeat_penalty": repeat_penalty # OpenAI = frequency_penalty + presence_penalty
+            # todo "stop": stop, # Stop sequences to end the generation. Same as OpenAI API
+            # todo "seed": seed, # Random seed for reproducibility. OpenAI added seed in 2024 (Beta)
+        }
 
-            logger.info(
-                f"OLLAMA: Generating chat completion model={model} temperature={temperature} output={output_format} and {len(input_messages)} input messages")
-            model_result = self.ollama.chat(
-                model=model,
-                messages=input_messages,
-                tools=ollama_tools,
-                options=chat_options,
-                format=output_schema or output_format,
-                # Not supported yet
-                stream=False,
-                # think=None,
-                # logprobs=None,
-                # top_logprobs=None,
-            )
-            print("Model Response:", model_result)
+        logger.info(
+            f"OLLAMA: Generating chat completion model={model} temperature={temperature} output={output_format} and {len(input_messages)} input messages")
+        chat_kwargs = {
+            "model": model,
+            "messages": input_messages,
+            "tools": ollama_tools,
+            "options": chat_options,
+            "format": output_schema or output_format,
+        }
+        return model, chat_kwargs, output_format
 
-            # Check if the response contains a message with content and tool calls
-            message = model_result.get('message', default={})
-            if not message:
-                raise Exception("No message found in the model response.")
-
-            # Check the done reason to see if the model finished generating a complete response
-            done_reason = model_result.get('done_reason', 'unknown')
-            if done_reason != 'stop':
-                logger.warning(
-                    f"Model response done reason is not 'stop', it is '{done_reason}'. This may indicate that the model did not finish generating a complete response.")
-
-            # Container for the parsed output parts from the model response
-            output_parts: List[ContentPart] = []
-
-            # Thinking process
-            thinking_content = message.get('thinking', None)
-            if thinking_content:
-                logger.info("Thinking content found in the model response.")
-                # output_parts.append(TextContent(text=f"[Thinking]: {thinking_content}"))
-
-            # TEXT contents
-            content = message.get('content')
-            if content:
-                logger.info("Text Content found in the message len=%d", len(content))
-                _out_part = TextContent(text=content)
-                if output_format == 'json':
+    def _build_chat_response(self, request: ChatCompletionRequest, model: str, model_result: ChatResponse,
+                             output_format: str | None, call_ids: List[str] | None = None) -> ChatCompletionResponse:
+        """
+        Map the Ollama chat response to a ChatCompletionResponse.
+
+        :param call_ids: Optional reference IDs for the tool calls in the response (e.g. already emitted while streaming).
+        """
+        # Check if the response contains a message with content and tool calls
+        message = model_result.get('message', default={})
+        if not message:
+            raise Exception("No message found in the model response.")
+
+        # Check the done reason to see if the model finished generating a complete response
+        done_reason = model_result.get('done_reason', 'unknown')
+        if done_reason != 'stop':
+            logger.warning(
+                f"Model response done reason is not 'stop', it is '{done_reason}'. This may indicate that the model did not finish generating a complete response.")
+
+        # Container for the parsed output parts from the model response
+        output_parts: List[ContentPart] = []
+
+        # Thinking process
+        thinking_content = message.get('thinking', None)
+        if thinking_content:
+            logger.info("Thinking content found in the model response.")
+            # output_parts.append(TextContent(text=f"[Thinking]: {thinking_content}"))
+
+        # TEXT contents
+        content = message.get('content')
+        if content:
+            logger.info("Text Content found in the message len=%d", len(content))
+            _out_part = TextContent(text=content)
+            if output_format == 'json':
+                try:
+                    json_data = json.loads(content)
+                    _out_part = JsonContent(data=json_data)
+                except json.JSONDecodeError:
+                    logger.warning("Failed to parse content as JSON, adding as plain text.")
+            elif output_format == "auto" or output_format is None:
+                # Optimistic JSON parsing
+                # If the content looks like JSON, try to parse it
+                if isinstance(content, str) and content.strip().startswith("{") and content.strip().endswith("}"):
+                    logger.info("Looks like the content is JSON, trying to parse it.")
                     try:
                         json_data = json.loads(content)
                         _out_part = JsonContent(data=json_data)
                     except json.JSONDecodeError:
-                        logger.warning("Failed to parse content as JSON, adding as plain text.")
-                elif output_format == "auto" or output_format is None:
-                    # Optimistic JSON parsing
-                    # If the content looks like JSON, try to parse it
-                    if isinstance(content, str) and content.strip().startswith("{") and content.strip().endswith("}"):
-                        logger.info("Looks like the content is JSON, trying to parse it.")
-                        try:
-                            json_data = json.loads(content)
-                            _out_part = JsonContent(data=json_data)
-                        except json.JSONDecodeError:
-                            logger.warning(
-                                "Content looks like JSON but failed to parse, adding as plain text.")
-                output_parts.append(_out_part)
-
-            # IMAGE content
-            images = message.get('images', [])
-            if images:
-                logger.info(f"{len(images)} image(s) found in the message.")
-                for image in images:
-                    output_parts.append(TextContent(text="[Image content not supported yet]"))
-                    # todo output_parts.append(ImageContent(image=image))
-
-            # TOOL CALLS
-            tool_calls = message.get('tool_calls', default=[])
-            if tool_calls:
-                logger.info(f"Tool calls found in the response: {len(tool_calls)}")
-                for tool_call in tool_calls:
-                    function = tool_call.get('function', {})
-                    if not function:
-                        logger.warning("No function found in the tool call.")
-                        continue
-
-                    name = function.get('name', '')
-                    arguments = function.get('arguments', {})
-                    call_id = 'xcall_' + uuid.uuid4().hex  # Reference ID for this function call
-                    output_parts.append(ToolCallContent(name=name, arguments=arguments, call_id=call_id))
-                    logger.info(f"Tool call requested: {name} with arguments {arguments} and call_id {call_id}")
-
-            # Usage and performance metrics
-            usage = {
-                'input_tokens': int(model_result.get('prompt_eval_count', 0)),
-                'output_tokens': int(model_result.get('eval_count', 0)),
-                'total_tokens': int(model_result.get('prompt_eval_count', 0) + model_result.get('eval_count', 0)),
-                'load_duration': int(model_result.get('load_duration', 0) / 1_000_000),  # convert to milliseconds
-                'input_duration': int(model_result.get('prompt_eval_duration', 0) / 1_000_000),  # convert to milliseconds
-                'output_duration': int((model_result.get('eval_duration') or 0) / 1_000_000),  # convert to milliseconds
-                'total_duration': int(model_result.get('total_duration', 0) / 1_000_000),  # convert to milliseconds
-            }
-            logger.info(
-                f"Tokens used in this chat completion: {usage['total_tokens']}, processing time: {usage['total_duration']} ms")
-
-            logger.info("OLLAMA: Chat completion generated with %d output parts", len(output_parts))
-            # todo remove prompt from response
-            response = ChatCompletionResponse(
-                id=uuid.uuid4().hex,
-                timestamp=int(time.time()),
-                model=f"{self.name}:{model}",
-                prompt=request.prompt,
-                output=output_parts,  # Parsed output from the model response
-                reasoning_output=thinking_content,
-                model_result=model_result.model_dump(),
-                # todo tools_used=[]
-                usage=usage,
-            )
-            return response
-
-        except Exception as e:
-            logger.error("OLLAMA: Error generating chat completion: %s", str(e))
-            raise e
+                        logger.warning(
+                            "Content looks like JSON but failed to parse, adding as plain text.")
+            output_parts.append(_out_part)
+
+        # IMAGE content
+        images = message.get('images', [])
+        if images:
+            logger.info(f"{len(images)} image(s) found in the message.")
+            for image in images:
+                output_parts.append(TextContent(text="[Image content not supported yet]"))
+                # todo output_parts.append(ImageContent(image=image))
+
+        # TOOL CALLS
+        tool_calls = message.get('tool_calls', default=[])
+        if tool_calls:
+            logger.info(f"Tool calls found in the response: {len(tool_calls)}")
+            for i, tool_call in enumerate(tool_calls):
+                function = tool_call.get('function', {})
+                if not function:
+                    logger.warning("No function found in the tool call.")
+                    continue
+
+                name = function.get('name', '')
+                arguments = function.get('arguments', {})
+                call_id = call_ids[i] if call_ids and i < len(call_ids) else 'xcall_' + uuid.uuid4().hex  # Reference ID for this function call
+                output_parts.append(ToolCallContent(name=name, arguments=arguments, call_id=call_id))
+                logger.info(f"Tool call requested: {name} with arguments {arguments} and call_id {call_id}")
+
+        # Usage and performance metrics
+        usage = {
+            'input_tokens': int(model_result.get('prompt_eval_count', 0)),
+            'output_tokens': int(model_result.get('eval_count', 0)),
+            'total_tokens': int(model_result.get('prompt_eval_count', 0) + model_result.get('eval_count', 0)),
+            'load_duration': int(model_result.get('load_duration', 0) / 1_000_000),  # convert to milliseconds
+            'input_duration': int(model_result.get('prompt_eval_duration', 0) / 1_000_000),  # convert to milliseconds
+            'output_duration': int((model_result.get('eval_duration') or 0) / 1_000_000),  # convert to milliseconds
+            'total_duration': int(model_result.get('total_duration', 0) / 1_000_000),  # convert to milliseconds
+            # prompt tokens evaluated by the model, the tokens of a reused prompt prefix (KV cache) are not counted
+            'prompt_eval_count': int(model_result.get('prompt_eval_count') or 0),
+        }
+        logger.info(
+            f"Tokens used in this chat completion: {usage['total_tokens']}, processing time: {usage['total_duration']} ms")
+
+        logger.info("OLLAMA: Chat completion generated with %d output parts", len(output_parts))
+        # todo remove prompt from response
+        response = ChatCompletionResponse(
+            id=uuid.uuid4().hex,
+            timestamp=int(time.time()),
+            model=f"{self.name}:{model}",
+            prompt=request.prompt,
+            output=output_parts,  # Parsed output from the model response
+            reasoning_output=thinking_content,
+            model_result=model_result.model_dump(),
+            # todo tools_used=[]
+            usage=usage,
+        )
+        return response
 
     def generate_completion(self, prompt: str, **kwargs) -> CompletionResponse:
         """
@@ -409,7 +598,7 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
 
         print(f"OLLAMA: Generating completion with model: {model}, system: {system}, prompt: {prompt}")
         try:
-            model_result = self.ollama.generate(
+            model_result = self.hosts.call(model, lambda client: client.generate(
                 model=model,
                 system=system,
                 # todo template=template
@@ -425,7 +614,7 @@ class OllamaAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvide
                     # todo "stop": stop, # Stop sequences to end the generation. Same as OpenAI API
                     # todo "seed": seed, # Random seed for reproducibility. OpenAI added seed in 2024 (Beta)
                 }
-            )
+            ))
 
             response_text = model_result.get('response', 'No response generated.')
             response = CompletionResponse(
@@ -4,23 +4,27 @@ import time
 import uuid
 import datetime
 import logging
+import asyncio
+import threading
+from typing import AsyncGenerator
 
-from openai import OpenAI
+from openai import OpenAI, DefaultHttpxClient, AsyncOpenAI, DefaultAsyncHttpxClient
 
 from geenii import config
-from geenii.chat.chat_models import TextContent, ToolCallContent, JsonContent
+from geenii.chat.chat_models import TextContent, ToolCallContent, JsonContent, ToolCallDeltaContent
 from geenii.config import CACHE_DIR
 from geenii.datamodels import CompletionResponse, ImageGenerationApiResponse, ChatCompletionRequest, \
-    ChatCompletionResponse, AIModelInfo, AudioTranscriptionApiResponse
+    ChatCompletionResponse, AIModelInfo, AudioTranscriptionApiResponse, ChatCompletionChunk, EmbeddingResponse
 from geenii.provider.interfaces import AIProvider, AICompletionProvider, AIChatCompletionProvider, \
-    AIImageGeneratorProvider, AIAudioTranscriptionProvider
+    AIImageGeneratorProvider, AIAudioTranscriptionProvider, AsyncAIChatCompletionProvider, AIEmbeddingProvider
+from geenii.provider.registry import http_pool_limits, close_http_client, close_async_http_client
 from geenii.tool.registry import ToolRegistry
-from geenii.utils.json_util import write_json
+from geenii.utils.json_util import write_json_if_changed
 
 logger = logging.getLogger(__name__)
 
-class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider, AIImageGeneratorProvider,
-                     AIAudioTranscriptionProvider):
+class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider, AsyncAIChatCompletionProvider,
+                     AIImageGeneratorProvider, AIAudioTranscriptionProvider, AIEmbeddingProvider):
     """
     A class to represent the OpenAI provider for XAI.
     """
@@ -32,6 +36,9 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
     DEFAULT_MAX_TOKENS = 4096
     DEFAULT_MAX_TOOL_CALLS = 5
 
+    # The embeddings API accepts up to 2048 inputs per request
+    MAX_EMBEDDING_BATCH_SIZE = 2048
+
     DALLE_MODELS = {
         "gpt-image-1": {"sizes": ["1024x1024", "auto"]},
         "dall-e-2": {"sizes": ["256x256", "512x512", "1024x1024"]},
@@ -48,23 +55,54 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
     def __init__(self, **kwargs):
         super().__init__(name="openai")
         self._client = None
+        self._async_client = None
+        self._async_client_loop = None
+        self._client_lock = threading.Lock()
 
     @property
     def client(self):
         if self._client is None:
-            api_key = os.environ.get("OPENAI_API_KEY", None)
-            if not api_key:
-                raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
-
-            print(f"Connecting using OpenAI API Key starting with '{config.OPENAI_API_KEY[:13]}..'")
-            return OpenAI(api_key=config.OPENAI_API_KEY)
+            with self._client_lock:
+                if self._client is None:
+                    api_key = config.OPENAI_API_KEY
+                    if not api_key:
+                        raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+
+                    print(f"Connecting using OpenAI API Key starting with '{api_key[:13]}..'")
+                    # the client is long-lived, re-use keep-alive connections across requests
+                    self._client = OpenAI(api_key=api_key, http_client=DefaultHttpxClient(limits=http_pool_limits()))
         return self._client
 
+    @property
+    def async_client(self):
+        # async http clients are bound to the event loop they were created in
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            with self._client_lock:
+                if self._async_client is None or self._async_client_loop is not loop:
+                    api_key = config.OPENAI_API_KEY
+                    if not api_key:
+                        raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+
+                    close_async_http_client(self._async_client, self._async_client_loop)
+                    self._async_client = AsyncOpenAI(api_key=api_key,
+                                                     http_client=DefaultAsyncHttpxClient(limits=http_pool_limits()))
+                    self._async_client_loop = loop
+        return self._async_client
+
+    def close(self) -> None:
+        with self._client_lock:
+            close_http_client(self._client)
+            close_async_http_client(self._async_client, self._async_client_loop)
+            self._client = None
+            self._async_client = None
+            self._async_client_loop = None
+
     def is_configured(self) -> bool:
         return config.OPENAI_API_KEY is not None and len(config.OPENAI_API_KEY) > 0
 
     def get_capabilities(self) -> list[str]:
-        return ['completion', 'chat_completion', 'tool_calling', 'image_generation']
+        return ['completion', 'chat_completion', 'tool_calling', 'image_generation', 'embeddings']
 
     def get_models(self) -> list[AIModelInfo]:
         models = []
@@ -77,10 +115,10 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
             openai_models = self.client.models.list()
 
             cache_data = {"models": [model.model_dump(mode="json") for model in openai_models.data]}
-            write_json(f"{CACHE_DIR}/openai.models.json", cache_data)
+            write_json_if_changed(f"{CACHE_DIR}/openai.models.json", cache_data)
         except Exception as e:
             print(f"Error fetching models from OpenAI: {e}")
-            return models
+            raise
 
         # print(openai_models)
         # Example Entry: Model(id='gpt-4-0613', created=1686588896, object='model', owned_by='openai')
@@ -177,6 +215,82 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
         return response
 
     def generate_chat_completion(self, request: ChatCompletionRequest, tool_registry: ToolRegistry=None) -> ChatCompletionResponse:
+        model, create_kwargs = self._prepare_chat_request(request, tool_registry)
+
+        # call OpenAI Responses API
+        logger.info(f"OPENAI: Generate completion response with %d input messages:", len(create_kwargs["input"]))
+        time_start = time.time()
+        model_result = self.client.responses.create(**create_kwargs, stream=False)
+        logger.info(model_result)
+        time_end = time.time()
+        return self._build_chat_response(request, model, model_result, time_end - time_start)
+
+    async def agenerate_chat_completion(self, request: ChatCompletionRequest, tool_registry: ToolRegistry=None) -> ChatCompletionResponse:
+        model, create_kwargs = self._prepare_chat_request(request, tool_registry)
+
+        # call OpenAI Responses API with the async client
+        logger.info(f"OPENAI: Generate completion response with %d input messages:", len(create_kwargs["input"]))
+        time_start = time.time()
+        model_result = await self.async_client.responses.create(**create_kwargs, stream=False)
+        time_end = time.time()
+        return self._build_chat_response(request, model, model_result, time_end - time_start)
+
+    async def stream_chat_completion(self, request: ChatCompletionRequest, tool_registry: ToolRegistry=None) \
+            -> AsyncGenerator[ChatCompletionChunk, None]:
+        """
+        Stream openai chat completion deltas via OpenAI Responses API with `stream=True`.
+
+        Text deltas are emitted as TextContent parts, function call arguments are emitted
+        as partial ToolCallDeltaContent parts while the model is generating them.
+        The final chunk carries the aggregated ChatCompletionResponse including usage.
+        """
+        model, create_kwargs = self._prepare_chat_request(request, tool_registry)
+        completion_id = uuid.uuid4().hex
+        model_id = f"{self.name}:{model}"
+
+        logger.info(f"OPENAI: Stream completion response with %d input messages:", len(create_kwargs["input"]))
+        time_start = time.time()
+        function_calls = {}  # output item ID -> (call_id, name)
+        model_result = None
+        index = 0
+        stream = await self.async_client.responses.create(**create_kwargs, stream=True)
+        async for event in stream:
+            delta = []
+            reasoning_delta = None
+            if event.type == "response.output_text.delta":
+                delta.append(TextContent(text=event.delta))
+            elif event.type == "response.reasoning_summary_text.delta":
+                reasoning_delta = event.delta
+            elif event.type == "response.output_item.added" and event.item.type == "function_call":
+                function_calls[event.item.id] = (event.item.call_id, event.item.name)
+                delta.append(ToolCallDeltaContent(call_id=event.item.call_id, name=event.item.name))
+            elif event.type == "response.function_call_arguments.delta":
+                call_id, name = function_calls.get(event.item_id, (None, None))
+                delta.append(ToolCallDeltaContent(call_id=call_id, name=name, arguments_delta=event.delta))
+            elif event.type == "response.completed":
+                model_result = event.response
+            elif event.type in ("response.failed", "error"):
+                error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", None)
+                raise Exception(f"OpenAI response stream failed: {error}")
+
+            if delta or reasoning_delta:
+                yield ChatCompletionChunk(id=completion_id, index=index, model=model_id,
+                                          delta=delta, reasoning_delta=reasoning_delta)
+                index += 1
+
+        if model_result is None:
+            raise Exception("OpenAI response stream ended without a completed response.")
+
+        response = self._build_chat_response(request, model, model_result, time.time() - time_start)
+        response.id = completion_id
+        yield ChatCompletionChunk(id=completion_id, index=index, model=model_id, done=True, response=response)
+
+    def _prepare_chat_request(self, request: ChatCompletionRequest, tool_registry: ToolRegistry=None) -> tuple[str, dict]:
+        """
+        Map the chat completion request to the keyword arguments of the OpenAI Responses API.
+
+        :return: A tuple of the model name and the `responses.create` keyword arguments.
+        """
         model = request.model or self.DEFAULT_MODEL
         if model.startswith("openai:"):
             model = model[len("openai:"):]
@@ -186,8 +300,9 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
         tool_defs_openai = []
         logger.info(f"Tool registry provided {tool_registry is not None}, tools requested: {tools}")
         if tool_registry is not None and len(tools) > 0:
-            _tools = tool_registry.list_tools()
-            tool_defs_openai = [_tool.to_openai() for _tool in _tools if _tool.name in tools]
+            # precomputed OpenAI tool schemas of the requested tools, sorted by name,
+            # so the tool definitions are a stable part of the cached prompt prefix
+            tool_defs_openai = tool_registry.tool_schemas("openai", tools)
             logger.info(f"OpenAI tools mapped: {len(tool_defs_openai)}")
 
         # mapping history/seed model messages to OpenAI Responses API input format
@@ -217,6 +332,10 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
                         print(
                             f"Unsupported model message content type for openai chat completion input: {content_item.type}")
 
+        # volatile system prompts go after the message history, to keep the prompt prefix stable across turns
+        for volatile_prompt_part in request.volatile_system or []:
+            input_messages.append({"role": "developer", "content": volatile_prompt_part})
+
         # finally add the user prompt
         prompt = request.prompt
         if prompt and len(prompt) > 0:
@@ -234,20 +353,19 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
             output_format = {"type": "json_object"}
 
         model_params = request.model_parameters or {}
-        temperature = model_params.get('temperature', request.temperature) or self.DEFAULT_TEMPERATURE
+        temperature = model_params.get('temperature', request.temperature)
+        if temperature is None:
+            # explicit temperature 0 is valid (deterministic sampling)
+            temperature = self.DEFAULT_TEMPERATURE
         max_tokens = model_params.get('max_tokens', request.max_tokens) or self.DEFAULT_MAX_TOKENS
         top_p = model_params.get('top_p', request.top_p) or None
         max_tool_calls = model_params.get('max_tool_calls', self.DEFAULT_MAX_TOOL_CALLS)
 
-        # call OpenAI Responses API
-        logger.info(f"OPENAI: Generate completion response with %d input messages:", len(input_messages))
-        time_start = time.time()
-        model_result = self.client.responses.create(
+        create_kwargs = dict(
             model=model,
             instructions=instructions,
             input=input_messages,
             tools=tool_defs_openai or [],
-            stream=False,
             text={
                 "format": output_format,
             },
@@ -256,9 +374,11 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
             max_tool_calls=max_tool_calls,
             top_p=top_p,
         )
-        logger.info(model_result)
-        time_end = time.time()
+        return model, create_kwargs
 
+    def _build_chat_response(self, request: ChatCompletionRequest, model: str, model_result,
+                             duration: float) -> ChatCompletionResponse:
+        """Map the OpenAI Responses API result to a ChatCompletionResponse."""
         # mapping OpenAI Responses API output format to generic model messages
         output_parts = []
         for output_item in model_result.output:
@@ -298,15 +418,20 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
             "input_tokens": model_result.usage.input_tokens,
             "output_tokens": model_result.usage.output_tokens,
             "total_tokens": model_result.usage.total_tokens,
+            "total_duration": int(duration * 1000),  # convert to milliseconds
         }
+        input_tokens_details = getattr(model_result.usage, "input_tokens_details", None)
+        if input_tokens_details is not None:
+            # prompt tokens served from the prompt cache
+            usage["cached_tokens"] = input_tokens_details.cached_tokens or 0
         logger.info(
-            f"Tokens used in this chat completion: {usage['total_tokens']}, processing time approx: {time_end - time_start:.8f} seconds")
+            f"Tokens used in this chat completion: {usage['total_tokens']}, processing time approx: {duration:.8f} seconds")
 
         return ChatCompletionResponse(
             id=uuid.uuid4().hex,
             timestamp=int(time.time()),
             model=f"{self.name}:{model}",
-            prompt=prompt,
+            prompt=request.prompt,
             output=output_parts,
             output_text=model_result.output_text,
             model_result=model_result.model_dump(),
@@ -333,6 +458,18 @@ class OpenAIProvider(AIProvider, AICompletionProvider, AIChatCompletionProvider,
             output_text=transcript.text
         )
 
+    def generate_embeddings(self, model: str, inputs: list[str], dimensions: int | None = None,
+                            **kwargs) -> EmbeddingResponse:
+        args = {"dimensions": dimensions} if dimensions else {}
+        result = self.client.embeddings.create(model=model, input=inputs, encoding_format="float", **args)
+        return EmbeddingResponse(
+            id=uuid.uuid4().hex,
+            timestamp=int(time.time()),
+            model=f"{self.name}:{model}",
+            embeddings=[item.embedding for item in sorted(result.data, key=lambda item: item.index)],
+            usage={"input_tokens": result.usage.prompt_tokens, "total_tokens": result.usage.total_tokens},
+        )
+
     def generate_image(self, prompt: str, model: str = "dall-e-2", n: int = 1, size: str = "256x256",
                        **kwargs) -> ImageGenerationApiResponse:
         """
@@ -0,0 +1,189 @@
+"""Process-wide pool of long-lived AI provider instances."""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import httpx
+
+from geenii import config
+from geenii.provider.interfaces import AIProvider
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderRegistry:
+    """
+    Keeps one long-lived provider instance per (provider name, config fingerprint).
+
+    Providers hold lazily created HTTP clients with keep-alive connection pools,
+    so re-using the provider instance re-uses the underlying TCP/TLS connections.
+
+    The config fingerprint is computed from the config attributes the provider depends on
+    (e.g. OLLAMA_HOST, OPENAI_API_KEY). When one of them changes, the next lookup creates a
+    fresh provider and the stale instance is retired.
+    The pool is bounded by `max_size`, the least recently used provider is retired first.
+
+    Callers keep using the provider instance they got for the duration of their request,
+    so retired providers are only closed after `close_delay` seconds.
+
+    :param max_size: Maximum number of pooled provider instances.
+    :param close_delay: Seconds after which retired (stale, evicted or invalidated) providers are closed.
+    """
+
+    def __init__(self, max_size: int = 16, close_delay: float = 600) -> None:
+        self.max_size = max_size
+        self.close_delay = close_delay
+        self._factories: dict[str, tuple[Callable[[], AIProvider], tuple[str, ...]]] = {}
+        self._providers: OrderedDict[tuple[str, str], AIProvider] = OrderedDict()
+        self._retired: list[tuple[float, AIProvider]] = []
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], AIProvider], config_keys: tuple[str, ...] = ()) -> None:
+        """
+        Register a provider factory.
+
+        :param name: The provider name (e.g. "ollama").
+        :param factory: A callable returning a new provider instance.
+        :param config_keys: Names of the `geenii.config` attributes the provider instance depends on.
+        """
+        with self._lock:
+            self._factories[name.lower()] = (factory, tuple(config_keys))
+
+    def has(self, name: str) -> bool:
+        return name.lower() in self._factories
+
+    def get(self, name: str) -> AIProvider:
+        """Return the pooled provider instance for the given name, creating it if needed."""
+        name = name.lower()
+        with self._lock:
+            self._close_retired()
+            if name not in self._factories:
+                raise ValueError(f"Unsupported provider: {name}")
+            factory, config_keys = self._factories[name]
+            key = (name, self._fingerprint(config_keys))
+
+            provider = self._providers.get(key)
+            if provider is not None:
+                self._providers.move_to_end(key)
+                return provider
+
+            # the config changed since the provider was created, drop the stale instances
+            for stale_key in [k for k in self._providers if k[0] == name]:
+                logger.info(f"Config changed for provider '{name}', retiring stale provider instance")
+                self._retire(self._providers.pop(stale_key))
+
+            provider = factory()
+            self._providers[key] = provider
+            logger.info(f"Created pooled provider instance '{name}' ({len(self._providers)}/{self.max_size})")
+
+            while len(self._providers) > self.max_size:
+                evicted_key, evicted = self._providers.popitem(last=False)
+                logger.info(f"Provider pool is full, evicting provider '{evicted_key[0]}'")
+                self._retire(evicted)
+            return provider
+
+    def invalidate(self, name: str | None = None) -> int:
+        """
+        Remove pooled provider instances. The removed instances are closed after the close delay.
+
+        :param name: The provider name to invalidate. Invalidates all providers if None.
+        :return: The number of removed provider instances.
+        """
+        with self._lock:
+            self._close_retired()
+            keys = [k for k in self._providers if name is None or k[0] == name.lower()]
+            for key in keys:
+                self._retire(self._providers.pop(key))
+            return len(keys)
+
+    def close(self) -> None:
+        """Close all pooled and retired provider instances, e.g. on shutdown."""
+        with self._lock:
+            providers = [provider for _, provider in self._retired] + list(self._providers.values())
+            self._retired = []
+            self._providers.clear()
+        for provider in providers:
+            self._close(provider)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._providers),
+                "max_size": self.max_size,
+                "providers": [name for name, _ in self._providers.keys()],
+                "retired": len(self._retired),
+            }
+
+    def _retire(self, provider: AIProvider) -> None:
+        # must hold the lock
+        self._retired.append((time.monotonic(), provider))
+
+    def _close_retired(self) -> None:
+        # must hold the lock. Close the providers retired for longer than the close delay.
+        if not self._retired:
+            return
+        deadline = time.monotonic() - self.close_delay
+        expired = [provider for retired_at, provider in self._retired if retired_at <= deadline]
+        if expired:
+            self._retired = [(retired_at, provider) for retired_at, provider in self._retired
+                             if retired_at > deadline]
+            for provider in expired:
+                self._close(provider)
+
+    @staticmethod
+    def _fingerprint(config_keys: tuple[str, ...]) -> str:
+        raw = "\x1f".join(f"{key}={getattr(config, key, '')}" for key in config_keys)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _close(provider: AIProvider) -> None:
+        try:
+            provider.close()
+        except Exception as e:
+            logger.warning(f"Error closing provider {provider}: {e}")
+
+
+def http_pool_limits() -> httpx.Limits:
+    """Keep-alive connection pool limits for the HTTP clients of pooled providers."""
+    return httpx.Limits(
+        max_connections=config.AI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.AI_HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def close_http_client(client) -> None:
+    """Close an SDK client and its underlying httpx connection pool."""
+    if client is None:
+        return
+    close = getattr(client, "close", None)
+    if close is None:
+        # ollama clients keep the httpx client in the private `_client` attribute
+        close = getattr(getattr(client, "_client", None), "close", None)
+    if close is not None:
+        close()
+
+
+def close_async_http_client(client, loop: asyncio.AbstractEventLoop | None) -> None:
+    """Schedule closing an async SDK client on the event loop it is bound to."""
+    if client is None or loop is None or loop.is_closed():
+        return
+    aclose = getattr(client, "close", None)
+    if aclose is None:
+        # ollama clients keep the httpx client in the private `_client` attribute
+        aclose = getattr(getattr(client, "_client", None), "aclose", None)
+    if aclose is None:
+        return
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        loop.create_task(aclose())
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(aclose(), loop)
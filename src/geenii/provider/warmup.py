@@ -0,0 +1,121 @@
+"""Model warm-up, keep-alive pings and cold start tracking."""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable
+
+from geenii.provider.interfaces import AIModelWarmupProvider
+
+logger = logging.getLogger(__name__)
+
+
+class _ModelLoadStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cold_starts = 0
+        self.last_load_duration: int | None = None
+        self.max_load_duration: int | None = None
+        self.last_cold_start_at: float | None = None
+        self.last_warm_up_at: float | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "cold_starts": self.cold_starts,
+            "last_load_duration": self.last_load_duration,
+            "max_load_duration": self.max_load_duration,
+            "last_cold_start_at": self.last_cold_start_at,
+            "last_warm_up_at": self.last_warm_up_at,
+        }
+
+
+class ModelWarmup:
+    """
+    Preloads models and keeps them loaded, and tracks the model load durations.
+
+    `warm_up` loads the configured models (at server startup and from the keep-alive schedule).
+    `record` is called with the usage of each completion response: a `load_duration` above
+    `cold_start_threshold` milliseconds counts as a cold start.
+    """
+
+    def __init__(self,
+                 get_provider: Callable[[str], tuple],
+                 models: list[str],
+                 keep_alive: str | None = None,
+                 cold_start_threshold: int = 500) -> None:
+        self._get_provider = get_provider
+        self.models = list(models)
+        self.keep_alive = keep_alive
+        self.cold_start_threshold = cold_start_threshold
+        self._stats: dict[str, _ModelLoadStats] = {}
+        self._lock = threading.Lock()
+
+    async def warm_up(self, models: list[str] | None = None) -> dict[str, dict | None]:
+        """
+        Load the models concurrently.
+
+        :param models: Model IDs in the format "provider:model_name". Defaults to the configured models.
+        :return: The load metrics per model, None for models that failed or do not need a warm-up.
+        """
+        models = self.models if models is None else models
+        results = await asyncio.gather(*[self._warm_up_model(model_id) for model_id in models])
+        return dict(zip(models, results))
+
+    async def keep_alive_task(self, args: list[str] = None, env: dict = None) -> None:
+        """Scheduled task function (see `ScheduledTask.run_fn`), pings the configured models."""
+        await self.warm_up()
+
+    async def _warm_up_model(self, model_id: str) -> dict | None:
+        try:
+            ai_provider, provider_name, model_name = self._get_provider(model_id)
+        except Exception as e:
+            logger.warning(f"Cannot warm up model '{model_id}': {e}")
+            return None
+        if not isinstance(ai_provider, AIModelWarmupProvider):
+            return None
+
+        try:
+            metrics = await ai_provider.awarm_up(model_name, keep_alive=self.keep_alive)
+        except Exception as e:
+            logger.warning(f"Failed to warm up model '{model_id}': {e}")
+            return None
+
+        load_duration = metrics.get("load_duration")
+        logger.info(f"Warmed up model '{model_id}' (load duration: {load_duration} ms)")
+        with self._lock:
+            stats = self._stats.setdefault(model_id, _ModelLoadStats())
+            stats.last_warm_up_at = time.time()
+            self._record_load_duration(stats, load_duration)
+        return metrics
+
+    def record(self, provider_name: str, model_name: str, usage: dict) -> None:
+        """Record the load duration of a completion response."""
+        load_duration = (usage or {}).get("load_duration")
+        if load_duration is None or usage.get("cache") == "hit":
+            return
+        model_id = f"{provider_name}:{model_name}"
+        with self._lock:
+            stats = self._stats.setdefault(model_id, _ModelLoadStats())
+            stats.requests += 1
+            if load_duration >= self.cold_start_threshold:
+                stats.cold_starts += 1
+                stats.last_cold_start_at = time.time()
+                logger.warning(f"Cold start of model '{model_id}': load duration {load_duration} ms")
+            self._record_load_duration(stats, load_duration)
+
+    @staticmethod
+    def _record_load_duration(stats: _ModelLoadStats, load_duration: int | None) -> None:
+        if load_duration is None:
+            return
+        stats.last_load_duration = load_duration
+        stats.max_load_duration = max(stats.max_load_duration or 0, load_duration)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": self.models,
+                "keep_alive": self.keep_alive,
+                "load_stats": {model_id: stats.to_dict() for model_id, stats in self._stats.items()},
+            }
@@ -40,6 +40,7 @@ from typing import Any, Callable
 import pydantic
 from croniter import croniter
 
+from geenii.admission import Priority, request_priority
 from geenii.logging import get_rotating_file_log_handler
 
 logging.basicConfig(
@@ -111,11 +112,13 @@ class ScheduledTask:
         try:
             fn_args = self.args or []
             fn_env = self.env or {}
-            if inspect.iscoroutinefunction(self.run_fn):
-                await self.run_fn(fn_args, fn_env)  # type: ignore
-            else:
-                loop = asyncio.get_running_loop()
-                await loop.run_in_executor(None, self.run_fn, fn_args, fn_env)  # type: ignore
+            # AI requests of scheduled tasks are admitted with the lowest priority
+            with request_priority(Priority.SCHEDULED):
+                if inspect.iscoroutinefunction(self.run_fn):
+                    await self.run_fn(fn_args, fn_env)  # type: ignore
+                else:
+                    # to_thread propagates the priority context to the worker thread
+                    await asyncio.to_thread(self.run_fn, fn_args, fn_env)  # type: ignore
             logger.info("Task '%s' completed successfully", self.name)
         except Exception:
             logger.exception("Task '%s' failed", self.name)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import uuid
@@ -10,9 +11,11 @@ from geenii import ai
 from geenii.chat.chat_manager import ChatManager
 from geenii.chat.chat_models import TextContent
 from geenii.chat.chat_server_routes import dep_chat_mgr
-from geenii.config import DATA_DIR
+from geenii.compaction import memory_compactor
+from geenii.config import DATA_DIR, CHAT_HISTORY_MAX_MESSAGES
+from geenii.context import context_builder
 from geenii.datamodels import ChatCompletionRequest, ChatCompletionResponse, CompletionErrorResponse, ModelMessage
-from geenii.memory import FileChatMemory
+from geenii.memory import chat_memories
 from geenii.server.deps import dep_current_user, User
 
 logger = logging.getLogger(__name__)
@@ -60,33 +63,33 @@ async def chat_completion(request: ChatCompletionRequest) -> ChatCompletionRespo
     Generate a chat completion using the specified AI provider and model.
     """
     context_id = request.context_id or uuid.uuid4().hex
-    context_memory_dir = f"{DATA_DIR}/sessions/chat/{context_id}"
-    os.makedirs(context_memory_dir, exist_ok=True)
-
     logger.info(f"Chat completion request with context_id={context_id}, model={request.model}, prompt={request.prompt}")
-    memory = FileChatMemory(f"{context_memory_dir}/memory.jsonl", create=True, restore=True)
-
-    messages = list(memory.messages)
-    logger.info(f"Loaded {len(messages)} messages from memory for context_id={context_id}")
-    if len(messages) > 10:
-        logger.warning(f"Memory for context_id={context_id} has {len(messages)} messages, which may exceed token limits for some models. Consider implementing memory management strategies.")
-        # todo compact memory
+    # opening and reading the memory may wait for pending writes, off the event loop
+    memory = await asyncio.to_thread(chat_memories.get, context_id)
 
     system = ["You are a helpful assistant that helps the user with their tasks. Give short and concise answers. Always try to help the user as best as you can. If you don't know the answer, say you don't know and don't try to make up an answer."]
 
     try:
-        _request = ChatCompletionRequest(
-            system=system,
-            model=request.model,
-            prompt=request.prompt,
-            messages=messages,
-            context_id=context_id,
-        )
-        response = ai.generate_chat_completion(request=_request)
-
-        # Append the user message and assistant response to memory
-        memory.append(ModelMessage(role="user", content=[TextContent(type="text", text=request.prompt)]))
-        memory.append(ModelMessage(role="assistant", content=response.output))
+        async with chat_memories.lock(context_id):
+            # only the most recent messages (and the pinned summaries) are read from the memory
+            messages = await asyncio.to_thread(memory.tail, CHAT_HISTORY_MAX_MESSAGES)
+            logger.info(f"Loaded {len(messages)} messages from memory for context_id={context_id}")
+
+            _request = ChatCompletionRequest(
+                system=system,
+                model=request.model,
+                prompt=request.prompt,
+                messages=messages,
+                context_id=context_id,
+                priority="interactive",
+            )
+            context_builder.fit(_request)
+            response = await ai.agenerate_chat_completion(request=_request)
+
+            # Append the user message and assistant response to memory
+            memory.append(ModelMessage(role="user", content=[TextContent(type="text", text=request.prompt)]))
+            memory.append(ModelMessage(role="assistant", content=response.output))
+        memory_compactor.schedule(context_id, memory, model=_request.model)
 
         return response
     except Exception as e:
@@ -1,19 +1,29 @@
+import asyncio
 import os
 import shutil
 import uuid
 import logging
+from datetime import datetime
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
+from sse_starlette import EventSourceResponse
 
 from geenii import ai
 from geenii.ai import enumerate_models
 from geenii.chat.chat_models import TextContent
+from geenii.compaction import memory_compactor
 from geenii.datamodels import CompletionErrorResponse, CompletionRequest, CompletionResponse, ChatCompletionRequest, \
     ChatCompletionResponse, ImageGenerationApiResponse, \
     ImageGenerationApiRequest, AudioGenerationApiRequest, AudioSpeechGenerationApiResponse, AudioTranscriptionApiRequest, \
-    AudioTranscriptionApiResponse, AudioTranslationApiResponse, AudioTranslationApiRequest, AIModelInfo, ModelMessage
-from geenii.config import DATA_DIR, DEFAULT_AUDIO_TRANSCRIPTION_MODEL
-from geenii.memory import FileChatMemory
+    AudioTranscriptionApiResponse, AudioTranslationApiResponse, AudioTranslationApiRequest, AIModelInfo, ModelMessage, \
+    EmbeddingRequest, EmbeddingResponse, FanOutCompletionRequest, FanOutCompletionResponse
+from geenii.config import DATA_DIR, DEFAULT_AUDIO_TRANSCRIPTION_MODEL, CHAT_HISTORY_MAX_MESSAGES
+from geenii.context import context_builder
+from geenii.fanout import fan_out
+from geenii.memory import ChatMemory, chat_memories
+from geenii.usage import get_usage_store
+from geenii.vector_memory import get_vector_memory
 
 logger = logging.getLogger(__name__)
 
@@ -21,11 +31,61 @@ router = APIRouter(prefix="/ai", tags=["ai"])
 
 
 @router.get("/models")
-async def models() -> list[AIModelInfo]:
+async def models(refresh: bool = False) -> list[AIModelInfo]:
     """
     List all available AI models.
     """
-    return enumerate_models()
+    return await asyncio.to_thread(enumerate_models, refresh)
+
+
+@router.post("/providers/invalidate")
+async def invalidate_providers(provider: str | None = None) -> dict:
+    """
+    Close and drop pooled AI provider instances, e.g. after API keys or hosts have been changed.
+    """
+    invalidated = ai.invalidate_ai_providers(provider)
+    return {"status": "success", "invalidated": invalidated}
+
+
+@router.get("/metrics")
+async def metrics() -> dict:
+    """
+    Runtime metrics of the chat completion pipeline (request coalescing, response cache, provider pool)
+    and of the chat memories.
+    """
+    vector_memory = get_vector_memory()
+    return {**ai.chat_completion_metrics(),
+            "chat_memories": chat_memories.stats(),
+            "memory_compaction": memory_compactor.stats(),
+            "fan_out": fan_out.stats(),
+            "vector_memory": vector_memory.stats() if vector_memory else None}
+
+
+@router.get("/usage")
+async def usage(
+    group_by: list[str] = Query(["model"], description="Group by: model, provider, context_id, cache, bucket"),
+    bucket: str | None = Query(None, description="Time bucket: hour, day, week, month"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    model: str | None = None,
+    provider: str | None = None,
+    context_id: str | None = None,
+) -> list[dict]:
+    """
+    Aggregated AI usage: request count, token sums and p50/p95 latency (ms) per group.
+    New records from the usage logs are ingested before the query.
+    """
+    def query() -> list[dict]:
+        ai.ai_log_sink.flush()
+        store = get_usage_store()
+        store.ingest()
+        return store.aggregate(group_by=group_by, bucket=bucket, since=since, until=until,
+                               model=model, provider=provider, context_id=context_id)
+
+    try:
+        return await asyncio.to_thread(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # @router.post("/models/install")
@@ -50,39 +110,58 @@ async def completion(request: CompletionRequest) -> CompletionResponse | Complet
     )
 
 
+def _cache_policy(request: ChatCompletionRequest, http_request: Request) -> bool | None:
+    """
+    Resolve the completion cache policy of the request.
+    The cache is bypassed with `Cache-Control: no-cache` or `X-Geenii-Cache: bypass` request headers.
+    """
+    cache_control = http_request.headers.get("cache-control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control \
+            or http_request.headers.get("x-geenii-cache", "").lower() == "bypass":
+        return False
+    return request.cache
+
+
 @router.post("/chat/completion")
-async def chat_completion(request: ChatCompletionRequest) -> ChatCompletionResponse | CompletionErrorResponse:
+async def chat_completion(request: ChatCompletionRequest, http_request: Request) \
+        -> ChatCompletionResponse | CompletionErrorResponse:
     """
     Generate a chat completion using the specified AI provider and model.
+
+    If `stream` is set in the request, the completion is streamed as incremental deltas,
+    either as Server-Sent Events (`Accept: text/event-stream`) or as newline-delimited JSON.
     """
     context_id = request.context_id or uuid.uuid4().hex
-    context_memory_dir = f"{DATA_DIR}/sessions/chat/{context_id}"
-    os.makedirs(context_memory_dir, exist_ok=True)
-
     logger.info(f"Chat completion request with context_id={context_id}, model={request.model}, prompt={request.prompt}")
-    memory = FileChatMemory(f"{context_memory_dir}/memory.jsonl", create=True, restore=True)
-
-    messages = list(memory.messages)
-    logger.info(f"Loaded {len(messages)} messages from memory for context_id={context_id}")
-    if len(messages) > 10:
-        logger.warning(f"Memory for context_id={context_id} has {len(messages)} messages, which may exceed token limits for some models. Consider implementing memory management strategies.")
-        # todo compact memory
+    # opening and reading the memory may wait for pending writes, off the event loop
+    memory = await asyncio.to_thread(chat_memories.get, context_id)
 
     system = ["You are a helpful assistant that helps the user with their tasks. Give short and concise answers. Always try to help the user as best as you can. If you don't know the answer, say you don't know and don't try to make up an answer."]
 
+    _request = ChatCompletionRequest(
+        system=system,
+        model=request.model,
+        prompt=request.prompt,
+        context_id=context_id,
+        stream=request.stream,
+        cache=_cache_policy(request, http_request),
+        priority="interactive",
+    )
+
+    if request.stream:
+        return _stream_chat_completion(_request, memory, http_request)
+
     try:
-        _request = ChatCompletionRequest(
-            system=system,
-            model=request.model,
-            prompt=request.prompt,
-            messages=messages,
-            context_id=context_id,
-        )
-        response = ai.generate_chat_completion(request=_request)
-
-        # Append the user message and assistant response to memory
-        memory.append(ModelMessage(role="user", content=[TextContent(type="text", text=request.prompt)]))
-        memory.append(ModelMessage(role="assistant", content=response.output))
+        # the turns of a conversation are serialized, each turn sees the complete previous turn
+        async with chat_memories.lock(context_id):
+            await _load_chat_history(_request, memory)
+            response = await ai.agenerate_chat_completion(request=_request)
+
+            # Append the user message and assistant response to memory
+            memory.append(ModelMessage(role="user", content=[TextContent(type="text", text=request.prompt)]))
+            memory.append(ModelMessage(role="assistant", content=response.output))
+        # summarize older turns in the background, once the memory exceeds the token threshold
+        memory_compactor.schedule(context_id, memory, model=_request.model)
 
         return response
     except Exception as e:
@@ -90,6 +169,70 @@ async def chat_completion(request: ChatCompletionRequest) -> ChatCompletionRespo
         return CompletionErrorResponse(error=str(e))
 
 
+async def _load_chat_history(request: ChatCompletionRequest, memory: ChatMemory) -> None:
+    """Set the conversation history of the request, packed into the token budget of the model."""
+    # only the most recent messages (and the pinned summaries) are read from the memory
+    request.messages = await asyncio.to_thread(memory.tail, CHAT_HISTORY_MAX_MESSAGES)
+    logger.info(f"Loaded {len(request.messages)} messages from memory for context_id={request.context_id}")
+    context_builder.fit(request)
+
+
+def _stream_chat_completion(request: ChatCompletionRequest, memory: ChatMemory, http_request: Request):
+    """
+    Stream the chat completion chunks as SSE events or NDJSON lines.
+    The conversation is appended to memory once the stream completed.
+    """
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    async def chunk_generator():
+        try:
+            async with chat_memories.lock(request.context_id):
+                await _load_chat_history(request, memory)
+                async for chunk in ai.stream_chat_completion(request=request):
+                    if await http_request.is_disconnected():
+                        logger.info(f"Client disconnected, stopping chat completion stream for context_id={request.context_id}")
+                        break
+                    if chunk.done and chunk.response is not None:
+                        memory.append(ModelMessage(role="user", content=[TextContent(type="text", text=request.prompt)]))
+                        memory.append(ModelMessage(role="assistant", content=chunk.response.output))
+                        memory_compactor.schedule(request.context_id, memory, model=request.model)
+                    yield "done" if chunk.done else "delta", chunk.model_dump_json()
+        except Exception as e:
+            logger.error(f"Error during chat completion stream for context_id={request.context_id}: {e}")
+            yield "error", CompletionErrorResponse(error=str(e)).model_dump_json()
+
+    if use_sse:
+        async def event_generator():
+            async for event, data in chunk_generator():
+                yield {"event": event, "data": data}
+        return EventSourceResponse(event_generator())
+
+    async def ndjson_generator():
+        async for _, data in chunk_generator():
+            yield data + "\n"
+    return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson")
+
+
+@router.post("/chat/completion/fanout")
+async def chat_completion_fanout(request: FanOutCompletionRequest, http_request: Request) \
+        -> FanOutCompletionResponse | CompletionErrorResponse:
+    """
+    Dispatch a chat completion to several models concurrently.
+
+    Modes: "all" returns the responses of all models, "first" returns the first successful response,
+    "hedged" starts the next model if the previous models have not returned a token within `hedge_delay_ms`.
+    Fan-out requests are stateless, the responses are not stored in the chat memory.
+    """
+    _request = ChatCompletionRequest(**request.model_dump(exclude={"models", "mode", "hedge_delay_ms", "timeout"}))
+    _request.cache = _cache_policy(request, http_request)
+    _request.priority = "interactive"
+    try:
+        return await fan_out.run(_request, request.models, mode=request.mode,
+                                 hedge_delay_ms=request.hedge_delay_ms, timeout=request.timeout)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 ### IMAGE GENERATION
 @router.post("/image/generate")
 async def generate_image(request: ImageGenerationApiRequest) -> ImageGenerationApiResponse | CompletionErrorResponse:
@@ -99,6 +242,17 @@ async def generate_image(request: ImageGenerationApiRequest) -> ImageGenerationA
     return ai.generate_image(request)
 
 
+### EMBEDDINGS
+@router.post("/embeddings")
+async def generate_embeddings(request: EmbeddingRequest) -> EmbeddingResponse | CompletionErrorResponse:
+    """
+    Embed a batch of texts using the specified AI provider and model.
+    Returns one vector per input, identical and previously embedded inputs are served from the embedding cache.
+    """
+    request.priority = request.priority or "interactive"
+    return await asyncio.to_thread(ai.generate_embeddings, request)
+
+
 # AUDIO GENERATION - TEXT-TO-SPEECH
 @router.post("/audio/speech")
 async def generate_speech(request: AudioGenerationApiRequest) -> AudioSpeechGenerationApiResponse | CompletionErrorResponse:
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import List
 
@@ -21,7 +22,7 @@ async def health():
 @router.get("/info")
 async def info() -> dict:
     ai_providers = enumerate_providers()
-    ai_models = enumerate_models()
+    ai_models = await asyncio.to_thread(enumerate_models)
 
     data = dict({
         "app": {
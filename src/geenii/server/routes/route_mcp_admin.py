@@ -6,6 +6,7 @@ from mcp.types import Prompt
 from geenii.datamodels import MCPServerConfig, MCPToolCallRequest, MCPServerInfo, MCPToolCallResponse
 from geenii.mcp import get_mcp_config, write_mcp_config_json, \
     get_mcp_client_for_server, get_mcp_config_for_server
+from geenii.mcp_session import mcp_sessions
 from geenii.utils.cached import cached
 
 router = APIRouter(prefix="/mcp", tags=["mcp"])
@@ -32,6 +33,13 @@ async def get_mcp_servers() -> list[MCPServerConfig]:
     #return [MCPServerConfig(**server) for server in config["mcpServers"]]
     return mcp_configs
 
+@router.get("/sessions")
+async def get_mcp_sessions() -> dict:
+    """
+    List the persistent MCP server sessions and their statistics.
+    """
+    return mcp_sessions.stats()
+
 # @router.get("/servers/{server_name}")
 # async def mcp_server_details(server_name: str):
 #     """
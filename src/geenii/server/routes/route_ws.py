@@ -9,7 +9,7 @@ import redis.asyncio as redis
 from fastapi import WebSocket, APIRouter
 
 from geenii import ai
-from geenii.datamodels import CompletionRequest
+from geenii.datamodels import CompletionRequest, ChatCompletionRequest
 
 # topic -> websockets subscribed to that topic (per process)
 subscriptions: DefaultDict[str, Set[WebSocket]] = defaultdict(set)
@@ -142,6 +142,28 @@ def handle_ai_completion(params, ws: WebSocket):
     return result.model_dump()
 rpc_message_handlers["ai/completion"] = handle_ai_completion
 
+async def handle_ai_chat_completion_stream(params, ws: WebSocket):
+    """
+    Stream a chat completion over the websocket.
+    Each delta is pushed as a JSON-RPC notification 'ai/chat/completion/chunk',
+    the aggregated chat completion response is returned as the method result.
+    """
+    request = ChatCompletionRequest.model_validate(params or {})
+    request.stream = True
+    request.priority = request.priority or "interactive"
+    response = None
+    async for chunk in ai.stream_chat_completion(request):
+        if chunk.done:
+            response = chunk.response
+        notification = {
+            "jsonrpc": "2.0",
+            "method": "ai/chat/completion/chunk",
+            "params": chunk.model_dump(mode="json", exclude={"response"}),
+        }
+        await manager.send_json(ws, notification)
+    return response.model_dump(mode="json") if response else None
+rpc_message_handlers["ai/chat/completion/stream"] = handle_ai_chat_completion_stream
+
 async def handle_topics_subscribe(params, ws: WebSocket):
     topic = params.get("topic")
     topic = "topic:" + topic if not topic.startswith("topic:") else topic
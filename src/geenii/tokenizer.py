@@ -0,0 +1,232 @@
+"""
+Token counting.
+
+Tokenizers are loaded offline from the tokenizer directory (`GEENII_TOKENIZER_DIR`), per model family:
+
+  - tiktoken BPE files (`<name>.tiktoken`, e.g. `o200k_base.tiktoken`), requires the `tiktoken` package
+  - Hugging Face tokenizer files (`tokenizer.json`), requires the `tokenizers` package
+
+The tokenizer file of a model is resolved from the configured model ID prefixes (`GEENII_TOKENIZER_MODELS`),
+or by convention from the model family: `<family>.tiktoken` or `<family>/tokenizer.json`
+(e.g. `qwen3/tokenizer.json` for the model "ollama:qwen3:8b").
+
+Models without a tokenizer fall back to a character based estimate, which is calibrated per model with the
+input token counts reported by the providers.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from geenii import config
+
+logger = logging.getLogger(__name__)
+
+# Approximate characters per token of the model families' tokenizers for english text and code
+_CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "ollama": 3.6,
+}
+_DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Pre-tokenization patterns of the tiktoken encodings
+_CL100K_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+_O200K_PATTERN = "|".join([
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""\p{N}{1,3}""",
+    r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+    r"""\s*[\r\n]+""",
+    r"""\s+(?!\S)""",
+    r"""\s+""",
+])
+_TIKTOKEN_PATTERNS = {
+    "cl100k_base": _CL100K_PATTERN,
+    "o200k_base": _O200K_PATTERN,
+}
+
+
+class Tokenizer:
+    """A loaded tokenizer, counting the tokens of a batch of texts."""
+
+    def __init__(self, name: str, count_batch: Callable[[list[str]], list[int]]) -> None:
+        self.name = name
+        self.count_batch = count_batch
+
+
+def load_tiktoken_file(path: Path) -> Tokenizer:
+    import tiktoken
+    from tiktoken.load import load_tiktoken_bpe
+
+    name = path.stem
+    encoding = tiktoken.Encoding(
+        name=name,
+        pat_str=_TIKTOKEN_PATTERNS.get(name, _O200K_PATTERN),
+        mergeable_ranks=load_tiktoken_bpe(str(path)),
+        special_tokens={},
+    )
+    return Tokenizer(name, lambda texts: [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)])
+
+
+def load_hf_tokenizer_file(path: Path) -> Tokenizer:
+    from tokenizers import Tokenizer as HFTokenizer
+
+    tokenizer = HFTokenizer.from_file(str(path))
+    return Tokenizer(path.parent.name,
+                     lambda texts: [len(encoding.ids)
+                                    for encoding in tokenizer.encode_batch(texts, add_special_tokens=False)])
+
+
+class TokenCounter:
+    """
+    Counts tokens per model, with the model's tokenizer or a calibrated estimate.
+
+    Loaded tokenizers are cached per file, and token counts are cached per text (LRU),
+    so the unchanged history of a conversation is not re-tokenized on every turn.
+
+    :param tokenizer_dir: The directory of the tokenizer files.
+    :param model_tokenizers: Tokenizer files (relative to `tokenizer_dir`) by model ID prefix.
+        The longest matching prefix applies.
+    :param cache_size: Maximum number of cached token counts.
+    """
+
+    def __init__(self, tokenizer_dir: str, model_tokenizers: dict[str, str] | None = None,
+                 cache_size: int = 10000) -> None:
+        self.tokenizer_dir = Path(tokenizer_dir)
+        self.model_tokenizers = model_tokenizers or {}
+        self.cache_size = cache_size
+        self._tokenizers: dict[str, Tokenizer | None] = {}
+        self._model_tokenizer: dict[str, Tokenizer | None] = {}
+        self._counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+        # per model correction factors of the estimate, learned from the reported usage
+        self._calibration: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "estimated": 0}
+
+    def tokenizer(self, model: str | None) -> Tokenizer | None:
+        """The tokenizer of the model, or None if no tokenizer is available."""
+        model = model or config.DEFAULT_COMPLETION_MODEL
+        if model in self._model_tokenizer:
+            return self._model_tokenizer[model]
+        tokenizer = None
+        for path in self._tokenizer_paths(model):
+            tokenizer = self._load(path)
+            if tokenizer is not None:
+                break
+        with self._lock:
+            self._model_tokenizer[model] = tokenizer
+        if tokenizer is None:
+            logger.info(f"No tokenizer available for model '{model}', estimating token counts")
+        return tokenizer
+
+    def _tokenizer_paths(self, model: str) -> list[Path]:
+        matches = [prefix for prefix in self.model_tokenizers if model.startswith(prefix)]
+        paths = [self.tokenizer_dir / self.model_tokenizers[prefix] for prefix in sorted(matches, key=len, reverse=True)]
+        provider, _, model_name = model.partition(":")
+        family = model_name.split(":", 1)[0]
+        if family:
+            paths.append(self.tokenizer_dir / f"{family}.tiktoken")
+            paths.append(self.tokenizer_dir / family / "tokenizer.json")
+        return paths
+
+    def _load(self, path: Path) -> Tokenizer | None:
+        key = str(path)
+        if key in self._tokenizers:
+            return self._tokenizers[key]
+        tokenizer = None
+        if path.is_file():
+            try:
+                if path.suffix == ".tiktoken":
+                    tokenizer = load_tiktoken_file(path)
+                else:
+                    tokenizer = load_hf_tokenizer_file(path)
+                logger.info(f"Loaded tokenizer '{tokenizer.name}' from {path}")
+            except ImportError as e:
+                logger.warning(f"Cannot load tokenizer {path}, package not installed: {e.name}")
+            except Exception as e:
+                logger.warning(f"Failed to load tokenizer {path}: {e}")
+        with self._lock:
+            self._tokenizers[key] = tokenizer
+        return tokenizer
+
+    def count(self, model: str | None, text: str) -> int:
+        """Count the tokens of the text."""
+        return self.count_batch(model, [text])[0]
+
+    def count_batch(self, model: str | None, texts: list[str]) -> list[int]:
+        """Count the tokens of the texts, tokenizing the uncached texts in one batch."""
+        model = model or config.DEFAULT_COMPLETION_MODEL
+        tokenizer = self.tokenizer(model)
+        if tokenizer is None:
+            return [self.estimate(model, text) for text in texts]
+
+        counts: list[int | None] = [0 if not text else None for text in texts]
+        keys = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                if counts[i] is not None:
+                    continue
+                key = (tokenizer.name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+                keys[i] = key
+                if key in self._counts:
+                    self._counts.move_to_end(key)
+                    counts[i] = self._counts[key]
+                    self._stats["hits"] += 1
+
+        missing = [i for i, count in enumerate(counts) if count is None]
+        if missing:
+            for i, count in zip(missing, tokenizer.count_batch([texts[i] for i in missing])):
+                counts[i] = count
+            with self._lock:
+                self._stats["misses"] += len(missing)
+                for i in missing:
+                    self._counts[keys[i]] = counts[i]
+                while len(self._counts) > self.cache_size:
+                    self._counts.popitem(last=False)
+        return counts
+
+    def estimate(self, model: str | None, text: str | int) -> int:
+        """Estimate the tokens of a text (or a number of characters) from the character count."""
+        model = model or config.DEFAULT_COMPLETION_MODEL
+        chars = text if isinstance(text, int) else len(text)
+        if not chars:
+            return 0
+        self._stats["estimated"] += 1
+        provider = model.split(":", 1)[0]
+        chars_per_token = _CHARS_PER_TOKEN.get(provider, _DEFAULT_CHARS_PER_TOKEN)
+        return int(chars / chars_per_token * self._calibration.get(model, 1.0)) + 1
+
+    def is_exact(self, model: str | None) -> bool:
+        """True if the token counts of the model are counted by a tokenizer."""
+        return self.tokenizer(model) is not None
+
+    def calibrate(self, model: str | None, estimated_tokens: int, actual_tokens: int) -> None:
+        """Adjust the estimate of the model with a token count reported by the provider."""
+        model = model or config.DEFAULT_COMPLETION_MODEL
+        if estimated_tokens <= 0 or not actual_tokens:
+            return
+        with self._lock:
+            factor = self._calibration.get(model, 1.0)
+            observed = min(max(actual_tokens / (estimated_tokens / factor), 0.5), 2.0)
+            # moving average, a single request with large tool definitions does not skew the estimate
+            self._calibration[model] = 0.8 * factor + 0.2 * observed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "cached_counts": len(self._counts),
+                "tokenizers": {model: tokenizer.name if tokenizer else None
+                               for model, tokenizer in self._model_tokenizer.items()},
+                "calibration": {model: round(factor, 3) for model, factor in self._calibration.items()},
+            }
+
+
+token_counter = TokenCounter(
+    tokenizer_dir=config.TOKENIZER_DIR,
+    model_tokenizers=config.TOKENIZER_MODELS,
+    cache_size=config.TOKENIZER_CACHE_SIZE,
+)
@@ -6,10 +6,13 @@ import asyncio
 import inspect
 import logging
 import subprocess
+import threading
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 from typing import Any, Callable
 
-from geenii.mcp import get_mcp_client_for_server, McpClient
+from geenii.mcp_session import mcp_sessions
+from geenii.tool.search import ToolSearchIndex
 
 logger = logging.getLogger(__name__)
 
@@ -176,27 +179,51 @@ class McpTool(Tool):
         self.type = "mcp_tool"
 
     async def invoke(self, args: dict[str,Any], env: dict[str, str] | None, **kwargs: Any) -> Any:
-        client: McpClient = get_mcp_client_for_server(self.mcp_server_id)
-        return await client.call_tool(self._name, args=args)
+        return await mcp_sessions.call_tool(self.mcp_server_id, self._name, args)
 
 
 # ---------------------------------------------------------------------------
 # Registry
 # ---------------------------------------------------------------------------
 
+# Tool schema formats, and the Tool method building the schema of a tool
+SCHEMA_FORMATS: dict[str, str] = {
+    "definition": "to_definition",
+    "openai": "to_openai",
+    "ollama": "to_ollama",
+}
+
+
 class ToolRegistry:
     """Central registry for discovering and invoking tools by name."""
 
+    # Maximum number of cached tool selections (format and set of tool names)
+    MAX_CACHED_SELECTIONS = 256
+
     def __init__(self) -> None:
         self._tools: dict[str, Tool] = {}
+        # the version is incremented on every register/unregister, and invalidates the cached selections
+        self._version = 0
+        self._schemas: dict[str, dict[str, dict]] = {}
+        self._selections: OrderedDict[tuple[str, frozenset[str] | None], list[dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._search_index: ToolSearchIndex | None = None
+        self._search_index_version = -1
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     # -- registration -------------------------------------------------------
 
     def register(self, tool: Tool) -> None:
         """Register a tool instance. Raises ValueError on duplicate names."""
-        if tool.name in self._tools:
-            raise ValueError(f"Tool {tool.name!r} is already registered")
-        self._tools[tool.name] = tool
+        # the tools are modified under the cache lock, with the cached schemas and selections
+        with self._cache_lock:
+            if tool.name in self._tools:
+                raise ValueError(f"Tool {tool.name!r} is already registered")
+            self._tools[tool.name] = tool
+            self._invalidate(tool.name)
         logger.info("registered tool %r (%s)", tool.name, tool.__class__.__name__)
 
     def register_function(
@@ -237,7 +264,7 @@ class ToolRegistry:
             tool = McpTool(
                 name=defn['name'],
                 mcp_server_id=mcp_server_id,
-                description=defn.get("description", "").strip().split("\n")[0],
+                description=(defn.get("description") or "").strip().split("\n")[0],
                 parameters=defn.get("inputSchema", {}),
             )
             self.register(tool)
@@ -279,10 +306,13 @@ class ToolRegistry:
 
     def unregister(self, name: str) -> Tool:
         """Remove and return a tool. Raises KeyError if missing."""
-        try:
-            return self._tools.pop(name)
-        except KeyError:
-            raise KeyError(f"Tool {name!r} is not registered") from None
+        with self._cache_lock:
+            try:
+                tool = self._tools.pop(name)
+            except KeyError:
+                raise KeyError(f"Tool {name!r} is not registered") from None
+            self._invalidate(name)
+        return tool
 
     def has(self, name: str) -> bool:
         return name in self._tools
@@ -299,6 +329,72 @@ class ToolRegistry:
         """Return OpenAI-compatible tool definitions for all tools."""
         return [t.to_definition() for t in self._tools.values()]
 
+    # -- provider schemas ---------------------------------------------------
+
+    def tool_schemas(self, schema_format: str, names: set[str] | frozenset[str] | None = None) -> list[dict]:
+        """Return the precomputed tool schemas of the given tools, sorted by name.
+
+        The schemas are built once per tool and format, and the selection is cached per set of names,
+        until a tool is registered or unregistered. The returned list and dicts are shared, do not modify them.
+
+        :param schema_format: "openai", "ollama" or "definition" (see ``SCHEMA_FORMATS``).
+        :param names: The names of the tools. Unknown names are ignored. All tools if None.
+        """
+        if schema_format not in SCHEMA_FORMATS:
+            raise ValueError(f"Unsupported tool schema format: {schema_format!r}")
+        key = (schema_format, frozenset(names) if names is not None else None)
+        with self._cache_lock:
+            selection = self._selections.get(key)
+            if selection is not None:
+                self._selections.move_to_end(key)
+                return selection
+
+            schemas = self._schemas.get(schema_format)
+            if schemas is None:
+                method = SCHEMA_FORMATS[schema_format]
+                schemas = {name: getattr(tool, method)() for name, tool in self._tools.items()}
+                self._schemas[schema_format] = schemas
+            selected = schemas.keys() if names is None else (name for name in key[1] if name in schemas)
+            selection = [schemas[name] for name in sorted(selected)]
+
+            self._selections[key] = selection
+            while len(self._selections) > self.MAX_CACHED_SELECTIONS:
+                self._selections.popitem(last=False)
+            return selection
+
+    def search(self, query: str, top_k: int = 8, names: set[str] | frozenset[str] | None = None) -> list[str]:
+        """Return the names of the tools most relevant to the query (BM25 over names and descriptions).
+
+        :param query: The query text (e.g. the user prompt).
+        :param top_k: Maximum number of returned tools.
+        :param names: Only consider these tools. All tools if None.
+        """
+        with self._cache_lock:
+            if self._search_index is None or self._search_index_version != self._version:
+                self._search_index = ToolSearchIndex(self._tools.values())
+                self._search_index_version = self._version
+            index = self._search_index
+        return [name for name, _ in index.search(query, top_k=top_k, names=names)]
+
+    def invalidate(self, name: str | None = None) -> None:
+        """Drop the cached schemas of a tool (e.g. after its definition changed), or of all tools."""
+        with self._cache_lock:
+            self._invalidate(name)
+
+    def _invalidate(self, name: str | None) -> None:
+        # called with the cache lock held
+        self._version += 1
+        self._selections.clear()
+        if name is None:
+            self._schemas.clear()
+            return
+        for schema_format, schemas in self._schemas.items():
+            tool = self._tools.get(name)
+            if tool is None:
+                schemas.pop(name, None)
+            else:
+                schemas[name] = getattr(tool, SCHEMA_FORMATS[schema_format])()
+
     # -- invocation ---------------------------------------------------------
 
     def invoke(self, name: str, args: dict, **kwargs: Any) -> Any:
@@ -0,0 +1,109 @@
+"""
+Tool search: a BM25 index over the tool names, descriptions and parameters.
+
+Used to pre-select the tools relevant to a prompt, so only a few tool definitions are sent to the model
+instead of every allowed tool, without an extra LLM call.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from geenii.tool.registry import Tool
+
+_WORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+_STOPWORDS = frozenset("""
+a an and are as at be by can do does for from get how i in is it me my of on or please show tell that the this
+to use using what when where which who why will with you your
+""".split())
+
+# Terms of the tool name are weighted higher than the terms of the description
+_NAME_WEIGHT = 3
+
+
+def tokenize(text: str) -> list[str]:
+    """Split a text into normalized terms (snake_case and camelCase words are split)."""
+    terms = []
+    for word in _WORD_RE.findall(text or ""):
+        word = word.lower()
+        if word in _STOPWORDS:
+            continue
+        # naive plural stemming, "files" and "file" match
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _tool_terms(tool: Tool) -> Counter:
+    terms = Counter()
+    for term in tokenize(tool.name):
+        terms[term] += _NAME_WEIGHT
+    terms.update(tokenize(tool.description))
+    for name, schema in ((tool.parameters or {}).get("properties") or {}).items():
+        terms.update(tokenize(name))
+        if isinstance(schema, dict):
+            terms.update(tokenize(str(schema.get("description") or "")))
+    return terms
+
+
+class ToolSearchIndex:
+    """
+    BM25 index of tools.
+
+    :param tools: The indexed tools.
+    :param k1: BM25 term frequency saturation.
+    :param b: BM25 document length normalization.
+    """
+
+    def __init__(self, tools: Iterable[Tool], k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._names: list[str] = []
+        self._lengths: list[int] = []
+        # term -> [(tool index, term frequency)]
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        for tool in tools:
+            terms = _tool_terms(tool)
+            index = len(self._names)
+            self._names.append(tool.name)
+            self._lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self._postings.setdefault(term, []).append((index, tf))
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        count = len(self._names)
+        self._idf = {term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                     for term, postings in self._postings.items()}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def search(self, query: str, top_k: int = 8, names: set[str] | frozenset[str] | None = None,
+               min_score: float = 0.0) -> list[tuple[str, float]]:
+        """
+        Return the names and scores of the tools most relevant to the query, by descending score.
+
+        :param query: The query text (e.g. the user prompt).
+        :param top_k: Maximum number of returned tools.
+        :param names: Only consider these tools. All indexed tools if None.
+        :param min_score: Minimum score of the returned tools.
+        """
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for index, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / self._avg_length)
+                scores[index] = scores.get(index, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(((self._names[index], score) for index, score in scores.items()
+                         if score > min_score and (names is None or self._names[index] in names)),
+                        key=lambda item: (-item[1], item[0]))
+        return ranked[:top_k]
@@ -4,8 +4,10 @@ import asyncio
 import datetime
 from typing import Any
 
+from geenii import config
 from geenii.core.tools import geenii_tools, display_desktop_notification
-from geenii.mcp import get_mcp_config, McpClient
+from geenii.mcp import get_mcp_config
+from geenii.mcp_session import mcp_sessions
 from geenii.tool.registry import PythonTool, ToolRegistry, logger, ComputerTool
 from geenii.utils.cached import cached
 
@@ -81,7 +83,17 @@ def init_builtin_tools(registry: ToolRegistry):
         },
     ))
 
-async def init_mcp_server_tools(registry: ToolRegistry):
+async def init_mcp_server_tools(registry: ToolRegistry, timeout: float | None = None,
+                                 background: bool = True) -> list[asyncio.Task]:
+    """
+    Discover the tools of the configured MCP servers concurrently, and register them.
+
+    The tools of each server are registered as soon as the server answered. Waits at most `timeout` seconds
+    for the servers; with `background`, slower servers are registered late when they answer, and failed
+    servers are retried with backoff until they come up.
+
+    :return: The background discovery tasks (cancel them on shutdown).
+    """
     # mcp_servers = {
     #     "duckduckgo": {
     #         "command": "docker",
@@ -96,47 +108,70 @@ async def init_mcp_server_tools(registry: ToolRegistry):
     mcp_config = get_mcp_config()
     if not mcp_config or "mcpServers" not in mcp_config:
         print("No MCP servers configured")
-        return
-
-    @cached(ttl=3600)
-    async def read_mcp_server_tools(server_name, server_conf) -> list[dict]:
-        try:
-            mcp_client = McpClient(server_name, server_conf)
-            try:
-                tools = await mcp_client.list_tools()
-            except Exception as e:
-                # try again after a short delay in case the server is still starting up
-                print(f"Error listing tools from MCP server {server_name}: {e}. Retrying in 1 seconds...")
-                try:
-                    await asyncio.sleep(1)
-                    tools = await mcp_client.list_tools()
-                except Exception as e:
-                    print(f"Error listing tools from MCP server {server_name} on second attempt: {e}. Skipping this server.")
-                    return []
-
-            return tools
-        except Exception as e:
-            print(f"Error retrieving tools from MCP server {server_name}: {e}")
+        return []
+    timeout = timeout if timeout is not None else config.MCP_DISCOVERY_TIMEOUT
+
+    tasks = [asyncio.create_task(_discover_mcp_server_tools(registry, server_name, server_conf, retry=background),
+                                 name=f"mcp-discovery-{server_name}")
+             for server_name, server_conf in mcp_config["mcpServers"].items()]
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        names = [task.get_name().removeprefix("mcp-discovery-") for task in pending]
+        if background:
+            logger.info(f"MCP servers not discovered within {timeout}s, registering them in the background: {names}")
+        else:
+            logger.warning(f"MCP servers not discovered within {timeout}s, skipping: {names}")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
             return []
+    return list(pending)
 
-    for server_name, server_conf in mcp_config["mcpServers"].items():
+
+@cached(ttl=3600)
+async def read_mcp_server_tools(server_name: str, server_conf: dict) -> list[dict]:
+    # the tools are listed on the persistent session of the server, which is reused by the tool calls
+    tools = await mcp_sessions.run(server_name, lambda client: client.list_tools(), server_config=server_conf)
+    return [tool.model_dump() for tool in tools]
+
+
+async def _discover_mcp_server_tools(registry: ToolRegistry, server_name: str, server_conf: dict,
+                                     retry: bool = True) -> None:
+    attempt = 0
+    while True:
         try:
             mcp_tools = await read_mcp_server_tools(server_name, server_conf)
-
-            # map the MCP tool definitions to the internal tool representation and register them in the registry
-            registry.register_mcp_tools(
-                mcp_server_id=server_name,
-                tool_definitions=mcp_tools
-            )
+            break
         except Exception as e:
-            print(f"Error connecting to MCP server {server_name}: {e}")
-            continue
+            if not retry:
+                print(f"Error retrieving tools from MCP server {server_name}: {e}. Skipping this server.")
+                return
+            # retry until the server comes up
+            delay = min(config.MCP_DISCOVERY_RETRY_INTERVAL * 2 ** attempt, config.MCP_DISCOVERY_RETRY_MAX)
+            attempt += 1
+            print(f"Error retrieving tools from MCP server {server_name}: {e}. Retrying in {delay:.0f} seconds...")
+            await asyncio.sleep(delay)
+
+    try:
+        # map the MCP tool definitions to the internal tool representation and register them in the registry
+        registry.register_mcp_tools(
+            mcp_server_id=server_name,
+            tool_definitions=mcp_tools
+        )
+        logger.info(f"Registered {len(mcp_tools)} tools of MCP server {server_name}")
+    except Exception as e:
+        print(f"Error registering tools of MCP server {server_name}: {e}")
+
 
 def init_mcp_server_tools_sync(registry: ToolRegistry):
     # wrapper for the async version of init_mcp_server_tools to be used in synchronous contexts
     #asyncio.run(init_mcp_server_tools(registry))
     async def initialize():
-        await init_mcp_server_tools(registry)
+        # no background registration, the event loop only runs for the initialization
+        await init_mcp_server_tools(registry, background=False)
+        await mcp_sessions.close()
 
     loop = asyncio.get_event_loop()
     loop.run_until_complete(initialize())
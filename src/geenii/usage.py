@@ -0,0 +1,307 @@
+"""
+AI usage analytics.
+
+Usage records are appended as JSONL to `logs/ai-usage-YYYY-MM.log` by the AI module.
+The UsageStore incrementally ingests these log files into an indexed SQLite database
+and answers aggregate queries (tokens and latency per model, provider, context and time bucket)
+without re-scanning the log files.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from geenii import config
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of log lines ingested per transaction
+INGEST_BATCH_LINES = 5000
+
+# Allowed group-by dimensions and their SQL expressions
+GROUP_BY_COLUMNS = {
+    "model": "model",
+    "provider": "provider",
+    "context_id": "context_id",
+    "cache": "cache",
+}
+
+# Time bucket formats for the "bucket" group-by dimension
+TIME_BUCKETS = {
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+
+class UsageStore:
+    """
+    SQLite-indexed store of AI usage records.
+
+    Log files are ingested incrementally: the byte offset of the last complete line is tracked per file,
+    so each record is read exactly once. Gzipped (rotated) log segments continue from the offset
+    of their uncompressed file.
+    """
+
+    def __init__(self, db_path: str, log_dir: str) -> None:
+        self.db_path = db_path
+        self.log_dir = log_dir
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.conn.execute("PRAGMA busy_timeout=5000;")
+
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                provider TEXT,
+                model TEXT,
+                context_id TEXT,
+                input_tokens INTEGER NOT NULL DEFAULT 0,
+                output_tokens INTEGER NOT NULL DEFAULT 0,
+                total_tokens INTEGER NOT NULL DEFAULT 0,
+                load_duration INTEGER,
+                total_duration INTEGER,
+                cache TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_ts ON usage(ts)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_model_ts ON usage(model, ts)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_provider_ts ON usage(provider, ts)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_context ON usage(context_id)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage_ingest (
+                file TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                compressed_size INTEGER
+            )
+        """)
+
+    # ---- Ingest ----
+
+    def ingest(self) -> int:
+        """
+        Ingest new records from the usage log files.
+
+        :return: The number of ingested records.
+        """
+        files = sorted(glob.glob(os.path.join(self.log_dir, "ai-usage-*.log*")))
+        total = 0
+        with self._lock:
+            for file_path in files:
+                try:
+                    total += self._ingest_file(file_path)
+                except Exception as e:
+                    logger.warning(f"Failed to ingest usage log {file_path}: {e}")
+        if total:
+            logger.info(f"Ingested {total} usage records")
+        return total
+
+    def _ingest_file(self, file_path: str) -> int:
+        compressed = file_path.endswith(".gz")
+        name = os.path.basename(file_path[:-3] if compressed else file_path)
+        row = self.conn.execute("SELECT offset, compressed_size FROM usage_ingest WHERE file = ?",
+                                (name,)).fetchone()
+        offset = row["offset"] if row else 0
+        size = os.path.getsize(file_path)
+        if compressed:
+            if os.path.exists(file_path[:-3]) or (row and row["compressed_size"] == size):
+                # compression in progress, or the compressed segment has been ingested completely
+                return 0
+        elif size <= offset:
+            return 0
+
+        opener = gzip.open if compressed else open
+        total = 0
+        with opener(file_path, "rb") as f:
+            f.seek(offset)
+            done = False
+            while not done:
+                # ingest the file line by line in batches, the offset is advanced with each batch
+                rows = []
+                start = offset
+                for _ in range(INGEST_BATCH_LINES):
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        # only ingest complete lines, a partial last line is picked up by the next ingest
+                        done = True
+                        break
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        rows.append(self._to_row(json.loads(line)))
+                    except Exception as e:
+                        logger.warning(f"Skipping invalid usage record in {name}: {e}")
+                if offset > start or (compressed and done):
+                    self._commit_batch(name, rows, offset, size if compressed and done else None)
+                total += len(rows)
+        return total
+
+    def _commit_batch(self, name: str, rows: list[tuple], offset: int, compressed_size: int | None) -> None:
+        self.conn.execute("BEGIN IMMEDIATE;")
+        try:
+            self.conn.executemany(
+                "INSERT INTO usage(ts, provider, model, context_id, input_tokens, output_tokens, total_tokens, "
+                "load_duration, total_duration, cache) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.execute(
+                "INSERT INTO usage_ingest(file, offset, compressed_size) VALUES(?, ?, ?) "
+                "ON CONFLICT(file) DO UPDATE SET offset=excluded.offset, compressed_size=excluded.compressed_size",
+                (name, offset, compressed_size),
+            )
+            self.conn.execute("COMMIT;")
+        except Exception:
+            self.conn.execute("ROLLBACK;")
+            raise
+
+    @staticmethod
+    def _to_row(record: dict) -> tuple:
+        usage = record.get("usage") or {}
+        input_tokens = int(usage.get("input_tokens") or 0)
+        output_tokens = int(usage.get("output_tokens") or 0)
+        return (
+            datetime.fromisoformat(record["timestamp"]).timestamp(),
+            record.get("provider"),
+            record.get("model"),
+            record.get("context_id"),
+            input_tokens,
+            output_tokens,
+            int(usage.get("total_tokens") or (input_tokens + output_tokens)),
+            usage.get("load_duration"),
+            usage.get("total_duration"),
+            usage.get("cache"),
+        )
+
+    # ---- Queries ----
+
+    def aggregate(self,
+                  group_by: list[str] = None,
+                  bucket: str = None,
+                  since: datetime = None,
+                  until: datetime = None,
+                  **filters) -> list[dict]:
+        """
+        Aggregate token usage and latency.
+
+        Latency percentiles are computed over `total_duration` (milliseconds) of uncached completions.
+
+        :param group_by: Dimensions to group by: "model", "provider", "context_id", "cache" and "bucket".
+        :param bucket: The time bucket size for the "bucket" dimension: "hour", "day", "week" or "month".
+        :param since: Only include records at or after this time.
+        :param until: Only include records before this time.
+        :param filters: Equality filters on the group-by dimensions, e.g. provider="ollama", model="qwen3:8b".
+        :return: One dict per group with the group keys, `requests`, token sums, and `latency_p50`/`latency_p95`.
+        """
+        group_by = list(group_by or [])
+        if bucket and "bucket" not in group_by:
+            group_by.append("bucket")
+
+        group_exprs = []
+        for dim in group_by:
+            if dim == "bucket":
+                if (bucket or "day") not in TIME_BUCKETS:
+                    raise ValueError(f"Invalid time bucket: {bucket}")
+                group_exprs.append(f"strftime('{TIME_BUCKETS[bucket or 'day']}', ts, 'unixepoch', 'localtime')")
+            elif dim in GROUP_BY_COLUMNS:
+                group_exprs.append(GROUP_BY_COLUMNS[dim])
+            else:
+                raise ValueError(f"Invalid group by dimension: {dim}")
+
+        where, params = ["1=1"], []
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since.timestamp())
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until.timestamp())
+        for dim, value in filters.items():
+            if dim not in GROUP_BY_COLUMNS:
+                raise ValueError(f"Invalid filter: {dim}")
+            if value is not None:
+                where.append(f"{GROUP_BY_COLUMNS[dim]} = ?")
+                params.append(value)
+
+        select_groups = ", ".join(f"{expr} AS g{i}" for i, expr in enumerate(group_exprs))
+        group_cols = ", ".join(f"g{i}" for i in range(len(group_exprs)))
+        where_sql = " AND ".join(where)
+
+        totals_sql = f"""
+            SELECT {select_groups + ',' if select_groups else ''}
+                COUNT(*) AS requests,
+                SUM(input_tokens) AS input_tokens,
+                SUM(output_tokens) AS output_tokens,
+                SUM(total_tokens) AS total_tokens
+            FROM usage WHERE {where_sql}
+            {'GROUP BY ' + group_cols if group_cols else ''}
+        """
+        partition = f"PARTITION BY {', '.join(group_exprs)}" if group_exprs else ""
+        latency_sql = f"""
+            WITH ranked AS (
+                SELECT {select_groups + ',' if select_groups else ''}
+                    total_duration AS d,
+                    ROW_NUMBER() OVER ({partition} ORDER BY total_duration) AS rn,
+                    COUNT(*) OVER ({partition}) AS cnt
+                FROM usage
+                WHERE {where_sql} AND total_duration IS NOT NULL AND (cache IS NULL OR cache != 'hit')
+            )
+            SELECT {group_cols + ',' if group_cols else ''}
+                MIN(CASE WHEN rn >= 0.50 * cnt THEN d END) AS latency_p50,
+                MIN(CASE WHEN rn >= 0.95 * cnt THEN d END) AS latency_p95
+            FROM ranked
+            {'GROUP BY ' + group_cols if group_cols else ''}
+        """
+
+        with self._lock:
+            totals = self.conn.execute(totals_sql, params).fetchall()
+            latencies = self.conn.execute(latency_sql, params).fetchall()
+
+        def group_key(row) -> tuple:
+            return tuple(row[f"g{i}"] for i in range(len(group_exprs)))
+
+        latency_by_group = {group_key(row): row for row in latencies}
+        results = []
+        for row in totals:
+            if row["requests"] == 0:
+                continue
+            key = group_key(row)
+            latency = latency_by_group.get(key)
+            results.append({
+                **dict(zip(group_by, key)),
+                "requests": row["requests"],
+                "input_tokens": row["input_tokens"] or 0,
+                "output_tokens": row["output_tokens"] or 0,
+                "total_tokens": row["total_tokens"] or 0,
+                "latency_p50": latency["latency_p50"] if latency else None,
+                "latency_p95": latency["latency_p95"] if latency else None,
+            })
+        return results
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_usage_store: UsageStore | None = None
+_usage_store_lock = threading.Lock()
+
+
+def get_usage_store() -> UsageStore:
+    """Return the process-wide usage store."""
+    global _usage_store
+    with _usage_store_lock:
+        if _usage_store is None:
+            _usage_store = UsageStore(config.USAGE_DB_PATH, f"{config.DATA_DIR}/logs")
+        return _usage_store
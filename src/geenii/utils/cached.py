@@ -4,6 +4,7 @@ import json
 import inspect
 
 import os
+import threading
 import time
 import pickle
 import hashlib
@@ -35,7 +36,11 @@ class SqliteCacheStore:
         synchronous: str = "NORMAL",    # FULL | NORMAL | OFF
         cache_size_kib: int = -64_000,  # negative => KiB. e.g. -64000 ~= 64MiB
         mmap_size_bytes: int = 128 * 1024 * 1024,  # 128MiB
+        max_entries: int | None = None,  # LRU bound, None => unbounded
     ):
+        self.max_entries = max_entries
+        # the connection is shared by threads, its transactions must not interleave
+        self._lock = threading.Lock()
         self.conn = sqlite3.connect(
             db_path,
             timeout=timeout,
@@ -65,17 +70,24 @@ class SqliteCacheStore:
             CREATE TABLE IF NOT EXISTS cache (
                 key TEXT PRIMARY KEY,
                 expiry REAL,
-                value BLOB NOT NULL
+                value BLOB NOT NULL,
+                accessed REAL
             )
         """)
+        # migrate cache databases created before the LRU access column was added
+        columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(cache)")]
+        if "accessed" not in columns:
+            self.conn.execute("ALTER TABLE cache ADD COLUMN accessed REAL")
         self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expiry ON cache(expiry)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed)")
 
     # ---- Internal helper: retry on transient locks ----
 
     def _with_retry(self, fn, *, retries: int = 3, base_sleep: float = 0.02):
         for i in range(retries + 1):
             try:
-                return fn()
+                with self._lock:
+                    return fn()
             except sqlite3.OperationalError as e:
                 msg = str(e).lower()
                 if "locked" in msg or "busy" in msg:
@@ -105,16 +117,22 @@ class SqliteCacheStore:
                 return None
 
             try:
-                return pickle.loads(row["value"])
+                value = pickle.loads(row["value"])
             except Exception:
                 # corrupted blob → delete
                 self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
                 return None
 
+            if self.max_entries is not None:
+                # track recency only for bounded caches, to keep reads write-free otherwise
+                self.conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            return value
+
         return self._with_retry(op)
 
     def write_cache(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
-        expiry = None if ttl is None else (time.time() + float(ttl))
+        now = time.time()
+        expiry = None if ttl is None else (now + float(ttl))
         blob = sqlite3.Binary(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
 
         def op():
@@ -122,10 +140,13 @@ class SqliteCacheStore:
             self.conn.execute("BEGIN IMMEDIATE;")
             try:
                 self.conn.execute(
-                    "INSERT INTO cache(key, expiry, value) VALUES(?, ?, ?) "
-                    "ON CONFLICT(key) DO UPDATE SET expiry=excluded.expiry, value=excluded.value",
-                    (key, expiry, blob),
+                    "INSERT INTO cache(key, expiry, value, accessed) VALUES(?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET expiry=excluded.expiry, value=excluded.value, "
+                    "accessed=excluded.accessed",
+                    (key, expiry, blob, now),
                 )
+                if self.max_entries is not None:
+                    self._evict(now)
                 self.conn.execute("COMMIT;")
             except Exception:
                 self.conn.execute("ROLLBACK;")
@@ -133,6 +154,23 @@ class SqliteCacheStore:
 
         self._with_retry(op)
 
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the least recently used entries above `max_entries`."""
+        self.conn.execute("DELETE FROM cache WHERE expiry IS NOT NULL AND expiry < ?", (now,))
+        self.conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "  SELECT key FROM cache ORDER BY accessed ASC"
+            "  LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?)"
+            ")",
+            (int(self.max_entries),),
+        )
+
+    def delete(self, key: str) -> None:
+        self._with_retry(lambda: self.conn.execute("DELETE FROM cache WHERE key = ?", (key,)))
+
+    def count(self) -> int:
+        return self._with_retry(lambda: self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0])
+
     def purge_expired(self) -> int:
         now = time.time()
 
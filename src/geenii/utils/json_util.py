@@ -1,5 +1,6 @@
 # JSONL helper functions for reading and writing JSON files.
 import json
+import os
 
 
 def read_json(file_path: str) -> dict:
@@ -12,6 +13,22 @@ def write_json(file_path: str, data: dict) -> None:
     with open(file_path, "w") as f:
         json.dump(data, f, indent=2)
 
+def write_json_if_changed(file_path: str, data: dict) -> bool:
+    """Write a dictionary to a JSON file, unless the file already has the same content.
+    Returns True if the file was written."""
+    content = json.dumps(data, indent=2)
+    try:
+        with open(file_path, "r") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
+    return True
+
 def read_jsonl(file_path: str) -> list[dict]:
     """Read a JSONL file and return a list of dictionaries."""
     data = []
@@ -0,0 +1,233 @@
+"""Background JSONL log writer with batching and date/size rotation."""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Literal
+
+import pydantic
+
+logger = logging.getLogger(__name__)
+
+type OverflowPolicy = Literal["drop", "block"]
+
+
+class _Segment:
+    def __init__(self, base_path: Path, path: Path, handle, size: int) -> None:
+        self.base_path = base_path
+        self.path = path
+        self.handle = handle
+        self.size = size
+
+
+class JsonlLogSink:
+    """
+    Append JSON records to log files from a background writer thread.
+
+    Records are put on a bounded in-memory queue and written in batches, so file system latency
+    does not show up on the caller's path. File handles are kept open per stream.
+
+    Rotation:
+      - by date: callers pass the (dated) file path with each record, a new path closes the previous segment.
+      - by size: when a segment exceeds `max_bytes`, writes continue in `<name>.1.log`, `<name>.2.log`, ...
+
+    When the queue is full, records are dropped (`policy="drop"`) or the caller blocks
+    for up to `block_timeout` seconds before the record is dropped (`policy="block"`).
+    Closed segments are gzipped, if `compress` is enabled.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        *,
+        max_queue_size: int = 10_000,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        max_bytes: int | None = None,
+        policy: OverflowPolicy = "drop",
+        block_timeout: float = 5.0,
+        compress: bool = False,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.compress = compress
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._segments: dict[str, _Segment] = {}
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"written": 0, "dropped": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def write(self, stream: str, file_path: str, record: Any) -> bool:
+        """
+        Enqueue a record for writing.
+
+        :param stream: The log stream name (e.g. "ai", "ai-usage"). Each stream has one open segment.
+        :param file_path: The (dated) log file path for the record.
+        :param record: A JSON-serializable value, which may contain pydantic models.
+            Records are serialized in the writer thread, so they must not be mutated after enqueuing.
+        :return: False if the record was dropped.
+        """
+        if self._closed:
+            return False
+        self._ensure_started()
+        item = (stream, file_path, record)
+        try:
+            if self.policy == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            dropped = self._count("dropped")
+            if dropped % 1000 == 1:
+                logger.warning(f"Log queue is full, dropped {dropped} records so far")
+            return False
+
+    def flush(self) -> None:
+        """Block until all enqueued records have been written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the pending records, then stop the writer thread and close all segments."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def _count(self, name: str) -> int:
+        # the counters are updated by the callers and the writer thread
+        with self._stats_lock:
+            self._stats[name] += 1
+            return self._stats[name]
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jsonl-log-sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if self._STOP in batch:
+                stop = True
+            self._write_batch([item for item in batch if item is not self._STOP])
+            for _ in batch:
+                self._queue.task_done()
+
+        for stream in list(self._segments):
+            self._close_segment(stream, compress=False)
+
+    def _write_batch(self, batch: list[tuple[str, str, Any]]) -> None:
+        touched = set()
+        for stream, file_path, record in batch:
+            try:
+                line = self._serialize(record)
+                segment = self._segment_for(stream, Path(file_path))
+                data = line.encode("utf-8")
+                segment.handle.write(data)
+                segment.size += len(data)
+                touched.add(stream)
+                self._count("written")
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Failed to write log record to {file_path}: {e}")
+        for stream in touched:
+            segment = self._segments.get(stream)
+            if segment is not None:
+                segment.handle.flush()
+
+    @staticmethod
+    def _serialize(record: Any) -> str:
+        if isinstance(record, pydantic.BaseModel):
+            return record.model_dump_json() + "\n"
+        return json.dumps(record, default=_json_default) + "\n"
+
+    def _segment_for(self, stream: str, base_path: Path) -> _Segment:
+        segment = self._segments.get(stream)
+        if segment is not None and segment.base_path != base_path:
+            # date rotation
+            self._close_segment(stream)
+            segment = None
+        if segment is not None and self.max_bytes and segment.size >= self.max_bytes:
+            # size rotation
+            self._close_segment(stream)
+            segment = None
+        if segment is None:
+            segment = self._open_segment(base_path)
+            self._segments[stream] = segment
+        return segment
+
+    def _open_segment(self, base_path: Path) -> _Segment:
+        base_path.parent.mkdir(parents=True, exist_ok=True)
+        path, index = base_path, 0
+        # continue in the first segment that is not full (or compressed) yet
+        while (path.with_name(path.name + ".gz").exists()
+               or (self.max_bytes and path.exists() and path.stat().st_size >= self.max_bytes)):
+            index += 1
+            path = base_path.with_name(f"{base_path.stem}.{index}{base_path.suffix}")
+        handle = open(path, "ab")
+        return _Segment(base_path, path, handle, handle.tell())
+
+    def _close_segment(self, stream: str, compress: bool | None = None) -> None:
+        segment = self._segments.pop(stream, None)
+        if segment is None:
+            return
+        try:
+            segment.handle.close()
+        except Exception as e:
+            logger.warning(f"Failed to close log segment {segment.path}: {e}")
+            return
+        if self.compress if compress is None else compress:
+            try:
+                _gzip_file(segment.path)
+            except Exception as e:
+                logger.warning(f"Failed to compress log segment {segment.path}: {e}")
+
+
+def _gzip_file(path: Path) -> None:
+    gz_path = path.with_name(path.name + ".gz")
+    with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(path)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, pydantic.BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
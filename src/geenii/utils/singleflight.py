@@ -0,0 +1,130 @@
+"""
+Single-flight call deduplication.
+
+Concurrent calls with the same key share one in-flight execution of the wrapped function,
+all callers receive its result (or its exception).
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.in_flight = 0
+
+    def record(self, shared: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if shared:
+                self.coalesced += 1
+            else:
+                self.executed += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": self.in_flight,
+            }
+
+
+class SingleFlight:
+    """Thread-based single-flight group for synchronous callers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._stats = _Stats()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Execute `fn` once per key among concurrent callers.
+
+        :return: A tuple of the result and a flag, True if the result was shared from another caller's call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                shared = True
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats.in_flight += 1
+                shared = False
+        self._stats.record(shared)
+
+        if shared:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                self._stats.in_flight -= 1
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict:
+        return self._stats.snapshot()
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio-based single-flight group for coroutine callers.
+
+    The shared call runs as a task on the event loop of the first caller. Calls are grouped per event loop,
+    because tasks can not be awaited from another loop.
+    A cancelled caller does not cancel the shared call for the other callers.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[tuple[int, str], asyncio.Task] = {}
+        self._stats = _Stats()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Await `fn()` once per key among concurrent callers.
+
+        :return: A tuple of the result and a flag, True if the result was shared from another caller's call.
+        """
+        call_key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(call_key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._calls[call_key] = task
+            self._stats.in_flight += 1
+            task.add_done_callback(lambda _: self._done(call_key))
+        self._stats.record(shared)
+        return await asyncio.shield(task), shared
+
+    def _done(self, call_key: tuple[int, str]) -> None:
+        self._calls.pop(call_key, None)
+        self._stats.in_flight -= 1
+
+    def stats(self) -> dict:
+        return self._stats.snapshot()
@@ -0,0 +1,523 @@
+"""
+Vector long-term memory.
+
+Past messages and skill documents are embedded (with an embedding model, or a pluggable embedder)
+and stored in an on-disk IVF index, so agents can recall the relevant parts of earlier conversations
+instead of resending long transcripts.
+
+Index layout (one directory per embedding model):
+
+  - `vectors.f32`: the normalized float32 vectors, memory-mapped and grown in chunks
+  - `lists.i32` / `namespaces.i32`: the inverted list and the namespace of each vector
+  - `centroids.npy`: the k-means centroids of the inverted lists
+  - `meta.sqlite`: the text, key and metadata of each vector
+
+Small indexes are searched exhaustively. Once an index exceeds `train_threshold` vectors, the vectors are
+clustered into ~sqrt(N) inverted lists, and a search only scans the `nprobe` lists closest to the query.
+The lists are re-trained when the index has grown 4x since the last training.
+
+Requires the `numpy` package (optional dependency, `pip install geenii[vector]`).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from geenii import config
+
+logger = logging.getLogger(__name__)
+
+# Embeds a batch of texts, returns one vector per text
+Embedder = Callable[[list[str]], list[list[float]]]
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    row INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    namespace TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS namespaces (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Vectors are allocated in chunks of this many rows
+_GROW_ROWS = 4096
+
+
+class VectorMatch:
+    """A search result of the vector index."""
+
+    def __init__(self, key: str, namespace: str, kind: str, text: str, metadata: dict, score: float) -> None:
+        self.key = key
+        self.namespace = namespace
+        self.kind = kind
+        self.text = text
+        self.metadata = metadata
+        self.score = score
+
+    def __repr__(self):
+        return f"VectorMatch(key={self.key!r}, namespace={self.namespace!r}, score={self.score:.3f})"
+
+
+class _Column:
+    """A memory-mapped array file of fixed width rows, grown in chunks."""
+
+    def __init__(self, path: Path, dtype: str, width: int = 1) -> None:
+        self.path = path
+        self.dtype = dtype
+        self.width = width
+        self.array = None
+
+    def open(self, capacity: int) -> None:
+        import numpy as np
+
+        itemsize = np.dtype(self.dtype).itemsize * self.width
+        size = self.path.stat().st_size if self.path.exists() else 0
+        rows = max(size // itemsize, capacity)
+        if rows * itemsize != size:
+            with open(self.path, "ab") as f:
+                f.truncate(rows * itemsize)
+        shape = (rows, self.width) if self.width > 1 else (rows,)
+        self.array = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=shape) if rows else None
+
+    def reserve(self, rows: int) -> None:
+        capacity = 0 if self.array is None else self.array.shape[0]
+        if rows > capacity:
+            self.flush()
+            self.array = None
+            self.open(math.ceil(rows / _GROW_ROWS) * _GROW_ROWS)
+
+    def flush(self) -> None:
+        if self.array is not None:
+            self.array.flush()
+
+
+class VectorIndex:
+    """
+    On-disk IVF index of normalized vectors, searched by cosine similarity.
+
+    :param path: The index directory.
+    :param nprobe: Number of inverted lists scanned per search.
+    :param train_threshold: Search exhaustively until the index has this many vectors.
+    """
+
+    def __init__(self, path: str | Path, nprobe: int = 8, train_threshold: int = 20000) -> None:
+        import numpy as np
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.path / "meta.sqlite", check_same_thread=False)
+        self._db.executescript(_INDEX_SCHEMA)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+        info = dict(self._db.execute("SELECT key, value FROM info"))
+        self.dim: int | None = int(info["dim"]) if "dim" in info else None
+        self._trained_size = int(info.get("trained_size", 0))
+        self._namespaces: dict[str, int] = {name: ns_id for ns_id, name in
+                                            self._db.execute("SELECT id, name FROM namespaces")}
+        # rows are allocated contiguously, vectors beyond the committed rows are leftovers of an interrupted write
+        self.size: int = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM items").fetchone()[0]
+
+        self._vectors = _Column(self.path / "vectors.f32", "float32", self.dim or 1)
+        self._assign = _Column(self.path / "lists.i32", "int32")
+        self._ns = _Column(self.path / "namespaces.i32", "int32")
+        self._centroids = None
+        self._lists: list = []
+        self._training = False
+        if self.dim:
+            for column in (self._vectors, self._assign, self._ns):
+                column.open(self.size)
+        centroids_path = self.path / "centroids.npy"
+        if self._trained_size and centroids_path.exists():
+            self._centroids = np.load(centroids_path)
+            self._build_lists()
+        self._stats = {"searches": 0, "scanned": 0, "trainings": 0}
+
+    # ---- Writing ----
+
+    def has_keys(self, keys: list[str]) -> set[str]:
+        """The keys which are already in the index."""
+        existing = set()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                existing.update(key for key, in self._db.execute(
+                    f"SELECT key FROM items WHERE key IN ({','.join('?' * len(batch))})", batch))
+        return existing
+
+    def add(self, vectors, namespace: str, kind: str, texts: list[str], keys: list[str],
+            metadata: list[dict] | None = None) -> int:
+        """
+        Add vectors to the index. Vectors with a key that is already in the index are skipped.
+
+        :return: The number of added vectors.
+        """
+        import numpy as np
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts) or len(texts) != len(keys):
+            raise ValueError("Expected one vector, text and key per item")
+        metadata = metadata or [{} for _ in texts]
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._vectors.width = self.dim
+                self._db.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match the index dimension {self.dim}")
+
+            existing = self.has_keys(keys)
+            seen = set()
+            selected = []
+            for i, key in enumerate(keys):
+                if key not in existing and key not in seen:
+                    seen.add(key)
+                    selected.append(i)
+            if not selected:
+                return 0
+
+            vectors = _normalize(vectors[selected])
+            start, end = self.size, self.size + len(selected)
+            ns_id = self._namespace_id(namespace)
+            for column in (self._vectors, self._assign, self._ns):
+                column.reserve(end)
+            self._vectors.array[start:end] = vectors
+            self._ns.array[start:end] = ns_id
+            self._assign.array[start:end] = self._nearest_list(vectors) if self._centroids is not None else -1
+            for column in (self._vectors, self._assign, self._ns):
+                column.flush()
+
+            now = time.time()
+            self._db.executemany(
+                "INSERT INTO items (row, key, namespace, kind, text, metadata, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(start + j, keys[i], namespace, kind, texts[i], json.dumps(metadata[i]), now)
+                 for j, i in enumerate(selected)])
+            self._db.commit()
+            self.size = end
+
+            if self._centroids is not None:
+                self._extend_lists(start, end)
+            retrain = end >= self.train_threshold and end >= self._trained_size * 4
+        if retrain:
+            self.train()
+        return len(selected)
+
+    def _namespace_id(self, namespace: str) -> int:
+        if namespace not in self._namespaces:
+            cursor = self._db.execute("INSERT INTO namespaces (name) VALUES (?)", (namespace,))
+            self._db.commit()
+            self._namespaces[namespace] = cursor.lastrowid
+        return self._namespaces[namespace]
+
+    # ---- Inverted lists ----
+
+    def train(self, iterations: int = 10, sample_per_list: int = 32) -> None:
+        """
+        Cluster the vectors into ~sqrt(N) inverted lists (spherical k-means on a sample).
+
+        The lists are trained on the vectors added so far without holding the index lock, and swapped in once
+        trained, searches and writes use the previous lists meanwhile.
+        """
+        import numpy as np
+
+        with self._lock:
+            if self._training or not self.size:
+                return
+            self._training = True
+            n = self.size
+            # the committed rows are not modified, the memory map stays valid if the column is grown meanwhile
+            vectors = self._vectors.array
+        try:
+            nlist = min(max(int(math.sqrt(n)), 16), 65536, n)
+            rng = np.random.default_rng(n)
+            sample = np.asarray(vectors[np.sort(rng.choice(n, min(n, nlist * sample_per_list), replace=False))])
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assign = _argmax_dot(sample, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, sample)
+                counts = np.bincount(assign, minlength=nlist)
+                empty = counts == 0
+                # re-seed empty lists with random sample vectors
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+                centroids = _normalize(sums)
+            centroids = centroids.astype(np.float32)
+            assign = np.concatenate([_argmax_dot(vectors[start:min(start + 65536, n)], centroids)
+                                     for start in range(0, n, 65536)])
+
+            with self._lock:
+                # vectors added during the training are assigned to the new lists as well
+                if self.size > n:
+                    assign = np.concatenate([assign, _argmax_dot(self._vectors.array[n:self.size], centroids)])
+                self._centroids = centroids
+                self._assign.array[:self.size] = assign
+                self._assign.flush()
+                np.save(self.path / "centroids.npy", self._centroids)
+                self._trained_size = self.size
+                self._db.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('trained_size', ?)",
+                                 (str(self.size),))
+                self._db.commit()
+                self._build_lists()
+                self._stats["trainings"] += 1
+                logger.info(f"Trained vector index {self.path} with {nlist} lists for {self.size} vectors")
+        finally:
+            with self._lock:
+                self._training = False
+
+    def _nearest_list(self, vectors):
+        return _argmax_dot(vectors, self._centroids)
+
+    def _build_lists(self) -> None:
+        import numpy as np
+
+        assign = np.asarray(self._assign.array[:self.size])
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+    def _extend_lists(self, start: int, end: int) -> None:
+        import numpy as np
+
+        rows = np.arange(start, end)
+        assign = np.asarray(self._assign.array[start:end])
+        for list_id in np.unique(assign):
+            self._lists[list_id] = np.concatenate([self._lists[list_id], rows[assign == list_id]])
+
+    # ---- Search ----
+
+    def search(self, query, top_k: int = 5, namespaces: list[str] | None = None, min_score: float = 0.0,
+               nprobe: int | None = None) -> list[VectorMatch]:
+        """
+        Find the vectors most similar to the query vector.
+
+        :param query: The query vector.
+        :param top_k: Maximum number of results.
+        :param namespaces: Only search these namespaces. Searches all namespaces if None.
+        :param min_score: Minimum cosine similarity of the results.
+        :param nprobe: Number of inverted lists scanned. Defaults to the `nprobe` of the index.
+        """
+        import numpy as np
+
+        with self._lock:
+            if not self.size or top_k <= 0:
+                return []
+            query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+            if self._centroids is None:
+                rows = np.arange(self.size)
+            else:
+                probe = _top_indices(self._centroids @ query, nprobe or self.nprobe)
+                rows = np.sort(np.concatenate([self._lists[i] for i in probe]))
+            if namespaces is not None:
+                ns_ids = [self._namespaces[name] for name in namespaces if name in self._namespaces]
+                rows = rows[np.isin(self._ns.array[rows], ns_ids)]
+            if not len(rows):
+                return []
+
+            # contiguous rows are scanned directly from the memory map, without copying the vectors
+            vectors = self._vectors.array[:self.size] if len(rows) == self.size else self._vectors.array[rows]
+            scores = vectors @ query
+            self._stats["searches"] += 1
+            self._stats["scanned"] += len(scores)
+            best = _top_indices(scores, top_k)
+            best = best[scores[best] >= min_score]
+            return self._matches([int(rows[i]) for i in best], [float(scores[i]) for i in best])
+
+    def _matches(self, rows: list[int], scores: list[float]) -> list[VectorMatch]:
+        if not rows:
+            return []
+        items = {row: item for row, *item in self._db.execute(
+            f"SELECT row, key, namespace, kind, text, metadata FROM items WHERE row IN ({','.join('?' * len(rows))})",
+            rows)}
+        matches = []
+        for row, score in zip(rows, scores):
+            key, namespace, kind, text, metadata = items[row]
+            matches.append(VectorMatch(key, namespace, kind, text, json.loads(metadata or "{}"), score))
+        return matches
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": self.size, "dim": self.dim,
+                    "lists": len(self._lists) if self._centroids is not None else 0}
+
+    def close(self) -> None:
+        with self._lock:
+            for column in (self._vectors, self._assign, self._ns):
+                column.flush()
+            self._db.close()
+
+
+def _normalize(vectors):
+    import numpy as np
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _argmax_dot(vectors, centroids):
+    import numpy as np
+
+    # in chunks, to bound the memory of the similarity matrix
+    return np.concatenate([np.argmax(vectors[i:i + 8192] @ centroids.T, axis=1)
+                           for i in range(0, len(vectors), 8192)] or [np.empty(0, dtype=np.int64)])
+
+
+def _top_indices(scores, k: int):
+    import numpy as np
+
+    if k < len(scores):
+        top = np.argpartition(-scores, k)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class ModelEmbedder:
+    """
+    Embeds texts with an embedding model (see `geenii.ai.generate_embeddings`), with batching and caching.
+
+    :param model: The model ID ("provider:model", e.g. "ollama:nomic-embed-text"). The provider receives the model
+        name without the provider prefix.
+    """
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        from geenii.ai import generate_embeddings
+        from geenii.datamodels import EmbeddingRequest
+
+        response = generate_embeddings(EmbeddingRequest(model=self.model, input=texts))
+        if response.error:
+            raise RuntimeError(f"Embedding model {self.model} returned an error: {response.error}")
+        return response.embeddings
+
+
+class VectorMemory:
+    """
+    Long-term memory of agents: embeds texts and recalls the most relevant ones.
+
+    :param embedder: Embeds a batch of texts.
+    :param index: The vector index.
+    :param min_score: Minimum similarity of recalled texts.
+    """
+
+    def __init__(self, embedder: Embedder, index: VectorIndex, min_score: float = 0.0) -> None:
+        self.embedder = embedder
+        self.index = index
+        self.min_score = min_score
+        self._pending: set[asyncio.Task] = set()
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        return f"{namespace}:{hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()}"
+
+    def add(self, namespace: str, texts: list[str], kind: str = "message", metadata: dict | None = None,
+            keys: list[str] | None = None) -> int:
+        """
+        Embed and store the texts. Texts with a key that is already stored are not embedded again.
+
+        :param namespace: The namespace of the texts, e.g. the agent name.
+        :param texts: The texts.
+        :param kind: The kind of the texts, e.g. "message" or "skill".
+        :param metadata: Metadata stored with each text.
+        :param keys: Unique keys of the texts. Defaults to a hash of the namespace and the text.
+        :return: The number of added texts.
+        """
+        keys = keys or [self.make_key(namespace, text) for text in texts]
+        existing = self.index.has_keys(keys)
+        new = [(key, text) for key, text in zip(keys, texts) if text.strip() and key not in existing]
+        if not new:
+            return 0
+        vectors = self.embedder([text for _, text in new])
+        return self.index.add(vectors, namespace, kind, texts=[text for _, text in new],
+                              keys=[key for key, _ in new], metadata=[metadata or {}] * len(new))
+
+    def add_document(self, namespace: str, text: str, kind: str = "document", metadata: dict | None = None,
+                     chunk_chars: int = 1500) -> int:
+        """Split a document into chunks of paragraphs, and embed and store the chunks."""
+        chunks = [""]
+        for paragraph in re.split(r"\n\s*\n", text):
+            if chunks[-1] and len(chunks[-1]) + len(paragraph) > chunk_chars:
+                chunks.append("")
+            chunks[-1] = f"{chunks[-1]}\n\n{paragraph}" if chunks[-1] else paragraph
+        return self.add(namespace, [chunk.strip() for chunk in chunks], kind=kind, metadata=metadata)
+
+    def search(self, query: str, top_k: int = 5, namespaces: list[str] | None = None) -> list[VectorMatch]:
+        """Recall the stored texts most similar to the query."""
+        if not query.strip() or not self.index.size:
+            return []
+        vector = self.embedder([query])[0]
+        return self.index.search(vector, top_k=top_k, namespaces=namespaces, min_score=self.min_score)
+
+    async def aadd(self, namespace: str, texts: list[str], kind: str = "message", metadata: dict | None = None,
+                   keys: list[str] | None = None) -> int:
+        return await asyncio.to_thread(self.add, namespace, texts, kind, metadata, keys)
+
+    async def asearch(self, query: str, top_k: int = 5, namespaces: list[str] | None = None) -> list[VectorMatch]:
+        return await asyncio.to_thread(self.search, query, top_k, namespaces)
+
+    def schedule_add(self, namespace: str, texts: list[str], kind: str = "message",
+                     metadata: dict | None = None) -> asyncio.Task:
+        """Embed and store the texts in the background, without blocking the current turn."""
+        task = asyncio.create_task(self._run_add(namespace, texts, kind, metadata))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _run_add(self, namespace: str, texts: list[str], kind: str, metadata: dict | None) -> None:
+        try:
+            await self.aadd(namespace, texts, kind, metadata)
+        except Exception as e:
+            logger.exception(f"Failed to add texts to the vector memory namespace '{namespace}'", exc_info=e)
+
+    def stats(self) -> dict:
+        return {**self.index.stats(), "pending": len(self._pending)}
+
+
+_vector_memory: VectorMemory | None = None
+_vector_memory_lock = threading.Lock()
+
+
+def get_vector_memory() -> VectorMemory | None:
+    """The shared vector memory, or None if the vector memory is disabled or numpy is not installed."""
+    global _vector_memory
+    if not config.VECTOR_MEMORY_ENABLED:
+        return None
+    if _vector_memory is None:
+        with _vector_memory_lock:
+            if _vector_memory is None:
+                try:
+                    import numpy
+                except ImportError:
+                    logger.warning("Vector memory is enabled, but the numpy package is not installed "
+                                   "(pip install geenii[vector])")
+                    return None
+                # one index per embedding model, the vectors of different models are not comparable
+                index_dir = Path(config.VECTOR_MEMORY_DIR) / re.sub(r"[^\w.-]+", "_",
+                                                                    config.VECTOR_MEMORY_EMBEDDING_MODEL)
+                _vector_memory = VectorMemory(ModelEmbedder(config.VECTOR_MEMORY_EMBEDDING_MODEL),
+                                              VectorIndex(index_dir, nprobe=config.VECTOR_MEMORY_NPROBE),
+                                              min_score=config.VECTOR_MEMORY_MIN_SCORE)
+    return _vector_memory
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 import dotenv
@@ -8,12 +9,15 @@ from rich.logging import RichHandler
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
+from geenii import config
+from geenii.ai import ai_log_sink, model_warmup, provider_registry
 from geenii.apps import AppRegistry
 from geenii.chat.chat_server_ctx import ChatServerState
 from geenii.config import APP_VERSION, DATA_DIR
 from geenii.core.tasks import *  # important! register any built-in tasks
 from geenii.datamodels import Problem
-from geenii.scheduler import Scheduler
+from geenii.mcp_session import mcp_sessions
+from geenii.scheduler import Scheduler, ScheduledTask
 # from geenii.server.middleware.proxy_middleware import ProxyMiddleware
 # from geenii.server.middleware.request_logger_middleware import RequestLoggerMiddleware
 from geenii.server.router import app_router
@@ -46,8 +50,9 @@ async def initialize_tool_registry():
     print("Initializing tool registry...")
     registry = ToolRegistry()
     init_builtin_tools(registry)
-    await init_mcp_server_tools(registry)
-    return registry
+    # MCP servers which are slow to start are registered in the background
+    discovery_tasks = await init_mcp_server_tools(registry)
+    return registry, discovery_tasks
 
 
 async def initialize_supervisor():
@@ -88,6 +93,21 @@ async def initialize_scheduler(supervisor: Supervisor):
     return scheduler
 
 
+async def initialize_model_warmup(scheduler: Scheduler):
+    print(f"Warming up models: {model_warmup.models}")
+    # preload the models in the background, the server does not wait for the model loads
+    warmup_task = asyncio.create_task(model_warmup.warm_up())
+
+    if model_warmup.models and config.WARMUP_KEEP_ALIVE_CRON:
+        await scheduler.add_task(ScheduledTask(
+            name="model_keep_alive",
+            cron=config.WARMUP_KEEP_ALIVE_CRON,
+            module="",
+            run_fn=model_warmup.keep_alive_task,
+        ))
+    return warmup_task
+
+
 async def initialize_app_registry():
     print("Initializing apps...")
     apps = AppRegistry()
@@ -108,7 +128,7 @@ async def initialize_skill_registry():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Tool Registry
-    app.state.tool_registry = await initialize_tool_registry()
+    app.state.tool_registry, app.state.mcp_discovery_tasks = await initialize_tool_registry()
     # Skill Registry
     app.state.skill_registry = await initialize_skill_registry()
     # Apps
@@ -117,6 +137,8 @@ async def lifespan(app: FastAPI):
     app.state.supervisor = await initialize_supervisor()
     # Scheduler
     app.state.scheduler = await initialize_scheduler(app.state.supervisor)
+    # Model warm-up
+    app.state.model_warmup_task = await initialize_model_warmup(app.state.scheduler)
     # Redis
     # task = asyncio.create_task(redis_pubsub_listener(redis_listener_stop_event))
     # Chat Server
@@ -126,8 +148,17 @@ async def lifespan(app: FastAPI):
         yield
     finally:
         await app.state.chat_server.stop()
+        app.state.model_warmup_task.cancel()
         await app.state.scheduler.stop()
         await app.state.supervisor.stop()
+        # stop the background MCP discovery, and close the persistent MCP server sessions
+        for task in app.state.mcp_discovery_tasks:
+            task.cancel()
+        await mcp_sessions.close()
+        # write the pending AI request/usage log records
+        ai_log_sink.flush()
+        # close the pooled AI providers and their HTTP connection pools
+        provider_registry.close()
         # cleanup tool registry if needed
         if app.state.tool_registry:
             del app.state.tool_registry
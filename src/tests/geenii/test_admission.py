@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+import pydantic
+import pytest
+
+from geenii.admission import AdmissionController, AdmissionTimeoutError, Priority, PriorityLimiter, request_priority, \
+    current_priority
+from geenii.datamodels import ChatCompletionRequest, EmbeddingRequest
+
+
+def test_limiter_admits_queued_requests_by_priority():
+    limiter = PriorityLimiter("test", limit=1)
+    limiter.acquire(Priority.INTERACTIVE)
+    order = []
+
+    def worker(priority: Priority):
+        limiter.acquire(priority, timeout=5)
+        order.append(priority)
+        limiter.release()
+
+    threads = []
+    for priority in (Priority.SCHEDULED, Priority.AGENT, Priority.INTERACTIVE):
+        t = threading.Thread(target=worker, args=(priority,))
+        t.start()
+        threads.append(t)
+        time.sleep(0.05)
+
+    assert limiter.stats()["queue_depth"] == 3
+    limiter.release()
+    for t in threads:
+        t.join()
+
+    assert order == [Priority.INTERACTIVE, Priority.AGENT, Priority.SCHEDULED]
+    assert limiter.stats()["active"] == 0
+
+
+def test_limiter_queue_timeout():
+    limiter = PriorityLimiter("test", limit=1)
+    limiter.acquire(Priority.INTERACTIVE)
+    with pytest.raises(AdmissionTimeoutError):
+        limiter.acquire(Priority.SCHEDULED, timeout=0.05)
+    stats = limiter.stats()
+    assert stats["timeouts"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_reserved_interactive_slots():
+    limiter = PriorityLimiter("test", limit=2, reserved_interactive=1)
+    limiter.acquire(Priority.SCHEDULED)
+    with pytest.raises(AdmissionTimeoutError):
+        limiter.acquire(Priority.AGENT, timeout=0.05)
+    limiter.acquire(Priority.INTERACTIVE, timeout=0.05)
+    assert limiter.stats()["active"] == 2
+
+
+def test_controller_async_admission():
+    controller = AdmissionController({"ollama": 1})
+    active = []
+    max_active = []
+
+    async def request():
+        async with controller.aadmit("ollama", "qwen3:8b", "interactive"):
+            active.append(1)
+            max_active.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def main():
+        await asyncio.gather(*[request() for _ in range(5)])
+
+    asyncio.run(main())
+    assert max(max_active) == 1
+    assert controller.stats()["ollama"]["admitted"] == 5
+
+
+def test_request_priority_context():
+    assert current_priority() == Priority.AGENT
+    with request_priority("scheduled"):
+        assert current_priority() == Priority.SCHEDULED
+        assert current_priority("interactive") == Priority.INTERACTIVE
+    assert current_priority() == Priority.AGENT
+
+
+def test_request_priority_is_validated():
+    assert ChatCompletionRequest(prompt="hi", priority="scheduled").priority == "scheduled"
+    with pytest.raises(pydantic.ValidationError):
+        ChatCompletionRequest(prompt="hi", priority="urgent")
+    with pytest.raises(pydantic.ValidationError):
+        EmbeddingRequest(input="hi", priority="urgent")
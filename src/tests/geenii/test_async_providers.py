@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import ollama
+import pytest
+
+from geenii import config
+from geenii.chat.chat_models import TextContent
+from geenii.datamodels import ChatCompletionRequest, ChatCompletionResponse
+from geenii.provider.interfaces import AIChatCompletionProvider, AsyncAIChatCompletionProvider
+from geenii.provider.ollama.hosts import OllamaHost, OllamaHostPool
+from geenii.provider.ollama.provider import OllamaAIProvider
+from geenii.provider.openai.provider import OpenAIProvider
+
+
+def _no_sync_client(self):
+    raise AssertionError("the sync client was used")
+
+
+class FakeOllamaAsyncClient:
+    def __init__(self) -> None:
+        self.calls = []
+
+    async def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        return ollama.ChatResponse(model=kwargs["model"], done=True, done_reason="stop",
+                                   message=ollama.Message(role="assistant", content="hello"),
+                                   prompt_eval_count=5, eval_count=2, load_duration=1_000_000,
+                                   prompt_eval_duration=2_000_000, eval_duration=3_000_000,
+                                   total_duration=6_000_000)
+
+
+class FakeOpenAIResponses:
+    def __init__(self) -> None:
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        text = SimpleNamespace(type="output_text", text="hello")
+        return SimpleNamespace(
+            output=[SimpleNamespace(type="message", content=[text])],
+            output_text="hello",
+            usage=SimpleNamespace(input_tokens=5, output_tokens=2, total_tokens=7,
+                                  input_tokens_details=SimpleNamespace(cached_tokens=3)),
+            model_dump=lambda: {},
+        )
+
+
+def test_ollama_provider_awaits_the_async_client(monkeypatch):
+    client = FakeOllamaAsyncClient()
+    monkeypatch.setattr(OllamaHost, "async_client", property(lambda self: client))
+    monkeypatch.setattr(OllamaHost, "client", property(_no_sync_client))
+    provider = OllamaAIProvider()
+    provider._hosts = OllamaHostPool(["http://ollama-1:11434"])
+
+    response = asyncio.run(provider.agenerate_chat_completion(
+        ChatCompletionRequest(model="ollama:llama3", prompt="hi", messages=[])))
+    assert [part.text for part in response.output] == ["hello"]
+    assert client.calls[0]["model"] == "llama3"
+    assert client.calls[0]["stream"] is False
+    assert client.calls[0]["messages"][-1] == {"role": "user", "content": "hi"}
+    # the host serves the model now
+    assert provider.hosts.hosts[0].has_model("llama3")
+    provider.close()
+
+
+def test_openai_provider_awaits_the_async_client(monkeypatch):
+    responses = FakeOpenAIResponses()
+    monkeypatch.setattr(OpenAIProvider, "async_client", property(lambda self: SimpleNamespace(responses=responses)))
+    monkeypatch.setattr(OpenAIProvider, "client", property(_no_sync_client))
+    provider = OpenAIProvider()
+
+    response = asyncio.run(provider.agenerate_chat_completion(
+        ChatCompletionRequest(model="openai:gpt-4o-mini", prompt="hi", messages=[])))
+    assert [part.text for part in response.output] == ["hello"]
+    assert response.usage["cached_tokens"] == 3
+    assert responses.calls[0]["model"] == "gpt-4o-mini"
+    assert responses.calls[0]["stream"] is False
+
+
+class FakeProvider(AIChatCompletionProvider):
+    threads = []
+
+    def generate_chat_completion(self, request, tool_registry=None):
+        self.threads.append(("sync", threading.get_ident()))
+        return ChatCompletionResponse(id="r", timestamp=0, prompt=request.prompt, model_result={},
+                                      output=[TextContent(text="sync")])
+
+
+class FakeAsyncProvider(FakeProvider, AsyncAIChatCompletionProvider):
+    async def agenerate_chat_completion(self, request, tool_registry=None):
+        self.threads.append(("async", threading.get_ident()))
+        return ChatCompletionResponse(id="r", timestamp=0, prompt=request.prompt, model_result={},
+                                      output=[TextContent(text="async")])
+
+
+@pytest.fixture
+def fake_providers(monkeypatch):
+    from geenii.ai import provider_registry
+
+    monkeypatch.setattr(config, "COMPLETION_CACHE_ENABLED", False)
+    FakeProvider.threads = []
+    provider_registry.register("fakesync", FakeProvider)
+    provider_registry.register("fakeasync", FakeAsyncProvider)
+    yield
+    for name in ("fakesync", "fakeasync"):
+        provider_registry.invalidate(name)
+        provider_registry._factories.pop(name, None)
+
+
+def test_agenerate_awaits_async_providers_on_the_event_loop(fake_providers):
+    from geenii.ai import agenerate_chat_completion
+
+    async def run():
+        loop_thread = threading.get_ident()
+        async_response = await agenerate_chat_completion(ChatCompletionRequest(model="fakeasync:m", prompt="hi"))
+        sync_response = await agenerate_chat_completion(ChatCompletionRequest(model="fakesync:m", prompt="hi"))
+        return loop_thread, async_response, sync_response
+
+    loop_thread, async_response, sync_response = asyncio.run(run())
+    assert async_response.output[0].text == "async"
+    assert sync_response.output[0].text == "sync"
+    threads = dict(FakeProvider.threads)
+    # async providers run on the event loop, sync-only providers in a worker thread
+    assert threads["async"] == loop_thread
+    assert threads["sync"] != loop_thread
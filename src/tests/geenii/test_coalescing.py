@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from geenii import config
+from geenii.chat.chat_models import TextContent
+from geenii.datamodels import ChatCompletionRequest, ChatCompletionResponse
+from geenii.provider.interfaces import AIChatCompletionProvider, AsyncAIChatCompletionProvider
+from geenii.tool.registry import ToolRegistry, PythonTool
+
+
+class SlowProvider(AIChatCompletionProvider, AsyncAIChatCompletionProvider):
+    responses = []
+
+    def generate_chat_completion(self, request, tool_registry=None):
+        raise NotImplementedError
+
+    async def agenerate_chat_completion(self, request, tool_registry=None):
+        await asyncio.sleep(0.05)
+        response = ChatCompletionResponse(id="r", timestamp=0, prompt=request.prompt, model_result={},
+                                          output=[TextContent(text="hello")],
+                                          usage={"input_tokens": 10, "prompt_eval_count": 10})
+        self.responses.append(response)
+        return response
+
+
+@pytest.fixture
+def slow_provider(monkeypatch):
+    from geenii.ai import provider_registry
+
+    monkeypatch.setattr(config, "COMPLETION_COALESCING_ENABLED", True)
+    monkeypatch.setattr(config, "COMPLETION_CACHE_ENABLED", False)
+    SlowProvider.responses = []
+    provider_registry.register("slow", SlowProvider)
+    yield
+    provider_registry.invalidate("slow")
+    provider_registry._factories.pop("slow", None)
+
+
+def _request(context_id: str) -> ChatCompletionRequest:
+    return ChatCompletionRequest(model="slow:model", prompt="hi", context_id=context_id, temperature=0.0)
+
+
+def test_coalesced_callers_finalize_their_own_copies(slow_provider):
+    from geenii.ai import agenerate_chat_completion
+
+    async def run():
+        return await asyncio.gather(*(agenerate_chat_completion(_request(f"ctx-{i}")) for i in range(3)))
+
+    responses = asyncio.run(run())
+    assert len(SlowProvider.responses) == 1
+    assert sorted(r.context_id for r in responses) == ["ctx-0", "ctx-1", "ctx-2"]
+    assert [bool(r.usage.get("coalesced")) for r in responses].count(True) == 2
+    assert len({id(r) for r in responses} | {id(SlowProvider.responses[0])}) == 4
+    # the shared response of the call is not finalized by any caller
+    shared = SlowProvider.responses[0]
+    assert shared.context_id is None
+    assert "prefix_tokens" not in shared.usage and "cached_tokens" not in shared.usage
+
+
+def test_calls_with_different_tool_registries_are_not_coalesced(slow_provider):
+    from geenii.ai import agenerate_chat_completion
+
+    registries = [ToolRegistry(), ToolRegistry()]
+    for registry in registries:
+        registry.register(PythonTool("clock", handler=lambda: "now"))
+
+    async def run():
+        return await asyncio.gather(*(agenerate_chat_completion(_request(f"ctx-{i}"), tool_registry=registry)
+                                      for i, registry in enumerate(registries)))
+
+    asyncio.run(run())
+    assert len(SlowProvider.responses) == 2
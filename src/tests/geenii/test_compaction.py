@@ -0,0 +1,193 @@
+import asyncio
+import gzip
+import json
+import threading
+
+from geenii.chat.chat_models import TextContent
+from geenii.compaction import MemoryCompactor, SUMMARY_PREFIX
+from geenii.context import ContextBuilder
+from geenii.datamodels import ModelMessage
+from geenii.memory import FileChatMemory, ShortTermChatMemory, chat_memories
+
+
+def _message(role: str, text: str) -> ModelMessage:
+    return ModelMessage(role=role, content=[TextContent(text=text)])
+
+
+def _conversation(count: int, size: int = 350) -> list[ModelMessage]:
+    return [_message("user" if i % 2 == 0 else "assistant", f"{i} " + "x" * size) for i in range(count)]
+
+
+class StubCompactor(MemoryCompactor):
+    """Compactor with a stubbed summary model, which records the summarized chunks."""
+
+    def __init__(self, *args, on_summarize=None, **kwargs) -> None:
+        super().__init__("test:summary", *args, **kwargs)
+        self.chunks: list[list[ModelMessage]] = []
+        self.on_summarize = on_summarize
+
+    async def _summarize(self, messages, previous_summary):
+        self.chunks.append(messages)
+        if self.on_summarize:
+            self.on_summarize()
+        return f"summary {len(self.chunks)} (previous: {previous_summary})"
+
+
+class TailOnlyMemory(ShortTermChatMemory):
+    """Memory which fails if the whole history is loaded, instead of reading the tail."""
+
+    def __init__(self, messages: list[ModelMessage]) -> None:
+        super().__init__()
+        self._messages = list(messages)
+        self.tail_reads = []
+
+    @property
+    def messages(self):
+        raise AssertionError("the whole history was loaded")
+
+    def tail(self, n: int, pinned: bool = True) -> list[ModelMessage]:
+        self.tail_reads.append(n)
+        return self._messages[-n:] if n > 0 else []
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+
+def test_needs_compaction_reads_the_tail():
+    builder = ContextBuilder(reserved_output_tokens=0)
+    memory = TailOnlyMemory(_conversation(500))
+
+    assert StubCompactor(threshold_tokens=1000, keep_tokens=200, builder=builder).needs_compaction(memory)
+    # only the most recent messages were read to exceed the threshold
+    assert memory.tail_reads == [16]
+
+    short = TailOnlyMemory(_conversation(3))
+    assert not StubCompactor(threshold_tokens=1000, keep_tokens=200, builder=builder).needs_compaction(short)
+    # compaction is disabled with a threshold of 0
+    assert not StubCompactor(threshold_tokens=0, keep_tokens=200, builder=builder).needs_compaction(memory)
+
+
+def test_compact_summarizes_and_archives_older_messages(tmp_path):
+    builder = ContextBuilder(reserved_output_tokens=0)
+    memory = FileChatMemory(str(tmp_path / "chat.jsonl"))
+    messages = _conversation(20)
+    for message in messages:
+        memory.append(message)
+
+    compactor = StubCompactor(threshold_tokens=1000, keep_tokens=1000, builder=builder)
+    summary = asyncio.run(compactor.compact(memory))
+
+    archived = [m for chunk in compactor.chunks for m in chunk]
+    kept = messages[len(archived):]
+    assert archived and kept
+    assert [m.id for m in archived] == [m.id for m in messages[:len(archived)]]
+
+    reopened = FileChatMemory(str(tmp_path / "chat.jsonl"))
+    assert reopened.messages[0].type == "summary"
+    assert reopened.messages[0].to_text() == summary.to_text()
+    assert summary.to_text().startswith(SUMMARY_PREFIX)
+    assert [m.id for m in reopened.messages[1:]] == [m.id for m in kept]
+
+    with gzip.open(memory.archive_path, "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == [m.id for m in archived]
+    assert compactor.stats()["archived_messages"] == len(archived)
+
+
+def test_compact_merges_the_previous_summary(tmp_path):
+    builder = ContextBuilder(reserved_output_tokens=0)
+    memory = FileChatMemory(str(tmp_path / "chat.jsonl"))
+    for message in _conversation(20):
+        memory.append(message)
+    compactor = StubCompactor(threshold_tokens=1000, keep_tokens=1000, builder=builder)
+    asyncio.run(compactor.compact(memory))
+    for message in _conversation(20):
+        memory.append(message)
+
+    summary = asyncio.run(compactor.compact(memory))
+    assert "(previous: summary 1" in summary.to_text()
+    assert [m.type for m in memory.messages].count("summary") == 1
+
+
+def test_compact_keeps_messages_appended_during_compaction(tmp_path):
+    builder = ContextBuilder(reserved_output_tokens=0)
+    memory = FileChatMemory(str(tmp_path / "chat.jsonl"))
+    for message in _conversation(20):
+        memory.append(message)
+    late = _message("user", "appended while summarizing")
+
+    compactor = StubCompactor(threshold_tokens=1000, keep_tokens=1000, builder=builder,
+                              on_summarize=lambda: memory.append(late))
+    asyncio.run(compactor.compact(memory))
+
+    assert memory.messages[-1].id == late.id
+    assert FileChatMemory(str(tmp_path / "chat.jsonl")).messages[-1].id == late.id
+
+
+def test_chunks_fit_the_summary_model_budget():
+    builder = ContextBuilder(default_budget=8192, model_budgets={"test:summary": 1000}, reserved_output_tokens=0)
+    compactor = StubCompactor(threshold_tokens=1000, keep_tokens=200, builder=builder)
+    messages = _conversation(20)
+
+    chunks = compactor._chunks(messages, None)
+    assert len(chunks) > 1
+    assert [m.id for chunk in chunks for m in chunk] == [m.id for m in messages]
+    budget = builder.budget("test:summary")
+    assert all(sum(builder.count_messages("test:summary", chunk)) <= budget for chunk in chunks)
+
+
+def test_schedule_compacts_in_the_background(tmp_path):
+    builder = ContextBuilder(reserved_output_tokens=0)
+    memory = FileChatMemory(str(tmp_path / "chat.jsonl"))
+    for message in _conversation(20):
+        memory.append(message)
+
+    async def run():
+        disabled = StubCompactor(threshold_tokens=0, keep_tokens=1000, builder=builder)
+        assert disabled.schedule("ctx", memory) is None
+
+        compactor = StubCompactor(threshold_tokens=1000, keep_tokens=1000, builder=builder)
+        task = compactor.schedule("ctx", memory)
+        # at most one compaction per context
+        assert compactor.schedule("ctx", memory) is None
+        await task
+        return compactor
+
+    compactor = asyncio.run(run())
+    assert compactor.stats() == {"compactions": 1, "failures": 0, "archived_messages": len(compactor.chunks[0]),
+                                 "running": 0}
+    assert memory.messages[0].type == "summary"
+
+
+class ThreadRecordingMemory(FileChatMemory):
+    """Memory which records the threads of the reads and of the compaction, and if the context lock was held."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    @property
+    def messages(self):
+        self.calls.append(("read", threading.get_ident(), None))
+        return super().messages
+
+    def compact(self, summary, archived):
+        self.calls.append(("compact", threading.get_ident(), chat_memories.lock("ctx").locked()))
+        return super().compact(summary, archived)
+
+
+def test_compact_runs_the_memory_io_in_a_thread(tmp_path):
+    builder = ContextBuilder(reserved_output_tokens=0)
+    memory = ThreadRecordingMemory(str(tmp_path / "chat.jsonl"))
+    for message in _conversation(20):
+        memory.append(message)
+    compactor = StubCompactor(threshold_tokens=1000, keep_tokens=1000, builder=builder)
+
+    async def run():
+        await compactor.compact(memory, context_id="ctx")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert [call[0] for call in memory.calls][-1] == "compact"
+    assert all(thread != loop_thread for _, thread, _ in memory.calls)
+    # the memory is rewritten while holding the lock of the context
+    assert memory.calls[-1][2] is True
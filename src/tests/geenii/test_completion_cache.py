@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+from geenii.chat.chat_models import TextContent
+from geenii.completion_cache import CompletionCache, request_cache_key
+from geenii.datamodels import ChatCompletionRequest, ChatCompletionResponse, ModelMessage
+from geenii.utils.cached import SqliteCacheStore
+
+
+def _request(**kwargs) -> ChatCompletionRequest:
+    return ChatCompletionRequest(**{"model": "ollama:llama3", "prompt": "hi", "temperature": 0.0, **kwargs})
+
+
+def _response(**kwargs) -> ChatCompletionResponse:
+    return ChatCompletionResponse(**{"id": "r1", "timestamp": 1, "model": "ollama:llama3", "prompt": "hi",
+                                     "output": [TextContent(text="hello")], "context_id": "ctx", "model_result": {},
+                                     **kwargs})
+
+
+class ThreadRecordingStore:
+    """In-memory store which records the threads of its calls."""
+
+    def __init__(self) -> None:
+        self.data = {}
+        self.threads = []
+
+    def read_cache(self, key):
+        self.threads.append(threading.get_ident())
+        return self.data.get(key)
+
+    def write_cache(self, key, value, ttl=None):
+        self.threads.append(threading.get_ident())
+        self.data[key] = value
+
+
+def test_request_cache_key_ignores_per_request_fields():
+    message = ModelMessage(role="user", content=[TextContent(text="earlier")])
+    copy = message.model_copy(update={"id": "other", "timestamp": 0})
+    assert (request_cache_key(_request(messages=[message], context_id="a", priority="interactive"))
+            == request_cache_key(_request(messages=[copy], context_id="b")))
+    assert request_cache_key(_request()) != request_cache_key(_request(prompt="hello"))
+
+
+def test_put_and_get(tmp_path):
+    cache = CompletionCache(store=SqliteCacheStore(str(tmp_path / "cache.sqlite")), ttl=60, enabled=True)
+    request = _request()
+    assert cache.get(request) is None
+
+    response = _response()
+    cache.put(request, response)
+    assert response.usage["cache"] == "miss"
+
+    cached = cache.get(_request(context_id="other"))
+    assert cached.usage["cache"] == "hit"
+    assert cached.id != response.id
+    assert cached.context_id is None
+    assert cached.output == response.output
+    assert cache.stats()["hit"] == 1 and cache.stats()["miss"] == 1
+
+
+def test_bypass_non_deterministic_and_error_responses(tmp_path):
+    cache = CompletionCache(store=SqliteCacheStore(str(tmp_path / "cache.sqlite")), ttl=60, enabled=True)
+
+    for request, response in ((_request(temperature=0.7), _response()),
+                              (_request(cache=False), _response()),
+                              (_request(), _response(error="failed"))):
+        cache.put(request, response)
+        assert response.usage["cache"] == "bypass"
+        assert cache.get(request) is None
+    # non-deterministic requests can opt in
+    request = _request(temperature=0.7, cache=True)
+    cache.put(request, _response())
+    assert cache.get(request) is not None
+
+
+def test_async_access_runs_the_store_io_in_a_thread():
+    store = ThreadRecordingStore()
+    cache = CompletionCache(store=store, ttl=60, enabled=True)
+    request = _request()
+
+    async def run():
+        assert await cache.aget(request) is None
+        response = _response()
+        await cache.aput(request, response)
+        assert response.usage["cache"] == "miss"
+        return await cache.aget(request)
+
+    cached = asyncio.run(run())
+    assert cached.usage["cache"] == "hit"
+    assert len(store.threads) == 3
+    assert threading.get_ident() not in store.threads
@@ -0,0 +1,74 @@
+from geenii.chat.chat_models import TextContent, ToolCallContent, ToolCallResultContent
+from geenii.context import ContextBuilder
+from geenii.datamodels import ChatCompletionRequest, ModelMessage
+from geenii.tokenizer import TokenCounter
+from geenii.tool.registry import PythonTool, ToolRegistry
+
+
+def _message(role: str, text: str) -> ModelMessage:
+    return ModelMessage(role=role, content=[TextContent(text=text)])
+
+
+def test_budget_by_longest_model_prefix():
+    builder = ContextBuilder(default_budget=8192, model_budgets={"ollama": 4096, "ollama:qwen3": 32768},
+                             reserved_output_tokens=1024)
+    assert builder.budget("ollama:llama3:8b") == 3072
+    assert builder.budget("ollama:qwen3:8b") == 31744
+    assert builder.budget("openai:gpt-4o") == 7168
+
+
+def test_build_keeps_recent_messages_within_budget():
+    builder = ContextBuilder(default_budget=1000, reserved_output_tokens=0)
+    messages = [_message("user" if i % 2 == 0 else "assistant", "x" * 350) for i in range(20)]
+    window = builder.build("test:model", messages, system=["You are a helpful assistant."], prompt="Hello")
+
+    assert window.tokens <= window.budget
+    assert window.messages == messages[-len(window.messages):]
+    assert window.dropped == messages[:len(messages) - len(window.messages)]
+
+
+def test_build_pins_system_messages_and_keeps_tool_results_with_their_call():
+    builder = ContextBuilder(default_budget=200, reserved_output_tokens=0)
+    summary = _message("system", "Summary of the conversation")
+    tool_call = ModelMessage(role="assistant", content=[ToolCallContent(name="search", arguments={}, call_id="1")])
+    tool_result = ModelMessage(role="tool", content=[
+        ToolCallResultContent(name="search", arguments={}, result="r" * 200, call_id="1")])
+    messages = [summary, _message("user", "x" * 1000), tool_call, tool_result]
+
+    window = builder.build("test:model", messages)
+    assert window.messages[0] is summary
+    assert window.messages[1:] == [tool_call, tool_result]
+
+
+def test_tool_definitions_count_against_the_budget(tmp_path):
+    builder = ContextBuilder(default_budget=1000, reserved_output_tokens=0, counter=TokenCounter(str(tmp_path)))
+    registry = ToolRegistry()
+    for name in ("web_search", "calculator"):
+        registry.register(PythonTool(name, description=f"The {name} tool " + "y" * 800, handler=lambda: name))
+    messages = [_message("user" if i % 2 == 0 else "assistant", "x" * 350) for i in range(20)]
+
+    without_tools = builder.fit(ChatCompletionRequest(model="test:model", prompt="Hello", messages=messages))
+    request = ChatCompletionRequest(model="test:model", prompt="Hello", messages=messages,
+                                    tools={"web_search", "calculator"})
+    tool_tokens = builder.count_tools("test:model", request.tools, registry)
+    window = builder.fit(request, tool_registry=registry)
+
+    assert tool_tokens > 0
+    assert len(window.messages) < len(without_tools.messages)
+    assert window.tokens <= window.budget == 1000
+    assert builder.count_request(request, registry) == window.tokens
+
+
+def test_calibrate_counts_the_tool_definitions(tmp_path):
+    builder = ContextBuilder(reserved_output_tokens=0, counter=TokenCounter(str(tmp_path)))
+    registry = ToolRegistry()
+    registry.register(PythonTool("web_search", description="y" * 2000, handler=lambda: "r"))
+    request = ChatCompletionRequest(model="test:model", prompt="Hello", tools={"web_search"})
+    input_tokens = builder.count_request(request, registry)
+
+    # the tool definitions can not be counted without the registry
+    builder.calibrate(request, {"input_tokens": input_tokens})
+    assert builder.counter.stats()["calibration"] == {}
+
+    builder.calibrate(request, {"input_tokens": input_tokens}, registry)
+    assert builder.counter.stats()["calibration"] == {"test:model": 1.0}
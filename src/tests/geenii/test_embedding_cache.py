@@ -0,0 +1,49 @@
+import pytest
+
+from geenii.embedding_cache import EmbeddingCache
+
+
+def test_cache_roundtrip_by_model_and_text(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), dtype="float32")
+    cache.put_many("ollama:nomic-embed-text", {"hello": [0.1, 0.2, 0.3], "world": [1.0, 0.0, -1.0]})
+
+    found = cache.get_many("ollama:nomic-embed-text", ["hello", "world", "missing"])
+    assert found["hello"] == pytest.approx([0.1, 0.2, 0.3])
+    assert found["world"] == [1.0, 0.0, -1.0]
+    assert "missing" not in found
+    assert cache.get_many("openai:text-embedding-3-small", ["hello"]) == {}
+
+    # a new cache instance reads the vectors from disk
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), dtype="float16", memory_entries=0)
+    assert cache.get_many("ollama:nomic-embed-text", ["hello"])["hello"] == pytest.approx([0.1, 0.2, 0.3])
+
+
+def test_float16_storage_and_eviction(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), dtype="float16", max_entries=10, memory_entries=0)
+    cache.put_many("model", {f"text {i}": [i / 100, 0.5] for i in range(10)})
+    vector = cache.get_many("model", ["text 3"])["text 3"]
+    assert vector == pytest.approx([0.03, 0.5], abs=1e-3)
+
+    cache.put_many("model", {f"new {i}": [0.0, 1.0] for i in range(5)})
+    stats = cache.stats()
+    assert stats["evicted"] >= 5
+    # the recently read vector is kept
+    assert "text 3" in cache.get_many("model", ["text 3"])
+
+
+def test_put_many_returns_the_stored_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), dtype="float16", memory_entries=0)
+    stored = cache.put_many("model", {"hello": [0.1234567, -0.7654321]})
+    # a cache miss returns the same vector as later cache hits
+    assert stored["hello"] == cache.get_many("model", ["hello"])["hello"]
+    assert stored["hello"] != [0.1234567, -0.7654321]
+
+
+def test_vectors_out_of_float16_range_are_stored_as_float32(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), dtype="float16", memory_entries=0)
+    stored = cache.put_many("model", {"large": [70000.0, 0.5], "huge": [1e39, 0.5]})
+    assert stored["large"] == [70000.0, 0.5]
+    assert cache.get_many("model", ["large"])["large"] == [70000.0, 0.5]
+    # vectors out of float32 range are not cached
+    assert stored["huge"] == [1e39, 0.5]
+    assert "huge" not in cache.get_many("model", ["huge"])
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from geenii.datamodels import ChatCompletionRequest, ChatCompletionResponse, ChatCompletionChunk
+from geenii.fanout import FanOutDispatcher
+
+# simulated time to first token and error per model
+MODELS = {
+    "fast:model": (0.01, None),
+    "slow:model": (0.5, None),
+    "broken:model": (0.01, "provider unavailable"),
+}
+
+
+def _response(model: str, error: str | None = None) -> ChatCompletionResponse:
+    return ChatCompletionResponse(id=model, timestamp=int(time.time()), model=model, prompt="", error=error)
+
+
+async def _generate(request: ChatCompletionRequest, tool_registry=None) -> ChatCompletionResponse:
+    delay, error = MODELS[request.model]
+    await asyncio.sleep(delay)
+    return _response(request.model, error)
+
+
+async def _stream(request: ChatCompletionRequest, tool_registry=None):
+    delay, error = MODELS[request.model]
+    await asyncio.sleep(delay)
+    if error:
+        raise RuntimeError(error)
+    yield ChatCompletionChunk(id=request.model, done=True, response=_response(request.model))
+
+
+def _dispatcher() -> FanOutDispatcher:
+    return FanOutDispatcher(hedge_delay_ms=50, timeout=5, generate=_generate, stream=_stream)
+
+
+def test_all_results_in_model_order():
+    result = asyncio.run(_dispatcher().run(ChatCompletionRequest(prompt="hi"),
+                                           ["slow:model", "broken:model", "fast:model"], mode="all"))
+    assert [r.model for r in result.responses] == ["slow:model", "fast:model"]
+    assert result.errors == {"broken:model": "provider unavailable"}
+    assert set(result.latencies_ms) == {"slow:model", "broken:model", "fast:model"}
+
+
+def test_first_success_cancels_the_other_requests():
+    start = time.monotonic()
+    result = asyncio.run(_dispatcher().run(ChatCompletionRequest(prompt="hi"),
+                                           ["broken:model", "slow:model", "fast:model"], mode="first"))
+    assert result.model == "fast:model"
+    assert result.errors["slow:model"] == "cancelled"
+    assert time.monotonic() - start < 0.4
+
+
+def test_hedged_request_starts_the_next_model_after_the_delay():
+    dispatcher = _dispatcher()
+    result = asyncio.run(dispatcher.run(ChatCompletionRequest(prompt="hi"),
+                                        ["slow:model", "fast:model"], mode="hedged"))
+    assert result.started == ["slow:model", "fast:model"]
+    assert result.model == "fast:model"
+    assert dispatcher.stats()["hedges"] == 1
+
+    # the preferred model answers within the hedge delay, no hedge is started
+    result = asyncio.run(dispatcher.run(ChatCompletionRequest(prompt="hi"),
+                                        ["fast:model", "slow:model"], mode="hedged", hedge_delay_ms=200))
+    assert result.started == ["fast:model"]
+
+    # a failed model is replaced immediately
+    result = asyncio.run(dispatcher.run(ChatCompletionRequest(prompt="hi"),
+                                        ["broken:model", "fast:model"], mode="hedged", hedge_delay_ms=1000))
+    assert result.model == "fast:model"
+    assert result.latencies_ms["fast:model"] < 500
+
+
+def test_timeout():
+    result = asyncio.run(_dispatcher().run(ChatCompletionRequest(prompt="hi"), ["slow:model"], timeout=0.05))
+    assert result.responses == []
+    assert result.errors == {"slow:model": "timed out"}
+
+
+def test_timeout_after_partial_results():
+    result = asyncio.run(_dispatcher().run(ChatCompletionRequest(prompt="hi"), ["slow:model", "fast:model"],
+                                           mode="all", timeout=0.2))
+    assert [r.model for r in result.responses] == ["fast:model"]
+    assert result.errors == {"slow:model": "timed out"}
@@ -0,0 +1,13 @@
+import importlib
+
+import pytest
+
+
+@pytest.mark.parametrize("module", [
+    "geenii.ai",
+    "geenii.provider.ollama.provider",
+    "geenii.provider.openai.provider",
+    "geenii.fanout",
+])
+def test_import(module):
+    importlib.import_module(module)
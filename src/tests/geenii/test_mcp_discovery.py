@@ -0,0 +1,55 @@
+import asyncio
+
+from geenii import tools
+from geenii.tool.registry import ToolRegistry
+
+# simulated discovery time and tools per MCP server
+SERVERS = {
+    "fast": (0.01, [{"name": "search", "description": "Search the web"}]),
+    "slow": (0.3, [{"name": "fetch", "description": "Fetch a web page"}]),
+    "broken": (0.01, None),
+}
+
+
+def _setup(monkeypatch):
+    attempts = {}
+
+    async def read_tools(server_name, server_conf):
+        attempts[server_name] = attempts.get(server_name, 0) + 1
+        delay, server_tools = SERVERS[server_name]
+        await asyncio.sleep(delay)
+        if server_tools is None and attempts[server_name] < 2:
+            raise ConnectionError("server not started")
+        return server_tools or [{"name": "late", "description": "Up after boot"}]
+
+    monkeypatch.setattr(tools, "get_mcp_config", lambda: {"mcpServers": {name: {} for name in SERVERS}})
+    monkeypatch.setattr(tools, "read_mcp_server_tools", read_tools)
+    monkeypatch.setattr(tools.config, "MCP_DISCOVERY_RETRY_INTERVAL", 0.2)
+    return attempts
+
+
+def test_fast_servers_are_not_blocked_by_slow_servers(monkeypatch):
+    _setup(monkeypatch)
+
+    async def run():
+        registry = ToolRegistry()
+        pending = await tools.init_mcp_server_tools(registry, timeout=0.1)
+        assert registry.list_tool_names() == {"fast_search"}
+        assert len(pending) == 2
+
+        # the slow server and the restarted broken server are registered late
+        await asyncio.wait(pending, timeout=2)
+        assert registry.list_tool_names() == {"fast_search", "slow_fetch", "broken_late"}
+
+    asyncio.run(run())
+
+
+def test_discovery_without_background_registration(monkeypatch):
+    _setup(monkeypatch)
+
+    async def run():
+        registry = ToolRegistry()
+        assert await tools.init_mcp_server_tools(registry, timeout=0.1, background=False) == []
+        assert registry.list_tool_names() == {"fast_search"}
+
+    asyncio.run(run())
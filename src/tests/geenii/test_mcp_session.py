@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from geenii import mcp_session
+from geenii.mcp import McpClient
+from geenii.mcp_session import McpSessionManager, McpSessionError
+
+
+class FakeClient:
+    connects = 0
+    fail_connect = False
+
+    def __init__(self, server_name: str, server_config: dict):
+        self.connected = False
+
+    async def __aenter__(self):
+        if FakeClient.fail_connect:
+            raise ConnectionError("server not started")
+        FakeClient.connects += 1
+        self.connected = True
+        return self
+
+    async def __aexit__(self, *exc):
+        self.connected = False
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def ping(self):
+        return True
+
+    async def call_tool_mcp(self, name: str, arguments: dict):
+        await asyncio.sleep(0.01)
+        return {"tool": name, "arguments": arguments}
+
+    async def list_tools(self):
+        return []
+
+    async def list_resources(self):
+        return []
+
+    async def list_prompts(self):
+        return []
+
+
+def _manager(**kwargs) -> McpSessionManager:
+    FakeClient.connects = 0
+    FakeClient.fail_connect = False
+    return McpSessionManager(client_factory=FakeClient, health_check_interval=0, **kwargs)
+
+
+def test_tool_calls_share_one_session():
+    async def run():
+        manager = _manager(max_concurrency=2)
+        results = await asyncio.gather(*(manager.call_tool("search", "query", {"q": i}, server_config={"url": "x"})
+                                         for i in range(5)))
+        assert [r["arguments"]["q"] for r in results] == list(range(5))
+        assert FakeClient.connects == 1
+        assert manager.stats()["search"]["requests"] == 5
+
+        # a changed server configuration opens a new session
+        await manager.call_tool("search", "query", {}, server_config={"url": "y"})
+        assert FakeClient.connects == 2
+        await manager.close()
+        assert manager.stats() == {}
+
+    asyncio.run(run())
+
+
+def test_mcp_client_info_and_tool_calls_use_the_session(monkeypatch):
+    manager = _manager()
+    monkeypatch.setattr(mcp_session, "mcp_sessions", manager)
+
+    async def run():
+        client = McpClient("search", {"url": "http://localhost:8931/mcp"})
+        info = await client.get_info()
+        assert info == {"name": "search", "status": "connected", "tools": [], "resources": [], "prompts": []}
+        await client.call_tool("query", {"q": 1})
+        assert FakeClient.connects == 1
+        assert manager.stats()["search"]["requests"] == 2
+        await manager.close()
+
+    asyncio.run(run())
+
+
+def test_reconnect_backoff_and_idle_shutdown():
+    async def run():
+        manager = _manager(idle_timeout=0)
+        FakeClient.fail_connect = True
+        with pytest.raises(ConnectionError):
+            await manager.call_tool("search", "query", {}, server_config={"url": "x"})
+        # the next attempt waits for the backoff delay
+        with pytest.raises(McpSessionError):
+            await manager.call_tool("search", "query", {}, server_config={"url": "x"})
+
+        FakeClient.fail_connect = False
+        session = await manager.get("search", {"url": "x"})
+        session._retry_at = 0
+        await manager.call_tool("search", "query", {}, server_config={"url": "x"})
+        assert session.connected
+
+        await manager.maintain()
+        assert not session.connected
+        await manager.close()
+
+    asyncio.run(run())
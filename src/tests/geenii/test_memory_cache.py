@@ -0,0 +1,44 @@
+import asyncio
+
+from geenii.memory import ChatMemoryCache, ShortTermChatMemory
+
+
+def test_cache_returns_live_memory_and_evicts_lru():
+    opened = []
+
+    def factory(context_id):
+        opened.append(context_id)
+        return ShortTermChatMemory()
+
+    cache = ChatMemoryCache(factory, max_size=2)
+    memory = cache.get("a")
+    assert cache.get("a") is memory
+    cache.get("b")
+    cache.get("c")
+    assert cache.get("a") is not memory
+    assert opened == ["a", "b", "c", "a"]
+    assert cache.stats()["size"] == 2
+
+
+def test_cache_evicts_idle_memories():
+    cache = ChatMemoryCache(lambda context_id: ShortTermChatMemory(), idle_ttl=0)
+    memory = cache.get("a")
+    cache.get("b")
+    assert cache.get("a") is not memory
+
+
+def test_lock_serializes_turns_of_a_context():
+    cache = ChatMemoryCache(lambda context_id: ShortTermChatMemory())
+    events = []
+
+    async def turn(name):
+        async with cache.lock("a"):
+            events.append(f"{name}:start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name}:end")
+
+    async def main():
+        await asyncio.gather(turn("1"), turn("2"))
+
+    asyncio.run(main())
+    assert events == ["1:start", "1:end", "2:start", "2:end"]
@@ -0,0 +1,82 @@
+import os
+
+from geenii.chat.chat_models import TextContent
+from geenii.datamodels import ModelMessage
+from geenii.memory import FileChatMemory
+
+
+def _message(text: str, role: str = "user", type: str = "message") -> ModelMessage:
+    return ModelMessage(type=type, role=role, content=[TextContent(text=text)])
+
+
+def _memory(tmp_path) -> FileChatMemory:
+    return FileChatMemory(str(tmp_path / "memory.jsonl"))
+
+
+def test_tail_and_since_read_from_the_index(tmp_path):
+    memory = _memory(tmp_path)
+    messages = [_message(f"m{i}") for i in range(6)]
+    summary = _message("summary", role="system", type="summary")
+    for message in messages[:2] + [summary] + messages[2:]:
+        memory.append(message)
+
+    reopened = _memory(tmp_path)
+    assert len(reopened) == 7
+    assert reopened._messages is None  # nothing was loaded
+    assert [m.id for m in reopened.tail(2)] == [summary.id] + [m.id for m in messages[-2:]]
+    assert [m.id for m in reopened.tail(2, pinned=False)] == [m.id for m in messages[-2:]]
+    assert [m.id for m in reopened.since(messages[3].id)] == [m.id for m in messages[4:]]
+    assert len(reopened.since("unknown")) == 7
+
+
+def test_appends_of_other_instances_are_visible(tmp_path):
+    a = _memory(tmp_path)
+    a.append(_message("a1"))
+    assert len(a.messages) == 1
+
+    b = _memory(tmp_path)
+    appended = _message("b1")
+    b.append(appended)
+    assert a.tail(10)[-1].id == appended.id
+    assert a.messages[-1].id == appended.id
+    assert len(a) == 2
+
+
+def test_index_rebuilt_when_the_file_is_rewritten_without_it(tmp_path):
+    memory = _memory(tmp_path)
+    for i in range(3):
+        memory.append(_message(f"m{i}"))
+
+    # rewritten in place with longer lines, e.g. by a writer which does not maintain the index
+    rewritten = [_message("x" * 100 + str(i)) for i in range(4)]
+    with open(memory.file_path, "r+") as f:
+        f.write("".join(message.to_json() + "\n" for message in rewritten))
+    assert [m.id for m in _memory(tmp_path).tail(10)] == [m.id for m in rewritten]
+
+    # replaced by a new file, e.g. after a crash between the replacement of the file and of the index
+    replaced = [_message(f"r{i}") for i in range(5)]
+    tmp_file = tmp_path / "replaced.jsonl"
+    tmp_file.write_text("".join(message.to_json() + "\n" for message in replaced))
+    os.replace(tmp_file, memory.file_path)
+    assert [m.id for m in _memory(tmp_path).tail(10)] == [m.id for m in replaced]
+
+
+def test_legacy_index_without_header_is_rebuilt(tmp_path):
+    memory = _memory(tmp_path)
+    for i in range(3):
+        memory.append(_message(f"m{i}"))
+    memory.index_path.write_bytes(b"\0" * FileChatMemory._INDEX_RECORD.size * 2)
+    assert len(_memory(tmp_path).tail(10)) == 3
+
+
+def test_compact_rewrites_file_and_index(tmp_path):
+    memory = _memory(tmp_path)
+    messages = [_message(f"m{i}") for i in range(5)]
+    for message in messages:
+        memory.append(message)
+
+    summary = _message("summary", role="system", type="summary")
+    memory.compact(summary, messages[:3])
+    reopened = _memory(tmp_path)
+    assert [m.id for m in reopened.tail(1)] == [summary.id, messages[4].id]
+    assert memory.archive_path.exists()
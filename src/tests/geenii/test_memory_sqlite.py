@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+from geenii.chat.chat_models import TextContent
+from geenii.datamodels import ModelMessage
+from geenii.memory import SqliteChatMemoryStore, SqliteChatMemory, ChatMemoryWriteError
+
+
+def _message(text: str, role: str = "user", type: str = "message") -> ModelMessage:
+    return ModelMessage(type=type, role=role, content=[TextContent(text=text)])
+
+
+def test_append_and_range_reads(tmp_path):
+    store = SqliteChatMemoryStore(str(tmp_path / "memory.sqlite"))
+    memory = SqliteChatMemory(store, "ctx")
+    messages = [_message(f"m{i}") for i in range(10)]
+    for message in messages:
+        memory.append(message)
+
+    reopened = SqliteChatMemory(store, "ctx")
+    assert len(reopened) == 10
+    assert [m.id for m in reopened.tail(3)] == [m.id for m in messages[-3:]]
+    assert [m.id for m in reopened.since(messages[6].id)] == [m.id for m in messages[7:]]
+    assert [m.id for m in reopened.range(2, 4)] == [m.id for m in messages[1:3]]
+    store.close()
+
+
+def test_compact_archives_messages_and_pins_summary(tmp_path):
+    store = SqliteChatMemoryStore(str(tmp_path / "memory.sqlite"))
+    memory = SqliteChatMemory(store, "ctx")
+    messages = [_message(f"m{i}") for i in range(6)]
+    for message in messages:
+        memory.append(message)
+
+    summary = _message("summary", role="system", type="summary")
+    memory.compact(summary, messages[:4])
+
+    reopened = SqliteChatMemory(store, "ctx")
+    assert [m.id for m in reopened.messages] == [summary.id, messages[4].id, messages[5].id]
+    assert [m.id for m in reopened.tail(1)] == [summary.id, messages[5].id]
+
+    archive = io.StringIO()
+    assert store.export(archive, archived=True) == 4
+    assert json.loads(archive.getvalue().splitlines()[0])["context_id"] == "ctx"
+    store.close()
+
+
+def test_stores_sharing_a_database_do_not_lose_messages(tmp_path):
+    # e.g. two server workers, or the CLI and the server
+    first = SqliteChatMemoryStore(str(tmp_path / "memory.sqlite"))
+    second = SqliteChatMemoryStore(str(tmp_path / "memory.sqlite"))
+    for i in range(5):
+        first.append("shared", _message(f"a{i}"))
+        second.append("shared", _message(f"b{i}"))
+        second.append("other", _message(f"o{i}"))
+    first.flush()
+    second.flush()
+
+    assert first.count("shared") == 10
+    assert second.count("other") == 5
+    assert [seq for seq, _, _ in first.read("shared")] == list(range(1, 11))
+    assert first.stats()["errors"] == second.stats()["errors"] == 0
+    first.close()
+    second.close()
+
+
+def test_write_errors_are_raised_by_flush(tmp_path):
+    store = SqliteChatMemoryStore(str(tmp_path / "memory.sqlite"))
+    store.append("ctx", _message("ok"))
+    store.flush("ctx")
+    # a trigger rejects the messages of one context
+    store._write_conn.execute("CREATE TRIGGER reject BEFORE INSERT ON chat_messages WHEN NEW.context_id = 'bad' "
+                              "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    store.append("bad", _message("lost"))
+    store.append("ctx", _message("kept"))
+
+    with pytest.raises(ChatMemoryWriteError):
+        store.flush("bad")
+    store.flush("bad")  # the error is reported once
+    store.flush("ctx")
+    assert store.count("ctx") == 2
+    store.close()
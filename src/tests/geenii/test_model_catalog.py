@@ -0,0 +1,91 @@
+import threading
+import time
+
+from geenii.datamodels import AIModelInfo
+from geenii.provider.catalog import ModelCatalog
+
+
+class FakeProvider:
+    def __init__(self, name: str, delay: float = 0.0) -> None:
+        self.name = name
+        self.delay = delay
+        self.fetches = 0
+        self.version = 1
+        self.error: str | None = None
+        self.release = threading.Event()
+        self.release.set()
+
+    def is_configured(self) -> bool:
+        return True
+
+    def get_models(self) -> list[AIModelInfo]:
+        self.release.wait(5)
+        time.sleep(self.delay)
+        self.fetches += 1
+        if self.error:
+            raise ConnectionError(self.error)
+        return [AIModelInfo(provider=self.name, name=f"model-v{self.version}", locality="local")]
+
+
+def _catalog(*providers: FakeProvider, **kwargs) -> ModelCatalog:
+    by_name = {provider.name: provider for provider in providers}
+    return ModelCatalog(lambda: list(by_name), lambda name: by_name[name], **kwargs)
+
+
+def _wait_idle(catalog: ModelCatalog) -> None:
+    deadline = time.time() + 5
+    while any(entry["refreshing"] for entry in catalog.status().values()) and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_models_are_cached_per_provider():
+    ollama, openai = FakeProvider("ollama"), FakeProvider("openai")
+    catalog = _catalog(ollama, openai, ttl=60)
+
+    assert [m.provider for m in catalog.list_models()] == ["ollama", "openai"]
+    catalog.list_models()
+    assert ollama.fetches == 1 and openai.fetches == 1
+
+
+def test_expired_models_are_served_stale_while_revalidating():
+    ollama = FakeProvider("ollama")
+    catalog = _catalog(ollama, ttl=60)
+    catalog.list_models()
+
+    ollama.version = 2
+    ollama.release.clear()
+    catalog.invalidate("ollama")
+    # the listing does not wait for the refresh of a provider with cached models
+    assert [m.name for m in catalog.list_models()] == ["model-v1"]
+    assert catalog.status()["ollama"]["refreshing"]
+
+    ollama.release.set()
+    _wait_idle(catalog)
+    assert [m.name for m in catalog.list_models()] == ["model-v2"]
+    assert ollama.fetches == 2
+
+
+def test_failed_fetch_keeps_the_last_known_models():
+    ollama = FakeProvider("ollama")
+    catalog = _catalog(ollama, ttl=60, error_ttl=60)
+    catalog.list_models()
+
+    ollama.error = "connection refused"
+    catalog.list_models(refresh=True)
+    assert [m.name for m in catalog.list_models()] == ["model-v1"]
+    assert catalog.status()["ollama"]["error"] == "connection refused"
+    # the error is cached, the down provider is not fetched again within error_ttl
+    catalog.list_models()
+    assert ollama.fetches == 2
+
+
+def test_slow_provider_is_added_when_its_fetch_completes():
+    fast, slow = FakeProvider("fast"), FakeProvider("slow", delay=0.3)
+    catalog = _catalog(fast, slow, ttl=60, fetch_timeout=0.05)
+
+    start = time.time()
+    assert [m.provider for m in catalog.list_models()] == ["fast"]
+    assert time.time() - start < 0.25
+
+    _wait_idle(catalog)
+    assert [m.provider for m in catalog.list_models()] == ["fast", "slow"]
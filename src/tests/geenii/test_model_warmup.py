@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from geenii.provider.interfaces import AIModelWarmupProvider
+from geenii.provider.warmup import ModelWarmup
+from geenii.scheduler import ScheduledTask
+
+
+class FakeWarmupProvider(AIModelWarmupProvider):
+    def __init__(self, delay: float = 0.1, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def awarm_up(self, model: str, keep_alive: str | None = None) -> dict:
+        self.calls.append((model, keep_alive))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("host unavailable")
+        return {"load_duration": 1200, "total_duration": 1300}
+
+
+class CloudProvider:
+    pass
+
+
+def _warmup(models: list[str], **kwargs) -> tuple[ModelWarmup, dict]:
+    providers = {"ollama": FakeWarmupProvider(), "broken": FakeWarmupProvider(fail=True), "openai": CloudProvider()}
+
+    def get_provider(model_id: str):
+        provider_name, model_name = model_id.split(":", 1)
+        return providers[provider_name], provider_name, model_name
+
+    return ModelWarmup(get_provider, models, **kwargs), providers
+
+
+def test_warm_up_loads_the_models_concurrently():
+    warmup, providers = _warmup(["ollama:llama3", "ollama:qwen3:8b", "openai:gpt-4o", "broken:model"],
+                                keep_alive="15m")
+    start = time.monotonic()
+    results = asyncio.run(warmup.warm_up())
+    assert time.monotonic() - start < 0.3
+
+    assert results == {"ollama:llama3": {"load_duration": 1200, "total_duration": 1300},
+                       "ollama:qwen3:8b": {"load_duration": 1200, "total_duration": 1300},
+                       "openai:gpt-4o": None,
+                       "broken:model": None}
+    assert providers["ollama"].calls == [("llama3", "15m"), ("qwen3:8b", "15m")]
+    load_stats = warmup.stats()["load_stats"]
+    assert set(load_stats) == {"ollama:llama3", "ollama:qwen3:8b"}
+    assert load_stats["ollama:llama3"]["last_load_duration"] == 1200
+    assert load_stats["ollama:llama3"]["last_warm_up_at"] is not None
+    # warm-ups are not counted as requests or cold starts
+    assert load_stats["ollama:llama3"]["requests"] == 0
+
+
+def test_record_counts_cold_starts():
+    warmup, _ = _warmup([], cold_start_threshold=500)
+    warmup.record("ollama", "llama3", {"load_duration": 20})
+    warmup.record("ollama", "llama3", {"load_duration": 3000})
+    warmup.record("ollama", "llama3", {"load_duration": 3000, "cache": "hit"})
+    warmup.record("ollama", "llama3", {})
+
+    stats = warmup.stats()["load_stats"]["ollama:llama3"]
+    assert stats["requests"] == 2
+    assert stats["cold_starts"] == 1
+    assert stats["max_load_duration"] == 3000
+    assert stats["last_cold_start_at"] is not None
+
+
+def test_keep_alive_task_runs_from_the_scheduler():
+    warmup, providers = _warmup(["ollama:llama3"], keep_alive="5m")
+    task = ScheduledTask(name="model_keep_alive", cron="*/5 * * * *", run_fn=warmup.keep_alive_task)
+    task.load()
+    asyncio.run(task.run())
+    assert providers["ollama"].calls == [("llama3", "5m")]
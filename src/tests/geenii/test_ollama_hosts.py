@@ -0,0 +1,94 @@
+import asyncio
+
+import ollama
+import pytest
+
+from geenii.provider.ollama.hosts import OllamaHostPool, classify_error
+
+URLS = ["http://ollama-1:11434", "http://ollama-2:11434"]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = OllamaHostPool(URLS, failure_threshold=2, cooldown=60)
+    # no residency polling of the (unreachable) hosts
+    monkeypatch.setattr(pool, "refresh_residency", lambda: None)
+    yield pool
+    pool.close()
+
+
+def test_select_prefers_loaded_model_then_load(pool):
+    first, second = pool.hosts
+    second.loaded_models.add("qwen3:8b")
+    assert pool.select("qwen3:8b") is second
+    assert pool.select("qwen3") is first
+
+    second.loaded_models.add("llama3:latest")
+    assert pool.select("llama3") is second
+
+    with pool.lease(first):
+        assert pool.select(None) is second
+    assert pool.select(None) is first
+    assert pool.select(None, exclude={first.url}) is second
+
+
+def test_circuit_opens_after_consecutive_failures(pool):
+    first, second = pool.hosts
+    first.loaded_models.add("qwen3:8b")
+    pool.record_failure(first, ConnectionError("refused"))
+    assert pool.select("qwen3:8b") is first
+
+    pool.record_failure(first, ConnectionError("refused"))
+    assert not first.status()["healthy"]
+    assert first.loaded_models == set()
+    assert pool.select("qwen3:8b") is second
+
+    pool.record_success(first, "qwen3:8b")
+    assert first.status()["healthy"]
+    assert pool.select("qwen3:8b") is first
+
+
+def test_call_fails_over_to_another_host(pool):
+    calls = []
+
+    def fn(client):
+        calls.append(client)
+        if len(calls) == 1:
+            raise ConnectionError("connection refused")
+        return "ok"
+
+    assert pool.call("qwen3:8b", fn) == "ok"
+    assert calls[0] is not calls[1]
+    failed = next(host for host in pool.hosts if host.consecutive_failures)
+    served = next(host for host in pool.hosts if host is not failed)
+    assert served.has_model("qwen3:8b")
+    assert all(host.in_flight == 0 for host in pool.hosts)
+
+
+def test_call_does_not_retry_client_errors(pool):
+    calls = []
+
+    def fn(client):
+        calls.append(client)
+        raise ollama.ResponseError("invalid request", status_code=400)
+
+    with pytest.raises(ollama.ResponseError):
+        pool.call("qwen3:8b", fn)
+    assert len(calls) == 1
+    assert all(host.consecutive_failures == 0 for host in pool.hosts)
+
+
+def test_acall_fails_over_when_all_hosts_fail(pool):
+    async def fn(client):
+        raise ConnectionError("connection refused")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(pool.acall("qwen3:8b", fn))
+    assert [host.consecutive_failures for host in pool.hosts] == [1, 1]
+
+
+def test_classify_error():
+    assert classify_error(ollama.ResponseError("model not found", status_code=404)) == (True, False)
+    assert classify_error(ollama.ResponseError("internal error", status_code=500)) == (True, True)
+    assert classify_error(ConnectionError()) == (True, True)
+    assert classify_error(ValueError()) == (False, False)
@@ -0,0 +1,54 @@
+from geenii.chat.chat_models import TextContent
+from geenii.context import ContextBuilder
+from geenii.datamodels import ModelMessage, ChatCompletionRequest
+from geenii.prompt_prefix import PromptPrefixTracker
+from geenii.tokenizer import TokenCounter
+
+
+def _message(role: str, text: str) -> ModelMessage:
+    return ModelMessage(role=role, content=[TextContent(text=text)])
+
+
+def _tracker(tmp_path) -> PromptPrefixTracker:
+    return PromptPrefixTracker(builder=ContextBuilder(counter=TokenCounter(str(tmp_path))))
+
+
+def test_prefix_grows_with_the_conversation(tmp_path):
+    tracker = _tracker(tmp_path)
+    history = [_message("user", "What is the capital of France?"), _message("assistant", "Paris.")]
+    request = ChatCompletionRequest(model="ollama:test", context_id="c1", system=["You are helpful."],
+                                    volatile_system=["Current date and time: 2026-01-01T10:00:00"], prompt="Hi")
+    assert tracker.record(request, {})["prefix_tokens"] == 0
+
+    # the next turn appends to the history, the volatile system prompt changes
+    next_request = request.model_copy(update={"messages": history, "prompt": "And of Italy?",
+                                              "volatile_system": ["Current date and time: 2026-01-01T10:01:00"]})
+    usage = tracker.record(next_request, {})
+    assert usage["prefix_tokens"] > 0
+    assert tracker.stats()["prefix_breaks"] == 0
+
+    # a changed system prompt invalidates the prefix
+    changed = next_request.model_copy(update={"system": ["You are very helpful."]})
+    assert tracker.record(changed, {})["prefix_tokens"] == 0
+    assert tracker.stats()["prefix_breaks"] == 1
+
+
+def test_cached_tokens_derived_from_prompt_eval_count(tmp_path, monkeypatch):
+    tracker = _tracker(tmp_path)
+    request = ChatCompletionRequest(model="ollama:test", context_id="c1", system=["x " * 500], prompt="Hi")
+    prompt_tokens = tracker.builder.count_request(request)
+
+    usage = tracker.record(request, {"input_tokens": 20, "prompt_eval_count": 20})
+    # without a tokenizer, the prompt tokens are estimated
+    assert usage["estimated_cached_tokens"] == prompt_tokens - 20
+    assert "cached_tokens" not in usage
+    assert tracker.stats()["cached_tokens"] == 0
+
+    monkeypatch.setattr(tracker.builder.counter, "is_exact", lambda model: True)
+    usage = tracker.record(request, {"input_tokens": 20, "prompt_eval_count": 20})
+    assert usage["cached_tokens"] == prompt_tokens - 20
+
+    # provider reported cached tokens are kept
+    assert tracker.record(request, {"input_tokens": 600, "cached_tokens": 512})["cached_tokens"] == 512
+    # cache hits of the response cache are not tracked
+    assert "prefix_tokens" not in tracker.record(request, {"cache": "hit"})
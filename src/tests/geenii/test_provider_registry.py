@@ -0,0 +1,74 @@
+import pytest
+
+from geenii import config
+from geenii.provider.registry import ProviderRegistry
+
+
+class FakeProvider:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _registry(max_size: int = 16, close_delay: float = 600) -> ProviderRegistry:
+    registry = ProviderRegistry(max_size=max_size, close_delay=close_delay)
+    registry.register("a", FakeProvider, config_keys=("TEST_PROVIDER_KEY",))
+    registry.register("b", FakeProvider)
+    registry.register("c", FakeProvider)
+    return registry
+
+
+def test_get_returns_the_pooled_instance():
+    registry = _registry()
+    assert registry.get("a") is registry.get("A")
+    with pytest.raises(ValueError):
+        registry.get("unknown")
+
+
+def test_stale_provider_is_closed_after_the_close_delay(monkeypatch):
+    registry = _registry()
+    monkeypatch.setattr(config, "TEST_PROVIDER_KEY", "one", raising=False)
+    stale = registry.get("a")
+
+    monkeypatch.setattr(config, "TEST_PROVIDER_KEY", "two", raising=False)
+    fresh = registry.get("a")
+    assert fresh is not stale
+    # a request in flight may still use the stale instance
+    assert not stale.closed
+    assert registry.status()["retired"] == 1
+
+    registry.close_delay = 0
+    registry.get("a")
+    assert stale.closed and not fresh.closed
+    assert registry.status()["retired"] == 0
+
+
+def test_evicted_and_invalidated_providers_are_closed_after_the_close_delay():
+    registry = _registry(max_size=2)
+    a, b = registry.get("a"), registry.get("b")
+    c = registry.get("c")
+    assert registry.status()["providers"] == ["b", "c"]
+    assert not a.closed
+
+    assert registry.invalidate("b") == 1
+    assert not b.closed
+    assert registry.status()["retired"] == 2
+
+    registry.close_delay = 0
+    registry.invalidate()
+    assert a.closed and b.closed
+    # c was retired by this call, and is closed by the next one
+    assert not c.closed
+    registry.get("a")
+    assert c.closed
+
+
+def test_close_closes_pooled_and_retired_providers():
+    registry = _registry()
+    a, b = registry.get("a"), registry.get("b")
+    registry.invalidate("a")
+    registry.close()
+    assert a.closed and b.closed
+    assert registry.status() == {"size": 0, "max_size": 16, "providers": [], "retired": 0}
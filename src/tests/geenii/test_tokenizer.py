@@ -0,0 +1,35 @@
+from geenii import tokenizer
+from geenii.tokenizer import TokenCounter, Tokenizer
+
+
+def test_estimate_without_tokenizer(tmp_path):
+    counter = TokenCounter(str(tmp_path))
+    assert counter.tokenizer("ollama:unknown:latest") is None
+    assert counter.count("ollama:unknown:latest", "") == 0
+    assert counter.count("ollama:unknown:latest", "x" * 360) == counter.estimate("ollama:unknown:latest", 360)
+
+
+def test_calibration_adjusts_estimate(tmp_path):
+    counter = TokenCounter(str(tmp_path))
+    estimated = counter.estimate("ollama:test", 3600)
+    for _ in range(20):
+        counter.calibrate("ollama:test", counter.estimate("ollama:test", 3600), estimated * 2)
+    assert counter.estimate("ollama:test", 3600) > estimated * 1.8
+
+
+def test_tokenizer_by_model_family_with_count_cache(tmp_path, monkeypatch):
+    (tmp_path / "qwen3").mkdir()
+    (tmp_path / "qwen3" / "tokenizer.json").write_text("{}")
+    batches = []
+
+    def count_words(texts):
+        batches.append(texts)
+        return [len(text.split()) for text in texts]
+
+    monkeypatch.setattr(tokenizer, "load_hf_tokenizer_file", lambda path: Tokenizer("qwen3", count_words))
+    counter = TokenCounter(str(tmp_path))
+
+    assert counter.count_batch("ollama:qwen3:8b", ["one two", "three", ""]) == [2, 1, 0]
+    assert counter.count_batch("ollama:qwen3:14b", ["one two", "four five six"]) == [2, 3]
+    assert batches == [["one two", "three"], ["four five six"]]
+    assert counter.is_exact("ollama:qwen3:8b")
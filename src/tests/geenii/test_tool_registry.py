@@ -0,0 +1,55 @@
+import threading
+
+from geenii.tool.registry import ToolRegistry, PythonTool
+
+
+def _registry(*names: str) -> ToolRegistry:
+    registry = ToolRegistry()
+    for name in names:
+        registry.register(PythonTool(name, description=f"The {name} tool", handler=lambda: name))
+    return registry
+
+
+def test_tool_schemas_sorted_and_cached():
+    registry = _registry("web_search", "calculator", "clock")
+
+    schemas = registry.tool_schemas("openai", {"clock", "calculator", "unknown"})
+    assert [schema["name"] for schema in schemas] == ["calculator", "clock"]
+    # the same selection is served from the cache
+    assert registry.tool_schemas("openai", {"calculator", "clock", "unknown"}) is schemas
+
+    ollama_schemas = registry.tool_schemas("ollama")
+    assert [schema["function"]["name"] for schema in ollama_schemas] == ["calculator", "clock", "web_search"]
+
+
+def test_tool_schemas_invalidated_on_register_and_unregister():
+    registry = _registry("calculator")
+    version = registry.version
+    assert len(registry.tool_schemas("openai")) == 1
+
+    registry.register(PythonTool("clock", handler=lambda: "now"))
+    assert registry.version > version
+    assert [schema["name"] for schema in registry.tool_schemas("openai")] == ["calculator", "clock"]
+
+    registry.unregister("calculator")
+    assert [schema["name"] for schema in registry.tool_schemas("openai")] == ["clock"]
+
+
+def test_register_and_unregister_modify_the_tools_under_the_cache_lock():
+    registry = _registry("calculator")
+    registry.tool_schemas("openai")
+
+    with registry._cache_lock:
+        # a schema selection in progress holds the lock, the tools are not modified meanwhile
+        register = threading.Thread(target=registry.register, args=(PythonTool("clock", handler=lambda: "now"),))
+        unregister = threading.Thread(target=registry.unregister, args=("calculator",))
+        register.start()
+        unregister.start()
+        register.join(0.1)
+        unregister.join(0.1)
+        assert registry.list_tool_names() == {"calculator"}
+    register.join()
+    unregister.join()
+
+    assert registry.list_tool_names() == {"clock"}
+    assert [schema["name"] for schema in registry.tool_schemas("openai")] == ["clock"]
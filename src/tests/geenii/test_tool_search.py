@@ -0,0 +1,33 @@
+from geenii.tool.registry import ToolRegistry, PythonTool
+from geenii.tool.search import ToolSearchIndex, tokenize
+
+TOOLS = [
+    PythonTool("read_file", "Read the contents of a file from the local disk",
+               {"type": "object", "properties": {"path": {"type": "string", "description": "The file path"}}}),
+    PythonTool("web_search", "Search the web for up-to-date information"),
+    PythonTool("getWeather", "Get the current weather forecast for a city"),
+    PythonTool("send_email", "Send an email message to a recipient"),
+]
+
+
+def test_tokenize():
+    assert tokenize("read_file") == ["read", "file"]
+    assert tokenize("getWeather for the Cities") == ["weather", "citie"]
+
+
+def test_search_ranks_relevant_tools():
+    index = ToolSearchIndex(TOOLS)
+    assert [name for name, _ in index.search("What's the weather in Berlin?")] == ["getWeather"]
+    assert index.search("Show me the files in the path /tmp")[0][0] == "read_file"
+    assert index.search("search the web", names={"read_file", "send_email"}) == []
+    assert index.search("unrelated gibberish") == []
+
+
+def test_registry_search_follows_registrations():
+    registry = ToolRegistry()
+    for tool in TOOLS:
+        registry.register(tool)
+    assert registry.search("email my boss", top_k=2) == ["send_email"]
+
+    registry.unregister("send_email")
+    assert registry.search("email my boss") == []
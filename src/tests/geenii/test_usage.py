@@ -0,0 +1,97 @@
+import gzip
+import json
+import shutil
+from datetime import datetime
+
+import pytest
+
+from geenii import usage
+from geenii.usage import UsageStore
+
+
+def write_usage(log_file, count, model="qwen3:8b", provider="ollama", timestamp="2026-10-01T10:00:00"):
+    with open(log_file, "a") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "timestamp": timestamp,
+                "provider": provider,
+                "context_id": "ctx",
+                "model": model,
+                "usage": {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15, "total_duration": (i + 1) * 100},
+            }) + "\n")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UsageStore(str(tmp_path / "usage.db"), str(tmp_path))
+
+
+def test_ingest_is_incremental(tmp_path, store):
+    log_file = tmp_path / "ai-usage-2026-10.log"
+    write_usage(log_file, 3)
+    assert store.ingest() == 3
+    assert store.ingest() == 0
+
+    write_usage(log_file, 2)
+    assert store.ingest() == 2
+
+
+def test_ingest_skips_partial_last_line(tmp_path, store):
+    log_file = tmp_path / "ai-usage-2026-10.log"
+    write_usage(log_file, 1)
+    with open(log_file, "a") as f:
+        f.write('{"timestamp": "2026-10-01T')
+    assert store.ingest() == 1
+
+    with open(log_file, "a") as f:
+        f.write('10:00:00", "model": "qwen3:8b", "usage": {"input_tokens": 1}}\n')
+    assert store.ingest() == 1
+
+
+def test_ingest_in_batches(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(usage, "INGEST_BATCH_LINES", 4)
+    log_file = tmp_path / "ai-usage-2026-10.log"
+    write_usage(log_file, 10)
+    assert store.ingest() == 10
+    assert store.conn.execute("SELECT offset FROM usage_ingest").fetchone()[0] == log_file.stat().st_size
+
+    # a rotated, compressed segment is ingested from the offset of the uncompressed file
+    write_usage(log_file, 3)
+    with open(log_file, "rb") as src, gzip.open(f"{log_file}.gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    log_file.unlink()
+    assert store.ingest() == 3
+    assert store.ingest() == 0
+
+
+def test_aggregate_by_model(tmp_path, store):
+    log_file = tmp_path / "ai-usage-2026-10.log"
+    write_usage(log_file, 10, model="qwen3:8b")
+    write_usage(log_file, 2, model="gpt-4o-mini", provider="openai")
+    store.ingest()
+
+    results = {r["model"]: r for r in store.aggregate(group_by=["model"])}
+    assert results["qwen3:8b"]["requests"] == 10
+    assert results["qwen3:8b"]["total_tokens"] == 150
+    assert results["qwen3:8b"]["latency_p50"] == 500
+    assert results["qwen3:8b"]["latency_p95"] == 1000
+    assert results["gpt-4o-mini"]["input_tokens"] == 20
+
+
+def test_aggregate_by_time_bucket_and_filter(tmp_path, store):
+    log_file = tmp_path / "ai-usage-2026-10.log"
+    write_usage(log_file, 2, timestamp="2026-10-01T10:00:00")
+    write_usage(log_file, 3, timestamp="2026-10-02T10:00:00")
+    write_usage(log_file, 4, provider="openai", timestamp="2026-10-02T10:00:00")
+    store.ingest()
+
+    results = store.aggregate(bucket="day", provider="ollama")
+    assert [(r["bucket"], r["requests"]) for r in results] == [("2026-10-01", 2), ("2026-10-02", 3)]
+
+    results = store.aggregate(since=datetime(2026, 10, 2))
+    assert results[0]["requests"] == 7
+
+
+def test_aggregate_rejects_invalid_dimension(store):
+    with pytest.raises(ValueError):
+        store.aggregate(group_by=["prompt"])
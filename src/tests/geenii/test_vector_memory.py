@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from geenii import config
+from geenii.datamodels import EmbeddingResponse
+from geenii.provider.interfaces import AIEmbeddingProvider
+from geenii import vector_memory
+from geenii.vector_memory import VectorIndex, VectorMemory, ModelEmbedder
+
+
+def _clustered_vectors(n: int, dim: int = 32, clusters: int = 50, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(0, clusters, n)] + 0.2 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_search_flat_and_ivf(tmp_path):
+    vectors = _clustered_vectors(6000)
+    index = VectorIndex(tmp_path / "index", nprobe=8, train_threshold=2000)
+    for start in range(0, len(vectors), 1000):
+        rows = range(start, start + 1000)
+        namespace = "even" if start % 2000 == 0 else "odd"
+        index.add(vectors[start:start + 1000], namespace, "message",
+                  texts=[f"text {i}" for i in rows], keys=[f"key {i}" for i in rows])
+
+    stats = index.stats()
+    assert stats["size"] == 6000
+    assert stats["lists"] > 0
+
+    matches = index.search(vectors[1234], top_k=3)
+    assert matches[0].key == "key 1234"
+    assert matches[0].score == pytest.approx(1.0, abs=1e-4)
+    assert [m.score for m in matches] == sorted([m.score for m in matches], reverse=True)
+    assert all(m.namespace == "even" for m in index.search(vectors[1234], top_k=5, namespaces=["even"]))
+
+
+def test_index_is_persistent_and_deduplicates_keys(tmp_path):
+    vectors = _clustered_vectors(10)
+    index = VectorIndex(tmp_path / "index")
+    assert index.add(vectors, "ns", "message", texts=[str(i) for i in range(10)], keys=[str(i) for i in range(10)]) == 10
+    index.close()
+
+    index = VectorIndex(tmp_path / "index")
+    assert index.size == 10
+    assert index.add(vectors[:2], "ns", "message", texts=["0", "new"], keys=["0", "new"]) == 1
+    assert index.search(vectors[5], top_k=1)[0].text == "5"
+
+
+
+def test_training_does_not_hold_the_index_lock(tmp_path, monkeypatch):
+    vectors = _clustered_vectors(3000)
+    index = VectorIndex(tmp_path / "index", train_threshold=2000)
+    index.add(vectors[:1000], "ns", "message", texts=[str(i) for i in range(1000)],
+              keys=[str(i) for i in range(1000)])
+
+    argmax_dot = vector_memory._argmax_dot
+    added = []
+
+    def add_during_training(vectors_, centroids):
+        # another thread adds vectors while the lists are trained
+        if not added:
+            rows = range(2000, 2100)
+            thread = threading.Thread(target=lambda: added.append(index.add(
+                vectors[2000:2100], "ns", "message", texts=[str(i) for i in rows], keys=[str(i) for i in rows])))
+            thread.start()
+            thread.join(5)
+        return argmax_dot(vectors_, centroids)
+
+    monkeypatch.setattr(vector_memory, "_argmax_dot", add_during_training)
+    index.add(vectors[1000:2000], "ns", "message", texts=[str(i) for i in range(1000, 2000)],
+              keys=[str(i) for i in range(1000, 2000)])
+
+    assert added == [100]
+    stats = index.stats()
+    assert stats["trainings"] == 1 and stats["size"] == 2100 and stats["lists"] > 0
+    # the vectors added during the training are in the new lists
+    assert index.search(vectors[2050], top_k=1)[0].key == "2050"
+
+def test_vector_memory_with_custom_embedder(tmp_path):
+    vocabulary = ["cat", "dog", "pizza", "pasta"]
+    embedded = []
+
+    def embedder(texts):
+        embedded.extend(texts)
+        return [[float(word in text) for word in vocabulary] + [0.01] for text in texts]
+
+    memory = VectorMemory(embedder, VectorIndex(tmp_path / "index"), min_score=0.5)
+    assert memory.add("agent", ["my cat and dog", "I like pizza", "pasta recipe"]) == 3
+    assert memory.add("agent", ["I like pizza"]) == 0
+    assert embedded.count("I like pizza") == 1
+
+    matches = memory.search("pizza or pasta?", top_k=2)
+    assert {m.text for m in matches} == {"I like pizza", "pasta recipe"}
+    assert memory.search("cat", namespaces=["other"]) == []
+
+
+class FakeEmbeddingProvider(AIEmbeddingProvider):
+    models = []
+
+    def generate_embeddings(self, model, inputs, dimensions=None, **kwargs):
+        self.models.append(model)
+        return EmbeddingResponse(id="e", timestamp=0, model=model, embeddings=[[1.0, 0.0] for _ in inputs])
+
+
+def test_model_embedder_sends_the_model_name_without_provider_prefix(monkeypatch):
+    from geenii.ai import provider_registry
+
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", False)
+    provider_registry.register("fakeembed", FakeEmbeddingProvider)
+    try:
+        embedder = ModelEmbedder("fakeembed:nomic-embed-text:latest")
+        assert embedder(["a", "b"]) == [[1.0, 0.0], [1.0, 0.0]]
+        assert FakeEmbeddingProvider.models == ["nomic-embed-text:latest"]
+    finally:
+        provider_registry.invalidate("fakeembed")
+        provider_registry._factories.pop("fakeembed", None)
@@ -0,0 +1,37 @@
+import time
+
+from geenii.utils.cached import SqliteCacheStore
+
+
+def test_read_and_write(tmp_path):
+    store = SqliteCacheStore(str(tmp_path / "cache.sqlite"))
+    assert store.read_cache("a") is None
+    store.write_cache("a", {"value": 1})
+    assert store.read_cache("a") == {"value": 1}
+
+    store.write_cache("b", "expired", ttl=-1)
+    assert store.read_cache("b") is None
+    assert store.count() == 1
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    store = SqliteCacheStore(str(tmp_path / "cache.sqlite"), max_entries=3)
+    for key in ("a", "b", "c"):
+        store.write_cache(key, key)
+        time.sleep(0.01)
+    # reading "a" makes "b" the least recently used entry
+    assert store.read_cache("a") == "a"
+    time.sleep(0.01)
+
+    store.write_cache("d", "d")
+    assert store.count() == 3
+    assert store.read_cache("b") is None
+    assert [store.read_cache(key) for key in ("a", "c", "d")] == ["a", "c", "d"]
+
+
+def test_evicts_expired_entries_first(tmp_path):
+    store = SqliteCacheStore(str(tmp_path / "cache.sqlite"), max_entries=3)
+    store.write_cache("expired", "x", ttl=0.01)
+    time.sleep(0.02)
+    store.write_cache("a", "a")
+    assert store.count() == 1
@@ -0,0 +1,92 @@
+import json
+import threading
+
+from geenii.chat.chat_models import TextContent
+from geenii.datamodels import ChatCompletionResponse
+from geenii.utils.log_sink import JsonlLogSink
+
+
+def test_write_batches_and_size_rotation(tmp_path):
+    sink = JsonlLogSink(max_bytes=100, flush_interval=0.01)
+    log_file = tmp_path / "ai-2026-10-18.log"
+    for i in range(10):
+        assert sink.write("ai", str(log_file), {"i": i, "text": "x" * 20})
+    sink.close()
+
+    segments = sorted(tmp_path.glob("ai-2026-10-18*.log"))
+    assert len(segments) > 1
+    records = [json.loads(line) for path in segments for line in path.read_text().splitlines()]
+    assert sorted(record["i"] for record in records) == list(range(10))
+    assert sink.stats()["written"] == 10
+    # the sink is closed, later records are dropped
+    assert not sink.write("ai", str(log_file), {"i": 10})
+
+
+def test_stats_count_concurrent_writes(tmp_path):
+    sink = JsonlLogSink(flush_interval=0.01)
+    log_file = tmp_path / "ai.log"
+
+    def writer():
+        for i in range(200):
+            sink.write("ai", str(log_file), {"i": i})
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.flush()
+    assert sink.stats() == {"written": 800, "dropped": 0, "errors": 0, "queued": 0}
+    sink.close()
+
+
+def test_ai_log_record_is_not_affected_by_later_mutations(monkeypatch):
+    from geenii import ai
+
+    records = []
+    monkeypatch.setattr(ai.ai_log_sink, "write", lambda stream, file_path, record: records.append(record))
+    response = ChatCompletionResponse(id="r", timestamp=0, prompt="", output=[TextContent(text="hello")],
+                                      usage={"input_tokens": 1})
+    ai._ai_log("completion.response", response)
+
+    response.usage["cache"] = "miss"
+    response.output.append(TextContent(text="more"))
+    response.context_id = "ctx"
+    logged = records[0]["completion.response"]
+    assert logged.usage == {"input_tokens": 1}
+    assert [part.text for part in logged.output] == ["hello"]
+    assert logged.context_id is None
+
+
+def test_ai_log_serializes_in_the_writer_thread(tmp_path, monkeypatch):
+    from geenii import ai
+
+    sink = JsonlLogSink(flush_interval=0.01)
+    monkeypatch.setattr(ai, "ai_log_sink", sink)
+    monkeypatch.setattr(ai, "DATA_DIR", str(tmp_path))
+    calls = []
+    model_dump, model_copy = ChatCompletionResponse.model_dump, ChatCompletionResponse.model_copy
+
+    def recording_dump(self, *args, **kwargs):
+        calls.append(("dump", threading.get_ident()))
+        return model_dump(self, *args, **kwargs)
+
+    def recording_copy(self, *args, **kwargs):
+        calls.append(("deep copy" if kwargs.get("deep") else "copy", threading.get_ident()))
+        return model_copy(self, *args, **kwargs)
+
+    monkeypatch.setattr(ChatCompletionResponse, "model_dump", recording_dump)
+    monkeypatch.setattr(ChatCompletionResponse, "model_copy", recording_copy)
+    response = ChatCompletionResponse(id="r", timestamp=0, prompt="", output=[TextContent(text="hello")],
+                                      usage={"input_tokens": 1})
+    ai._ai_log("completion.response", response)
+    sink.flush()
+    sink.close()
+
+    caller = threading.get_ident()
+    assert ("copy", caller) in calls
+    assert ("deep copy", caller) not in calls
+    assert [kind for kind, thread in calls if kind == "dump" and thread != caller] == ["dump"]
+    assert not [kind for kind, thread in calls if kind == "dump" and thread == caller]
+    log_file = next(tmp_path.glob("logs/ai-*.log"))
+    assert json.loads(log_file.read_text())["completion.response"]["output"][0]["text"] == "hello"
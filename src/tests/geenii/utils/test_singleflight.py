@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from geenii.utils.singleflight import SingleFlight, AsyncSingleFlight
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    group = SingleFlight()
+    calls = []
+    results = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    def worker():
+        results.append(group.do("key", fn))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["result"] * 5
+    assert sum(1 for _, shared in results if shared) == 4
+    assert group.stats() == {"calls": 5, "executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_singleflight_does_not_share_sequential_calls():
+    group = SingleFlight()
+    assert group.do("key", lambda: 1) == (1, False)
+    assert group.do("key", lambda: 2) == (2, False)
+
+
+def test_singleflight_propagates_errors():
+    group = SingleFlight()
+
+    def fn():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        group.do("key", fn)
+    assert group.stats()["in_flight"] == 0
+
+
+def test_async_singleflight_coalesces_concurrent_calls():
+    group = AsyncSingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*[group.do("key", fn) for _ in range(5)],
+                                    group.do("other", fn))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 2
+    assert [r for r, _ in results] == ["result"] * 6
+    assert [shared for _, shared in results] == [False, True, True, True, True, False]
+    assert group.stats() == {"calls": 6, "executed": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_async_singleflight_caller_cancellation_does_not_cancel_shared_call():
+    group = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        first = asyncio.ensure_future(group.do("key", fn))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(group.do("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == ("result", True)